@@ -0,0 +1,176 @@
+import json
+import os
+import re
+import threading
+from collections import defaultdict
+
+# Street suffix and direction spellings reduced to the forms used in FULLADDR
+ABBREVIATIONS = {
+    'STREET': 'ST', 'AVENUE': 'AVE', 'AV': 'AVE', 'ROAD': 'RD', 'DRIVE': 'DR', 'LANE': 'LN',
+    'COURT': 'CT', 'CIRCLE': 'CIR', 'PLACE': 'PL', 'BOULEVARD': 'BLVD', 'PARKWAY': 'PKWY',
+    'TRAIL': 'TRL', 'TERRACE': 'TER', 'HIGHWAY': 'HWY', 'WAY': 'WAY',
+    'NORTH': 'N', 'SOUTH': 'S', 'EAST': 'E', 'WEST': 'W',
+}
+
+# Secondary unit designators; '#' is mapped to UNIT before punctuation is dropped
+UNIT_DESIGNATORS = {
+    'APT', 'APARTMENT', 'UNIT', 'STE', 'SUITE', 'RM', 'ROOM', 'FL', 'FLOOR', 'BLDG', 'BUILDING',
+    'LOT', 'SPC', 'SPACE', 'TRLR', 'DEPT',
+}
+
+
+def normalize_address(address, drop_units=False):
+    """
+    Upper-cases an address, drops punctuation, collapses whitespace and
+    abbreviates street suffixes and directions.
+
+    :param address: Free-text street address.
+    :param drop_units: Also remove unit designators and their numbers ("APT 4", "#12"),
+                       so every unit of a building normalizes to the building address.
+    :return: Normalized address string.
+    """
+    text = address.upper()
+    if drop_units:
+        text = text.replace("#", " UNIT ")
+    tokens = [ABBREVIATIONS.get(token, token) for token in re.sub(r"[^\w\s]", " ", text).split()]
+    if drop_units:
+        kept = []
+        skip_next = False
+        for position, token in enumerate(tokens):
+            if skip_next:
+                skip_next = False
+            # The house number and street name come first, so only later tokens can be designators
+            elif position >= 2 and token in UNIT_DESIGNATORS:
+                skip_next = True
+            else:
+                kept.append(token)
+        tokens = kept
+    return " ".join(tokens)
+
+
+def trigrams(text):
+    """
+    Returns the set of character trigrams of a padded string.
+
+    :param text: Normalized address.
+    :return: Set of 3-character strings.
+    """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class AddressPointIndex:
+    """
+    Offline address lookup built from the Building_Addresses layer.
+
+    Exact lookups use a hash map of normalized addresses. Misspelled addresses
+    fall back to a trigram index blocked by house number: indexed addresses with
+    the same house number are scored by trigram Jaccard similarity and the best
+    one is accepted if it scores at least ``min_similarity``.
+
+    :param entries: Dictionary of normalized address -> (x, y).
+    :param min_similarity: Minimum trigram similarity for a fuzzy match.
+    :return: None
+    """
+
+    def __init__(self, entries, min_similarity=0.5):
+        """
+        Builds the in-memory trigram index over the entries.
+
+        :param entries: Dictionary of normalized address -> (x, y).
+        :param min_similarity: Minimum trigram similarity for a fuzzy match.
+        :return: None
+        """
+        self.entries = {address: tuple(xy) for address, xy in entries.items()}
+        self.min_similarity = min_similarity
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # House number -> [(address, trigrams)], so a fuzzy lookup only scores a handful of candidates
+        self._by_number = defaultdict(list)
+        for address in self.entries:
+            self._by_number[address.split(" ", 1)[0]].append((address, trigrams(address)))
+
+    @classmethod
+    def from_feature_class(cls, feature_class, address_field='FULLADDR', **kwargs):
+        """
+        Reads address points from a feature class, projected to WGS84 so they
+        match the coordinates returned by the online geocoders.
+
+        :param feature_class: Path or name of the address point feature class.
+        :param address_field: Field holding the full street address.
+        :return: AddressPointIndex instance.
+        """
+        # arcpy is only needed to build the index; a saved index loads without it
+        import arcpy
+        entries = {}
+        with arcpy.da.SearchCursor(feature_class, [address_field, "SHAPE@XY"],
+                                   spatial_reference=arcpy.SpatialReference(4326)) as cursor:
+            for address, xy in cursor:
+                if address and xy and xy[0] is not None:
+                    entries.setdefault(normalize_address(address), xy)
+        return cls(entries, **kwargs)
+
+    @classmethod
+    def load(cls, index_path, **kwargs):
+        """
+        Loads an index saved with save().
+
+        :param index_path: Path of the JSON index file.
+        :return: AddressPointIndex instance.
+        """
+        with open(index_path, "r", encoding='utf-8') as index_file:
+            return cls(json.load(index_file)['entries'], **kwargs)
+
+    def save(self, index_path):
+        """
+        Writes the index entries to a JSON file, replacing it atomically.
+
+        :param index_path: Path of the JSON index file.
+        :return: None
+        """
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "w", encoding='utf-8') as index_file:
+            json.dump({'entries': self.entries}, index_file)
+        os.replace(tmp_path, index_path)
+
+    def lookup(self, address):
+        """
+        Finds the coordinates of an address.
+
+        :param address: Street address, without city and state.
+        :return: (x, y) tuple or None.
+        """
+        key = normalize_address(address)
+        xy = self.entries.get(key)
+        if xy is not None:
+            with self._lock:
+                self.exact_hits += 1
+            return xy
+        match = self.fuzzy_match(key)
+        with self._lock:
+            if match is None:
+                self.misses += 1
+                return None
+            self.fuzzy_hits += 1
+        return self.entries[match]
+
+    def fuzzy_match(self, key):
+        """
+        Returns the closest indexed address by trigram similarity.
+
+        :param key: Normalized address.
+        :return: Indexed address string, or None if nothing is similar enough.
+        """
+        grams = trigrams(key)
+        best, best_score = None, self.min_similarity
+        for address, candidate_grams in self._by_number.get(key.split(" ", 1)[0], ()):
+            shared = len(grams & candidate_grams)
+            score = shared / (len(grams) + len(candidate_grams) - shared)
+            if score >= best_score:
+                best, best_score = address, score
+        return best
+
+    def __len__(self):
+        return len(self.entries)
@@ -1,7 +1,14 @@
 import csv
-import arcpy
-import requests
+import hashlib
+import json
+import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from Lab2.etl.SpatialEtl import SpatialEtl
+from etl.AddressPointIndex import normalize_address
+from etl.GeocodeCache import GeocodeCache
+from etl.Geocoders import build_geocoder
 
 class GSheetsEtl(SpatialEtl):
     """
@@ -21,10 +28,292 @@ class GSheetsEtl(SpatialEtl):
         :return: None
         """
         super().__init__(config_dict)
+        self._geocoder = None
+        # Set by extract() when the sheet has not changed since the last run
+        self.sheet_unchanged = False
+        # Validators from the latest download
+        self.pending_validators = {}
+        # Incremental state from the latest transform, saved by commit_extract_state() once load succeeds
+        self.pending_state = None
+        # Row diff from the latest incremental transform
+        self.added_rows = 0
+        self.removed_rows = 0
+        # True when the previous load can be patched by appending changed_addresses.csv
+        self.append_only = False
+        # Rows sent to geocoding and the unique normalized addresses among them
+        self.geocoded_rows = 0
+        self.unique_addresses = 0
+
+    def extract_state_path(self):
+        """
+        Path of the JSON file holding the ETag/Last-Modified validators and row snapshot.
+
+        :return: Path to the state file.
+        """
+        return os.path.join(self.config_dict.get('download_dir', ''),
+                            self.config_dict.get('extract_state_name', 'extract_state.json'))
+
+    def read_extract_state(self):
+        """
+        Reads the state saved by the previous incremental run.
+
+        :return: Dictionary with 'etag', 'last_modified' and 'rows' keys, empty if there is no state.
+        """
+        try:
+            with open(self.extract_state_path(), "r", encoding='utf-8') as state_file:
+                return json.load(state_file)
+        except (OSError, ValueError):
+            return {}
+
+    def write_extract_state(self, state):
+        """
+        Atomically replaces the saved incremental state.
+
+        :param state: Dictionary to save.
+        :return: None
+        """
+        state_path = self.extract_state_path()
+        tmp_path = state_path + ".tmp"
+        with open(tmp_path, "w", encoding='utf-8') as state_file:
+            json.dump(state, state_file)
+        os.replace(tmp_path, state_path)
+
+    def commit_extract_state(self):
+        """
+        Saves the incremental state of the latest transform. Called after the
+        load succeeded, so a failed load leaves the old state and the next run
+        retries the same rows.
+
+        :return: None
+        """
+        if self.pending_state is not None:
+            self.write_extract_state(self.pending_state)
+            self.pending_state = None
+
+    @staticmethod
+    def validators_path(extract_path):
+        """
+        Path of the JSON file next to a downloaded CSV holding the validators it was
+        served with, so a later process can record them after geocoding the file.
+
+        :param extract_path: Path of the raw CSV.
+        :return: Path to the validators file.
+        """
+        return os.path.splitext(extract_path)[0] + ".validators.json"
+
+    def read_validators(self, extract_path):
+        """
+        Reads the validators saved with a downloaded CSV.
+
+        :param extract_path: Path of the raw CSV.
+        :return: Dictionary with 'etag' and 'last_modified' keys, empty if none were saved.
+        """
+        try:
+            with open(self.validators_path(extract_path), "r", encoding='utf-8') as validators_file:
+                return json.load(validators_file)
+        except (OSError, ValueError):
+            return {}
+
+    def checkpoint_path(self):
+        """
+        Path of the JSON file holding the progress of an interrupted transform.
+
+        :return: Path to the checkpoint file.
+        """
+        return os.path.join(self.config_dict.get('download_dir', ''),
+                            self.config_dict.get('geocode_checkpoint_name', 'geocode_checkpoint.json'))
+
+    @staticmethod
+    def input_snapshot(input_file, addresses):
+        """
+        Identifies the work of a transform run: the raw CSV contents and the list of
+        addresses left to geocode (which also depends on the incremental snapshot).
+
+        :param input_file: Path to the raw address CSV.
+        :param addresses: Unique normalized addresses to geocode, in order.
+        :return: Dictionary with 'input_sha1' and 'addresses_sha1'.
+        """
+        digest = hashlib.sha1()
+        with open(input_file, "rb") as raw_file:
+            for block in iter(lambda: raw_file.read(1024 * 1024), b""):
+                digest.update(block)
+        return {'input_sha1': digest.hexdigest(),
+                'addresses_sha1': hashlib.sha1("\n".join(addresses).encode('utf-8')).hexdigest()}
+
+    def read_checkpoint(self, snapshot):
+        """
+        Loads the results saved by an interrupted transform of the same input.
+
+        :param snapshot: Dictionary from input_snapshot() for the current run.
+        :return: Dictionary of normalized address -> (lon, lat) or None; empty when there is
+                 no checkpoint, resuming is disabled, or the input has changed since it was written.
+        """
+        if not self.config_dict.get('geocode_resume', True):
+            return {}
+        try:
+            with open(self.checkpoint_path(), "r", encoding='utf-8') as checkpoint_file:
+                checkpoint = json.load(checkpoint_file)
+        except (OSError, ValueError):
+            return {}
+        if checkpoint.get('snapshot') != snapshot:
+            print("Input changed since the last checkpoint, geocoding from the start")
+            return {}
+        print(f"Resuming from checkpoint: {checkpoint['offset']} of {checkpoint['total']} addresses done")
+        return {address: tuple(xy) if xy else None for address, xy in checkpoint['results'].items()}
+
+    def write_checkpoint(self, snapshot, results, offset, total):
+        """
+        Atomically saves the geocoding progress. Failed lookups are left out so a
+        resumed run retries them.
+
+        :param snapshot: Dictionary from input_snapshot().
+        :param results: Dictionary of normalized address -> geocode result.
+        :param offset: Number of addresses processed so far.
+        :param total: Number of addresses in the run.
+        :return: None
+        """
+        checkpoint = {
+            'snapshot': snapshot,
+            'offset': offset,
+            'total': total,
+            'results': {address: list(result) if result else None
+                        for address, result in results.items() if not isinstance(result, Exception)},
+        }
+        checkpoint_path = self.checkpoint_path()
+        tmp_path = checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding='utf-8') as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file)
+        os.replace(tmp_path, checkpoint_path)
+
+    def clear_checkpoint(self):
+        """
+        Removes the checkpoint after a completed transform.
+
+        :return: None
+        """
+        if os.path.exists(self.checkpoint_path()):
+            os.remove(self.checkpoint_path())
+
+    @staticmethod
+    def row_hash(row):
+        """
+        Hashes every column of a form submission so edited rows are detected as changed.
+
+        :param row: Row dictionary from csv.DictReader.
+        :return: Hex digest string.
+        """
+        return hashlib.sha1(json.dumps(row, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def address_key(self, street_address):
+        """
+        Stable key of a submitted address: spelling variants that normalize to the
+        same address in the configured city and state share a key.
+
+        :param street_address: 'Street Address' value from the form.
+        :return: Hex digest string.
+        """
+        address = f"{normalize_address(street_address, drop_units=True)}|{self.config_dict.get('city', 'Boulder')}|" \
+                  f"{self.config_dict.get('state', 'CO')}"
+        return hashlib.sha1(address.upper().encode('utf-8')).hexdigest()[:16]
+
+    def open_stream(self):
+        """
+        Starts a streaming download of the spreadsheet. In incremental mode the request
+        is conditional on the stored ETag/Last-Modified.
+
+        :return: Response object with the body not yet read, or None if the sheet is unchanged (304).
+        """
+        self.sheet_unchanged = False
+        headers = {'Accept-Encoding': 'gzip'}
+        if self.config_dict.get('incremental_extract', False):
+            state = self.read_extract_state()
+            if state.get('etag'):
+                headers['If-None-Match'] = state['etag']
+            if state.get('last_modified'):
+                headers['If-Modified-Since'] = state['last_modified']
+        r = self.session.get(self.config_dict.get('remote_url'), headers=headers, stream=True)
+        if r.status_code == 304:
+            r.close()
+            self.sheet_unchanged = True
+            print("Spreadsheet not modified since last run, skipping download")
+            return None
+        r.raise_for_status()
+        self.pending_validators = {'etag': r.headers.get('ETag'),
+                                   'last_modified': r.headers.get('Last-Modified')}
+        r.encoding = "utf-8"
+        return r
+
+    def iter_download(self, r, extract_path):
+        """
+        Yields decoded text chunks of the response while writing them to extract_path.
+        The file is written under a temporary name and only moved into place once the
+        whole body has been received; the response validators are then saved next to it.
+
+        :param r: Streaming response from open_stream().
+        :param extract_path: Path of the raw CSV to write.
+        :return: Generator of text chunks.
+        """
+        chunk_size = self.config_dict.get('download_chunk_size', 64 * 1024)
+        tmp_path = extract_path + ".part"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as output_file:
+                # iter_content transparently decodes gzip transfer-encoding
+                for chunk in r.iter_content(chunk_size=chunk_size, decode_unicode=True):
+                    output_file.write(chunk)
+                    yield chunk
+            os.replace(tmp_path, extract_path)
+            with open(self.validators_path(extract_path), "w", encoding='utf-8') as validators_file:
+                json.dump(self.pending_validators, validators_file)
+        finally:
+            r.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def iter_lines(chunks):
+        """
+        Re-splits text chunks into lines, keeping line endings so quoted
+        multi-line CSV fields survive.
+
+        :param chunks: Iterable of text chunks.
+        :return: Generator of lines.
+        """
+        partial = ""
+        for chunk in chunks:
+            lines = (partial + chunk).splitlines(keepends=True)
+            partial = lines.pop() if lines and not lines[-1].endswith(("\n", "\r")) else ""
+            yield from lines
+        if partial:
+            yield partial
+
+    def stream_rows(self):
+        """
+        Downloads the spreadsheet and yields parsed rows as they arrive, saving the
+        raw CSV along the way. Memory use does not grow with the size of the sheet.
+
+        :return: Generator of row dictionaries; empty if the sheet is unchanged.
+        """
+        r = self.open_stream()
+        if r is None:
+            return
+        yield from self.parse_stream(r)
+
+    def parse_stream(self, r):
+        """
+        Parses an open download into rows, saving the raw CSV along the way.
+
+        :param r: Streaming response from open_stream().
+        :return: Generator of row dictionaries.
+        """
+        extract_path = f"{self.config_dict.get('download_dir')}raw_addresses.csv"
+        yield from csv.DictReader(self.iter_lines(self.iter_download(r, extract_path)), delimiter=',')
 
     def extract(self):
         """
         Extracts data from a Google spreadsheet and saves it to a local CSV file.
+        The body is streamed to disk in chunks, so extract runs in constant memory.
+        In incremental mode the request is conditional on the stored ETag/Last-Modified,
+        and a 304 response marks the sheet as unchanged without downloading it.
 
         :return: None
         """
@@ -32,53 +321,413 @@ class GSheetsEtl(SpatialEtl):
             print(GSheetsEtl.extract.__doc__)
             help(GSheetsEtl.extract)
             print("Extracting addresses from Google Forms spreadsheet")
-            r = requests.get(self.config_dict.get('remote_url'))
-            r.encoding = "utf-8"
-            data = r.text
+            r = self.open_stream()
+            if r is None:
+                return
             extract_path = f"{self.config_dict.get('download_dir')}raw_addresses.csv"
-            with open(extract_path, 'w', encoding='utf-8') as output_file:
-                output_file.write(data)
+            for _ in self.iter_download(r, extract_path):
+                pass
             print(f"Data extracted to {extract_path}")
         except Exception as e:
             print(f"Error in GSheetsEtl.extract: {e}")
 
+    def open_geocode_cache(self):
+        """
+        Opens the persistent geocode cache stored next to download_dir.
+
+        :return: GeocodeCache instance.
+        """
+        cache_path = os.path.join(self.config_dict.get('download_dir', ''),
+                                  self.config_dict.get('geocode_cache_name', 'geocode_cache.sqlite'))
+        return GeocodeCache(cache_path,
+                            ttl_seconds=self.config_dict.get('geocode_cache_ttl_days', 30) * 24 * 3600,
+                            negative_ttl_seconds=self.config_dict.get('geocode_cache_negative_ttl_hours', 24) * 3600,
+                            max_entries=self.config_dict.get('geocode_cache_max_entries', 50000),
+                            access_flush_every=self.config_dict.get('geocode_cache_flush_every', 500))
+
+    @property
+    def geocoder(self):
+        """
+        Geocoder chain built from the 'geocoders' config key, created on first use.
+
+        :return: GeocoderChain instance.
+        """
+        if self._geocoder is None:
+            self._geocoder = build_geocoder(self.config_dict, self.geocoder_session)
+        return self._geocoder
+
+    def geocode(self, address):
+        """
+        Geocodes a single address through the configured geocoder chain.
+
+        :param address: Full address string including city and state.
+        :return: (lon, lat) tuple, or None if no provider found a match.
+        """
+        return self.geocoder.geocode(address)
+
+    def geocode_cached(self, street_address, cache):
+        """
+        Resolves one street address through the cache, falling back to the
+        geocoder chain on a cache miss.
+
+        :param street_address: 'Street Address' value from the form.
+        :param cache: GeocodeCache instance.
+        :return: (lon, lat) tuple, None for no match, or the Exception raised by the providers.
+        """
+        city = self.config_dict.get('city', 'Boulder')
+        state = self.config_dict.get('state', 'CO')
+        result = cache.get(street_address, city, state, self.geocoder.name)
+        if result is not None:
+            return result or None
+        address = f"{street_address} {city} {state}"
+        print(f"Geocoding address: {address}")
+        try:
+            result = self.geocode(address)
+        except Exception as e:
+            return e
+        cache.put(street_address, city, state, self.geocoder.name, result)
+        return result
+
+    def geocode_once(self, street_address, cache, in_flight, lock):
+        """
+        Geocodes an address at most once per run: rows normalizing to the same
+        address wait for, and share, the result of the first one.
+
+        :param street_address: 'Street Address' value from the form.
+        :param cache: GeocodeCache instance.
+        :param in_flight: Dictionary of normalized address -> Future, shared by the workers.
+        :param lock: Lock guarding in_flight.
+        :return: Same as geocode_cached.
+        """
+        address = normalize_address(street_address, drop_units=True)
+        with lock:
+            self.geocoded_rows += 1
+            future = in_flight.get(address)
+            first = future is None
+            if first:
+                future = in_flight[address] = Future()
+                self.unique_addresses += 1
+        if first:
+            try:
+                future.set_result(self.geocode_cached(address, cache))
+            except Exception as e:
+                # Resolve the Future either way, so rows waiting on this address do not block forever
+                future.set_exception(e)
+                raise
+        return future.result()
+
+    def report_dedupe(self):
+        """
+        Prints how many geocoding requests address normalization saved.
+
+        :return: None
+        """
+        if self.geocoded_rows:
+            print(f"Address dedupe: {self.geocoded_rows} rows -> {self.unique_addresses} unique addresses "
+                  f"(ratio {self.geocoded_rows / self.unique_addresses:.2f}, "
+                  f"{self.geocoded_rows - self.unique_addresses} geocodes saved)")
+
     def transform(self, input_file, output_file):
         """
-        Geocodes addresses using Nominatim and writes results to output CSV.
+        Geocodes addresses with the configured geocoder chain and writes results to output CSV.
+        Results are cached on disk so addresses geocoded in a previous run are not requested again.
+        Cache misses are geocoded by a pool of worker threads sharing each provider's rate limit;
+        rows are still written in input order.
+
+        Street addresses are normalized first (case, whitespace, suffix and direction spellings,
+        unit designators), each unique address is geocoded once and its result is shared by
+        every row with that address.
+
+        Progress is checkpointed every geocode_checkpoint_every addresses and when the run is
+        interrupted. A rerun on the same input resumes from the checkpoint (geocode_resume);
+        the checkpoint is removed once the output has been written.
+
+        In incremental mode each row is hashed and compared with the previous snapshot. Only
+        new or edited rows are geocoded; they are also written to changed_addresses.csv so
+        load can append just those points. The new snapshot is kept in pending_state until
+        commit_extract_state() is called after a successful load.
+
+        Errors are re-raised after printing, so the caller skips load and the state
+        commit instead of loading a previous run's output.
 
         :param input_file: Path to raw address CSV file.
         :param output_file: Path to save the transformed geocoded CSV.
         :return: None
         """
+        self.append_only = False
         try:
-            print("Transforming data using Nominatim OpenStreetMap Geocoder")
+            print(f"Transforming data using geocoder chain {self.geocoder.name}")
             print(GSheetsEtl.transform.__doc__)
             help(GSheetsEtl.transform)
-            with open(output_file, "w", encoding='utf-8') as transformed_file:
-                transformed_file.write("X,Y,Type\n")
-                with open(input_file, "r", encoding='utf-8') as partial_file:
-                    csv_dict = csv.DictReader(partial_file, delimiter=',')
-                    for row in csv_dict:
-                        address = row["Street Address"] + f" {self.config_dict.get('city', 'Boulder')} {self.config_dict.get('state', 'CO')}"
-                        print(f"Geocoding address: {address}")
-                        geocode_url = "https://nominatim.openstreetmap.org/search"
-                        params = {'q': address, 'format': 'json', 'limit': 1}
-                        headers = {'User-Agent': 'GIS305-FinalProject-Geocoder'}
-                        try:
-                            r = requests.get(geocode_url, params=params, headers=headers, timeout=10)
-                            r.raise_for_status()
-                            results = r.json()
-                            if results:
-                                lon = results[0]['lon']
-                                lat = results[0]['lat']
-                                transformed_file.write(f"{lon},{lat},Residential\n")
-                            else:
-                                print(f"No matches found for address: {address}")
-                        except Exception as e:
-                            print(f"Geocoding failed for address '{address}': {e}")
+            city = self.config_dict.get('city', 'Boulder')
+            state = self.config_dict.get('state', 'CO')
+            incremental = self.config_dict.get('incremental_extract', False)
+            workers = self.config_dict.get('geocode_workers', 4)
+
+            with open(input_file, "r", encoding='utf-8') as partial_file:
+                rows = list(csv.DictReader(partial_file, delimiter=','))
+            hashes = [self.row_hash(row) for row in rows]
+            previous_rows = self.read_extract_state().get('rows', {}) if incremental else {}
+            pending = [i for i, h in enumerate(hashes) if h not in previous_rows]
+            self.added_rows = len(pending)
+            self.removed_rows = len(set(previous_rows) - set(hashes))
+            if incremental:
+                print(f"Row diff: {self.added_rows} new or edited, {self.removed_rows} removed, "
+                      f"{len(rows) - self.added_rows} unchanged")
+
+            normalized = {i: normalize_address(rows[i]["Street Address"], drop_units=True) for i in pending}
+            unique = list(dict.fromkeys(normalized.values()))
+            self.geocoded_rows, self.unique_addresses = len(pending), len(unique)
+            self.report_dedupe()
+            snapshot_id = self.input_snapshot(input_file, unique)
+            geocoded = self.read_checkpoint(snapshot_id)
+            todo = [address for address in unique if address not in geocoded]
+            checkpoint_every = self.config_dict.get('geocode_checkpoint_every', 100)
+            finished = False
+            cache = self.open_geocode_cache()
+            try:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    # executor.map yields results in submission order, keeping the output deterministic
+                    for done, (address, result) in enumerate(
+                            zip(todo, executor.map(lambda a: self.geocode_cached(a, cache), todo)), start=1):
+                        geocoded[address] = result
+                        if done % checkpoint_every == 0:
+                            self.write_checkpoint(snapshot_id, geocoded, len(unique) - len(todo) + done,
+                                                  len(unique))
+                results = [geocoded[normalized[i]] for i in pending]
+                finished = True
+            finally:
+                if not finished and todo:
+                    self.write_checkpoint(snapshot_id, geocoded, len(geocoded), len(unique))
+                    print(f"Geocoding interrupted, progress saved to {self.checkpoint_path()}")
+                cache.report()
+                cache.close()
+                self.geocoder.report()
+                self.report_pool_stats()
+
+            snapshot = {h: previous_rows[h] for h in hashes if h in previous_rows}
+            changed = set(pending)
+            for i, result in zip(pending, results):
+                address = f"{rows[i]['Street Address']} {city} {state}"
+                # Failed and unmatched rows stay out of the snapshot so the next run retries
+                # them; the geocode cache decides whether that retry reaches the provider
+                if isinstance(result, Exception):
+                    print(f"Geocoding failed for address '{address}': {result}")
+                elif not result:
+                    print(f"No matches found for address: {address}")
+                else:
+                    snapshot[hashes[i]] = list(result)
+
+            changes_file = os.path.join(os.path.dirname(output_file), 'changed_addresses.csv')
+            # Written under a temporary name so an interrupted write never leaves a truncated output
+            with open(output_file + ".tmp", "w", encoding='utf-8') as transformed_file, \
+                    open(changes_file, "w", encoding='utf-8') as changed_file:
+                transformed_file.write("X,Y,Type,AddrKey\n")
+                changed_file.write("X,Y,Type,AddrKey\n")
+                for i, h in enumerate(hashes):
+                    if h in snapshot:
+                        lon, lat = snapshot[h]
+                        key = self.address_key(rows[i]['Street Address'])
+                        transformed_file.write(f"{lon},{lat},Residential,{key}\n")
+                        if i in changed:
+                            changed_file.write(f"{lon},{lat},Residential,{key}\n")
+            os.replace(output_file + ".tmp", output_file)
+            self.clear_checkpoint()
+            # Only set once changed_addresses.csv is this run's, since an append load reads it
+            self.append_only = bool(previous_rows) and self.removed_rows == 0
+
+            if incremental:
+                # A transform in another process than the download reads the validators saved with the file
+                validators = self.pending_validators or self.read_validators(input_file)
+                self.pending_state = dict(validators, rows=snapshot)
             print(f"Transformation complete. Data written to {output_file}")
         except Exception as e:
             print(f"Error in GSheetsEtl.transform: {e}")
+            raise
+
+    def stream_process(self, output_file, create_output, load_batch):
+        """
+        Pipelined extract -> transform -> load. A download thread parses rows as
+        the sheet streams in, geocode_workers threads geocode them, and the calling
+        thread appends the points to the output in batches of pipeline_batch_size.
+        The stages are connected by queues holding at most pipeline_queue_size
+        items, so a slow stage holds back the ones before it instead of letting
+        rows pile up in memory, and the run takes about as long as its slowest stage.
+
+        Rows are written to output_file in the order they finish geocoding. Rows
+        with the same normalized address share one geocode (see geocode_once). In
+        incremental mode rows already in the snapshot reuse their stored point.
+        A row that cannot be processed is reported and skipped like a failed
+        geocode; once the pipeline stops, every thread gives up on its queue.
+
+        :param output_file: Path to save the geocoded CSV.
+        :param create_output: Callable creating the (empty) output, called once the download has started.
+        :param load_batch: Callable taking a list of (lon, lat, type, key) tuples to append to the output.
+        :return: Number of points loaded, or None if the sheet is unchanged.
+        """
+        print("Running pipelined extract, transform and load")
+        city = self.config_dict.get('city', 'Boulder')
+        state = self.config_dict.get('state', 'CO')
+        incremental = self.config_dict.get('incremental_extract', False)
+        workers = self.config_dict.get('geocode_workers', 4)
+        batch_size = self.config_dict.get('pipeline_batch_size', 500)
+        rows_queue = queue.Queue(maxsize=self.config_dict.get('pipeline_queue_size', 256))
+        points_queue = queue.Queue(maxsize=self.config_dict.get('pipeline_queue_size', 256))
+        done = object()
+        stop = threading.Event()
+
+        r = self.open_stream()
+        if r is None:
+            return None
+        previous_rows = self.read_extract_state().get('rows', {}) if incremental else {}
+        download_errors = []
+        in_flight = {}
+        in_flight_lock = threading.Lock()
+        self.geocoded_rows = self.unique_addresses = 0
+
+        def put(target, item):
+            # Gives up once the pipeline is stopping, so no thread stays blocked on a full queue
+            while not stop.is_set():
+                try:
+                    target.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def download():
+            try:
+                for row in self.parse_stream(r):
+                    if not put(rows_queue, row):
+                        break
+            except Exception as e:
+                download_errors.append(e)
+            finally:
+                for _ in range(workers):
+                    put(rows_queue, done)
+
+        def geocode_rows():
+            try:
+                while not stop.is_set():
+                    try:
+                        row = rows_queue.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    if row is done:
+                        break
+                    h = None
+                    try:
+                        h = self.row_hash(row)
+                        if h in previous_rows:
+                            item = (h, row, tuple(previous_rows[h]), False)
+                        else:
+                            item = (h, row, self.geocode_once(row["Street Address"], cache, in_flight,
+                                                              in_flight_lock), True)
+                    except Exception as e:
+                        # A malformed row is reported like a failed geocode instead of ending the worker
+                        item = (h, row, e, True)
+                    put(points_queue, item)
+            finally:
+                put(points_queue, done)
+
+        create_output()
+        cache = self.open_geocode_cache()
+        threads = [threading.Thread(target=download, daemon=True)]
+        threads += [threading.Thread(target=geocode_rows, daemon=True) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+
+        snapshot = {}
+        seen = set()
+        batch = []
+        loaded = 0
+        changes_file = os.path.join(os.path.dirname(output_file), 'changed_addresses.csv')
+        try:
+            with open(output_file + ".tmp", "w", encoding='utf-8') as transformed_file, \
+                    open(changes_file, "w", encoding='utf-8') as changed_file:
+                transformed_file.write("X,Y,Type,AddrKey\n")
+                changed_file.write("X,Y,Type,AddrKey\n")
+                finished = 0
+                while finished < workers:
+                    item = points_queue.get()
+                    if item is done:
+                        finished += 1
+                        continue
+                    h, row, result, fresh = item
+                    if h is not None:
+                        seen.add(h)
+                    address = f"{row.get('Street Address')} {city} {state}"
+                    if isinstance(result, Exception):
+                        print(f"Geocoding failed for address '{address}': {result}")
+                        continue
+                    if not result:
+                        print(f"No matches found for address: {address}")
+                        continue
+                    lon, lat = result
+                    key = self.address_key(row['Street Address'])
+                    snapshot[h] = [lon, lat]
+                    transformed_file.write(f"{lon},{lat},Residential,{key}\n")
+                    if fresh:
+                        changed_file.write(f"{lon},{lat},Residential,{key}\n")
+                    batch.append((lon, lat, "Residential", key))
+                    if len(batch) >= batch_size:
+                        load_batch(batch)
+                        loaded += len(batch)
+                        batch = []
+                if batch:
+                    load_batch(batch)
+                    loaded += len(batch)
+        finally:
+            # After a failed load the threads see the stop event and leave their queues
+            stop.set()
+            for thread in threads:
+                thread.join()
+            self.report_dedupe()
+            cache.report()
+            cache.close()
+            self.geocoder.report()
+            self.report_pool_stats()
+        if download_errors:
+            raise download_errors[0]
+        os.replace(output_file + ".tmp", output_file)
+
+        self.added_rows = len(seen - set(previous_rows))
+        self.removed_rows = len(set(previous_rows) - seen)
+        self.append_only = False
+        if incremental:
+            print(f"Row diff: {self.added_rows} new or edited, {self.removed_rows} removed, "
+                  f"{len(seen) - self.added_rows} unchanged")
+            self.write_extract_state(dict(self.pending_validators, rows=snapshot))
+        print(f"Pipelined ETL complete: {loaded} points loaded, data written to {output_file}")
+        return loaded
+
+    def create_feature_class(self):
+        """
+        Creates an empty WGS84 point feature class for the pipelined load.
+
+        :return: None
+        """
+        import arcpy
+        arcpy.env.workspace = self.config_dict.get('gdb_path', r"C:\\default\\path\\to\\geodatabase.gdb")
+        arcpy.env.overwriteOutput = True
+        out_feature_class = self.config_dict.get('avoid_points_name', 'Avoid_Points')
+        arcpy.management.CreateFeatureclass(arcpy.env.workspace, out_feature_class, "POINT",
+                                            spatial_reference=arcpy.SpatialReference(4326))
+        for field_name, field_type in (("X", "DOUBLE"), ("Y", "DOUBLE"), ("Type", "TEXT"), ("AddrKey", "TEXT")):
+            arcpy.management.AddField(out_feature_class, field_name, field_type)
+
+    def insert_batch(self, points):
+        """
+        Appends a batch of points with one InsertCursor.
+
+        :param points: List of (lon, lat, type, key) tuples.
+        :return: None
+        """
+        import arcpy
+        out_feature_class = self.config_dict.get('avoid_points_name', 'Avoid_Points')
+        with arcpy.da.InsertCursor(out_feature_class, ["SHAPE@XY", "X", "Y", "Type", "AddrKey"]) as cursor:
+            for lon, lat, point_type, key in points:
+                cursor.insertRow(((lon, lat), lon, lat, point_type, key))
 
     def load(self, input_table):
         """
@@ -91,6 +740,8 @@ class GSheetsEtl(SpatialEtl):
             print(GSheetsEtl.load.__doc__)
             help(GSheetsEtl.load)
             print("Loading transformed data into geospatial feature class")
+            # Only load() needs ArcGIS, so the rest of the ETL runs without it
+            import arcpy
             arcpy.env.workspace = self.config_dict.get('gdb_path', r"C:\\default\\path\\to\\geodatabase.gdb")
             arcpy.env.overwriteOutput = True
             out_feature_class = self.config_dict.get('avoid_points_name', 'Avoid_Points')
@@ -100,6 +751,8 @@ class GSheetsEtl(SpatialEtl):
             print(f"Feature class '{out_feature_class}' created successfully.")
         except Exception as e:
             print(f"Error in GSheetsEtl.load: {e}")
+            # process() must not record the incremental state for a load that failed
+            raise
 
     def process(self):
         """
@@ -112,8 +765,16 @@ class GSheetsEtl(SpatialEtl):
             help(GSheetsEtl.process)
             raw_csv = f"{self.config_dict.get('download_dir')}raw_addresses.csv"
             transformed_csv = f"{self.config_dict.get('download_dir')}new_addresses.csv"
+            if self.config_dict.get('pipelined_etl', False):
+                if self.stream_process(transformed_csv, self.create_feature_class, self.insert_batch) is None:
+                    print("No changes to process")
+                return
             self.extract()
+            if self.sheet_unchanged:
+                print("No changes to process")
+                return
             self.transform(raw_csv, transformed_csv)
             self.load(transformed_csv)
+            self.commit_extract_state()
         except Exception as e:
             print(f"Error in GSheetsEtl.process: {e}")
\ No newline at end of file
@@ -0,0 +1,203 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class GeocodeCache:
+    """
+    Persistent SQLite cache of geocoder results so reruns of the ETL do not
+    hit the geocoding provider for addresses that were already resolved.
+
+    Entries are keyed by the normalized address, city, state and provider.
+    Matches live for ``ttl_seconds``; "no match" results are also stored but
+    expire after the shorter ``negative_ttl_seconds``. Once the cache holds more
+    than ``max_entries`` rows the least recently used rows are evicted. Access
+    times of cache hits are written in one transaction every
+    ``access_flush_every`` hits and on close, not one commit per lookup.
+
+    :param db_path: Path to the SQLite cache file.
+    :param ttl_seconds: Lifetime of a successful geocode.
+    :param negative_ttl_seconds: Lifetime of a "no match" result.
+    :param max_entries: Maximum number of rows kept in the cache.
+    :param access_flush_every: Number of hits whose access times are batched into one commit.
+    :return: None
+    """
+
+    # Returned by get() when the provider previously found no match
+    NO_MATCH = ()
+
+    def __init__(self, db_path, ttl_seconds=30 * 24 * 3600, negative_ttl_seconds=24 * 3600, max_entries=50000,
+                 access_flush_every=500):
+        """
+        Opens (or creates) the cache database.
+
+        :param db_path: Path to the SQLite cache file.
+        :param ttl_seconds: Lifetime of a successful geocode.
+        :param negative_ttl_seconds: Lifetime of a "no match" result.
+        :param max_entries: Maximum number of rows kept in the cache.
+        :param access_flush_every: Number of hits whose access times are batched into one commit.
+        :return: None
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self.access_flush_every = access_flush_every
+        # cache_key -> last access time of hits not yet written to the database
+        self._accessed = {}
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        cache_dir = os.path.dirname(db_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocode_cache ("
+            "cache_key TEXT PRIMARY KEY, "
+            "provider TEXT NOT NULL, "
+            "found INTEGER NOT NULL, "
+            "x REAL, "
+            "y REAL, "
+            "created REAL NOT NULL, "
+            "last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_geocode_last_access ON geocode_cache (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(address, city, state, provider):
+        """
+        Builds the cache key from the normalized address parts and provider.
+
+        :param address: Street address as entered in the form.
+        :param city: City appended to the address.
+        :param state: State appended to the address.
+        :param provider: Name of the geocoding provider.
+        :return: Cache key string.
+        """
+        parts = [address, city, state, provider]
+        return "|".join(" ".join(str(part or "").lower().replace(",", " ").split()) for part in parts)
+
+    def get(self, address, city, state, provider):
+        """
+        Looks up a cached geocode.
+
+        :return: (x, y) tuple for a match, GeocodeCache.NO_MATCH for a cached
+                 "no match" result, or None when nothing usable is cached.
+        """
+        key = self.make_key(address, city, state, provider)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT found, x, y, created FROM geocode_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            found, x, y, created = row
+            ttl = self.ttl_seconds if found else self.negative_ttl_seconds
+            if now - created > ttl:
+                # Committed with the next put or access flush, like the access times
+                self._conn.execute("DELETE FROM geocode_cache WHERE cache_key = ?", (key,))
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._accessed[key] = now
+            if len(self._accessed) >= self.access_flush_every:
+                self._flush_accessed()
+                self._conn.commit()
+            self.hits += 1
+            return (x, y) if found else GeocodeCache.NO_MATCH
+
+    def put(self, address, city, state, provider, result):
+        """
+        Stores a geocode result.
+
+        :param result: (x, y) tuple for a match, or None/NO_MATCH for no match.
+        :return: None
+        """
+        key = self.make_key(address, city, state, provider)
+        now = time.time()
+        found = 1 if result else 0
+        x, y = result if result else (None, None)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocode_cache (cache_key, provider, found, x, y, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, found, x, y, now, now)
+            )
+            self._accessed.pop(key, None)
+            self._evict()
+            self._conn.commit()
+
+    def _flush_accessed(self):
+        """
+        Writes the pending access times of cache hits. Caller holds the lock and commits.
+
+        :return: None
+        """
+        if self._accessed:
+            self._conn.executemany("UPDATE geocode_cache SET last_access = ? WHERE cache_key = ?",
+                                   [(accessed, key) for key, accessed in self._accessed.items()])
+            self._accessed.clear()
+
+    def _evict(self):
+        """
+        Removes the least recently used rows beyond max_entries. Caller holds the lock.
+
+        :return: None
+        """
+        # Eviction orders by last_access, so recent hits must be in the table first
+        self._flush_accessed()
+        count = self._conn.execute("SELECT COUNT(*) FROM geocode_cache").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM geocode_cache WHERE cache_key IN "
+                "(SELECT cache_key FROM geocode_cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+            self.evicted += overflow
+
+    def stats(self):
+        """
+        Returns the hit/miss counters for this run.
+
+        :return: Dictionary of cache statistics.
+        """
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM geocode_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'expired': self.expired,
+            'evicted': self.evicted,
+            'size': size,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def report(self):
+        """
+        Prints the hit/miss counters for this run.
+
+        :return: None
+        """
+        s = self.stats()
+        print(f"Geocode cache: {s['hits']} hits, {s['misses']} misses ({s['hit_rate']:.0%} hit rate), "
+              f"{s['expired']} expired, {s['evicted']} evicted, {s['size']} entries in {self.db_path}")
+
+    def close(self):
+        """
+        Writes the pending access times and closes the cache database.
+
+        :return: None
+        """
+        with self._lock:
+            self._flush_accessed()
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,411 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import quote_plus
+
+from etl.AddressPointIndex import AddressPointIndex
+from etl.RateLimiter import get_rate_limiter
+
+
+class GeocoderError(Exception):
+    """
+    Raised by a backend when the provider failed in a way worth retrying
+    (HTTP 429, 5xx, timeouts or connection errors).
+    """
+
+    def __init__(self, message, retry_after=None):
+        """
+        :param message: Error description.
+        :param retry_after: Seconds the provider asked us to wait, if it said so.
+        :return: None
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(GeocoderError):
+    """
+    Raised instead of calling a provider whose circuit breaker is open.
+    """
+
+
+class GeocoderBackend:
+    """
+    Base class for geocoding providers. HTTP backends implement request_args() and
+    parse(); other backends override geocode(). Lookups return (x, y) in WGS84
+    longitude/latitude, or None when there is no match.
+
+    :param config_dict: ETL configuration dictionary.
+    :param session: Shared geocoder requests.Session from SpatialEtl, without urllib3 status retries.
+    :return: None
+    """
+
+    name = None
+
+    def __init__(self, config_dict, session):
+        """
+        Initializes the backend and its shared rate limiter.
+
+        :param config_dict: ETL configuration dictionary.
+        :param session: Shared geocoder requests.Session from SpatialEtl.
+        :return: None
+        """
+        self.config_dict = config_dict
+        self.session = session
+        rates = config_dict.get('geocoder_rate_limits') or {}
+        self.limiter = get_rate_limiter(self.name, rates.get(self.name))
+        self.timeout = config_dict.get('geocode_timeout_seconds', 10)
+
+    def geocode(self, address, on_send=None):
+        """
+        Rate-limits and runs one lookup, translating retryable HTTP failures into GeocoderError.
+
+        :param address: Full address string including city and state.
+        :param on_send: Optional callable run once the rate limiter let the request through.
+        :return: (x, y) tuple or None.
+        """
+        self.limiter.acquire()
+        if on_send is not None:
+            on_send()
+        try:
+            r = self.session.get(*self.request_args(address), timeout=self.timeout)
+        except Exception as e:
+            raise GeocoderError(f"{self.name} request failed: {e}")
+        if r.status_code == 429 or r.status_code >= 500:
+            retry_after = r.headers.get('Retry-After')
+            raise GeocoderError(f"{self.name} returned HTTP {r.status_code}",
+                                float(retry_after) if retry_after and retry_after.isdigit() else None)
+        r.raise_for_status()
+        return self.parse(r.json())
+
+    def request_args(self, address):
+        """
+        Returns the (url, params) for a lookup.
+
+        :param address: Full address string.
+        :return: Tuple of url and query parameters.
+        """
+        raise NotImplementedError
+
+    def parse(self, response_json):
+        """
+        Extracts the coordinates from the provider's JSON response.
+
+        :param response_json: Decoded JSON body.
+        :return: (x, y) tuple or None.
+        """
+        raise NotImplementedError
+
+    def report(self):
+        """
+        Prints backend-specific statistics, if any.
+
+        :return: None
+        """
+        pass
+
+
+class NominatimGeocoder(GeocoderBackend):
+    """
+    OpenStreetMap Nominatim search API.
+    """
+
+    name = 'nominatim'
+
+    def request_args(self, address):
+        url = self.config_dict.get('nominatim_url', "https://nominatim.openstreetmap.org/search")
+        return url, {'q': address, 'format': 'json', 'limit': 1}
+
+    def parse(self, response_json):
+        if response_json:
+            return float(response_json[0]['lon']), float(response_json[0]['lat'])
+        return None
+
+
+class CensusGeocoder(GeocoderBackend):
+    """
+    US Census one-line address geocoder, using geocoder_prefix_url/geocoder_suffix_url from the config.
+    """
+
+    name = 'census'
+
+    def request_args(self, address):
+        prefix = self.config_dict.get('geocoder_prefix_url',
+                                      'https://geocoding.geo.census.gov/geocoder/locations/onelineaddress?address=')
+        suffix = self.config_dict.get('geocoder_suffix_url', '&benchmark=2020&format=json')
+        return f"{prefix}{quote_plus(address)}{suffix}", None
+
+    def parse(self, response_json):
+        matches = response_json['result']['addressMatches']
+        if matches:
+            return float(matches[0]['coordinates']['x']), float(matches[0]['coordinates']['y'])
+        return None
+
+
+class AddressPointGeocoder(GeocoderBackend):
+    """
+    Offline geocoder backed by an AddressPointIndex built from the Building_Addresses
+    layer in the project geodatabase. The index is saved next to download_dir and
+    rebuilt when it is older than address_index_max_age_days.
+    """
+
+    name = 'address_points'
+
+    def __init__(self, config_dict, session):
+        super().__init__(config_dict, session)
+        self._index = None
+        self._index_lock = threading.Lock()
+
+    @property
+    def index(self):
+        """
+        Loads the saved index, building it from the geodatabase if it is missing or stale.
+
+        :return: AddressPointIndex instance.
+        """
+        with self._index_lock:
+            if self._index is None:
+                index_path = self.config_dict.get('address_index_path') or os.path.join(
+                    self.config_dict.get('download_dir', ''), 'address_index.json')
+                max_age = self.config_dict.get('address_index_max_age_days', 30) * 24 * 3600
+                min_similarity = self.config_dict.get('address_index_min_similarity', 0.5)
+                if os.path.exists(index_path) and time.time() - os.path.getmtime(index_path) < max_age:
+                    self._index = AddressPointIndex.load(index_path, min_similarity=min_similarity)
+                else:
+                    layer = os.path.join(self.config_dict.get('gdb_path', ''),
+                                         self.config_dict.get('address_layer', 'Building_Addresses'))
+                    print(f"Building address point index from {layer}")
+                    self._index = AddressPointIndex.from_feature_class(layer, min_similarity=min_similarity)
+                    self._index.save(index_path)
+                print(f"Address point index ready with {len(self._index)} addresses")
+            return self._index
+
+    def geocode(self, address, on_send=None):
+        """
+        Looks the street address up locally; no network or rate limit is involved.
+
+        :param address: Full address string including city and state.
+        :param on_send: Optional callable run before the lookup.
+        :return: (x, y) tuple or None.
+        """
+        if on_send is not None:
+            on_send()
+        suffix = f" {self.config_dict.get('city', 'Boulder')} {self.config_dict.get('state', 'CO')}"
+        if address.endswith(suffix):
+            address = address[:-len(suffix)]
+        return self.index.lookup(address)
+
+    def report(self):
+        if self._index is not None:
+            print(f"Address point index: {self._index.exact_hits} exact, {self._index.fuzzy_hits} fuzzy, "
+                  f"{self._index.misses} misses")
+
+
+class CircuitBreaker:
+    """
+    Stops calling a provider after ``failure_threshold`` consecutive failures.
+    After ``reset_seconds`` one trial call is let through (half-open); success
+    closes the circuit again, failure re-opens it.
+
+    :param failure_threshold: Consecutive failures that open the circuit.
+    :param reset_seconds: Time the circuit stays open before a trial call.
+    :return: None
+    """
+
+    def __init__(self, failure_threshold=5, reset_seconds=60):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """
+        :return: 'closed', 'open' or 'half-open'.
+        """
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        """
+        :return: True if a call may be made now.
+        """
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+class GeocoderChain:
+    """
+    Ordered fallback chain of geocoder backends.
+
+    Each backend call retries 429/5xx failures with exponential backoff and is
+    guarded by a per-backend circuit breaker. If a backend has not answered
+    within ``hedge_after`` seconds of its request being sent (time spent waiting
+    for its rate limiter does not count), the next backend is started in
+    parallel and the first match wins. A backend that answers "no match" or fails also hands
+    over to the next backend straight away.
+
+    :param backends: List of GeocoderBackend instances in priority order.
+    :param hedge_after: Latency budget in seconds before hedging, or None to disable.
+    :param max_retries: Retries per backend for retryable failures.
+    :param backoff_seconds: Base delay for exponential backoff.
+    :param breaker_failures: Consecutive failures that open a backend's circuit.
+    :param breaker_reset_seconds: Time before an open circuit allows a trial call.
+    :return: None
+    """
+
+    def __init__(self, backends, hedge_after=None, max_retries=2, backoff_seconds=1.0,
+                 breaker_failures=5, breaker_reset_seconds=60):
+        if not backends:
+            raise ValueError("GeocoderChain needs at least one backend")
+        self.backends = backends
+        self.name = ">".join(b.name for b in backends)
+        self.hedge_after = hedge_after
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.breakers = {b.name: CircuitBreaker(breaker_failures, breaker_reset_seconds) for b in backends}
+        self.hedged = 0
+        # Two threads per backend leaves room for abandoned slow calls when a hedge wins
+        self._executor = ThreadPoolExecutor(max_workers=max(2, 2 * len(backends)))
+
+    def call_backend(self, backend, address, on_send=None):
+        """
+        Calls one backend with retries, exponential backoff and the circuit breaker.
+
+        :param backend: GeocoderBackend instance.
+        :param address: Full address string.
+        :param on_send: Optional callable run each time a request is sent.
+        :return: (x, y) tuple or None.
+        """
+        breaker = self.breakers[backend.name]
+        for attempt in range(self.max_retries + 1):
+            if not breaker.allow():
+                raise CircuitOpenError(f"{backend.name} circuit is open")
+            try:
+                result = backend.geocode(address, on_send)
+            except GeocoderError as e:
+                breaker.record_failure()
+                if attempt == self.max_retries:
+                    raise
+                delay = e.retry_after or self.backoff_seconds * (2 ** attempt)
+                time.sleep(delay + random.uniform(0, self.backoff_seconds))
+                continue
+            except Exception:
+                breaker.record_failure()
+                raise
+            breaker.record_success()
+            return result
+
+    def geocode(self, address):
+        """
+        Geocodes an address through the chain.
+
+        :param address: Full address string including city and state.
+        :return: (x, y) tuple, or None if every backend answered "no match".
+        """
+        pending = {}
+        remaining = list(self.backends)
+        last_error = None
+        # Time each backend's first request was sent; the newest backend's latency budget starts there
+        sent_at = {}
+        newest = None
+
+        def submit(backend):
+            pending[self._executor.submit(self.call_backend, backend, address,
+                                          lambda: sent_at.setdefault(backend.name, time.monotonic()))] = backend
+            return backend
+
+        while remaining or pending:
+            if remaining and not pending:
+                newest = submit(remaining.pop(0))
+            timeout = None
+            if remaining and self.hedge_after is not None:
+                sent = sent_at.get(newest.name)
+                # Still waiting for a rate limiter token: poll until the request goes out
+                timeout = (max(0.0, sent + self.hedge_after - time.monotonic()) if sent is not None
+                           else 0.01)
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                sent = sent_at.get(newest.name)
+                if sent is not None and time.monotonic() - sent >= self.hedge_after:
+                    # Latency budget exceeded: hedge with the next backend
+                    self.hedged += 1
+                    newest = submit(remaining.pop(0))
+                continue
+            for future in done:
+                pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                if result:
+                    return result
+        if last_error is not None:
+            # Only report a failure if no backend gave a definite "no match"
+            raise last_error
+        return None
+
+    def report(self):
+        """
+        Prints the breaker state of each backend and how often requests were hedged.
+
+        :return: None
+        """
+        states = ", ".join(f"{name}: {b.state}" for name, b in self.breakers.items())
+        print(f"Geocoder chain {self.name}: {self.hedged} hedged requests; circuits {states}")
+        for backend in self.backends:
+            backend.report()
+
+
+BACKENDS = {
+    AddressPointGeocoder.name: AddressPointGeocoder,
+    NominatimGeocoder.name: NominatimGeocoder,
+    CensusGeocoder.name: CensusGeocoder,
+}
+
+
+def build_geocoder(config_dict, session):
+    """
+    Builds the geocoder chain named by the 'geocoders' config key.
+
+    :param config_dict: ETL configuration dictionary.
+    :param session: Shared geocoder requests.Session, without urllib3 status retries.
+    :return: GeocoderChain instance.
+    """
+    names = config_dict.get('geocoders') or ['nominatim']
+    unknown = [n for n in names if n not in BACKENDS]
+    if unknown:
+        raise ValueError(f"Unknown geocoder backend(s): {unknown}")
+    return GeocoderChain([BACKENDS[n](config_dict, session) for n in names],
+                         hedge_after=config_dict.get('geocode_hedge_after_seconds'),
+                         max_retries=config_dict.get('geocode_max_retries', 2),
+                         backoff_seconds=config_dict.get('geocode_backoff_seconds', 1.0),
+                         breaker_failures=config_dict.get('circuit_breaker_failures', 5),
+                         breaker_reset_seconds=config_dict.get('circuit_breaker_reset_seconds', 60))
@@ -0,0 +1,76 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter. Each call to acquire() takes one
+    token and blocks until one is available, so callers never exceed ``rate``
+    requests per second on average, with bursts of at most ``capacity``.
+
+    :param rate: Tokens added per second.
+    :param capacity: Maximum number of tokens that can accumulate.
+    :return: None
+    """
+
+    def __init__(self, rate, capacity=None):
+        """
+        Initializes a full bucket.
+
+        :param rate: Tokens added per second.
+        :param capacity: Maximum burst size, defaults to max(1, rate).
+        :return: None
+        """
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive, got {rate}")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Takes one token, sleeping until one is available.
+
+        :return: Seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+# Default requests per second for each geocoding provider
+DEFAULT_RATES = {
+    'nominatim': 1,
+    'census': 20,
+}
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_rate_limiter(provider, rate=None):
+    """
+    Returns the process-wide token bucket for a provider so every ETL
+    instance shares the same request budget.
+
+    :param provider: Provider name, e.g. 'nominatim'.
+    :param rate: Requests per second; defaults to DEFAULT_RATES[provider].
+    :return: TokenBucket instance.
+    """
+    with _buckets_lock:
+        bucket = _buckets.get(provider)
+        if bucket is None or (rate is not None and bucket.rate != rate):
+            bucket = TokenBucket(rate if rate is not None else DEFAULT_RATES.get(provider, 1))
+            _buckets[provider] = bucket
+        return bucket
@@ -1,10 +1,22 @@
+import time
+# Taken before any other import so the reported startup time includes module loading
+START_TIME = time.perf_counter()
 import yaml
-import arcpy
+import argparse
+import csv
+import itertools
+import json
 import os
+import re
+import sys
 import logging
-import time
+import uuid
 from datetime import datetime
-from etl.GSheetsEtl import GSheetsEtl
+from gis.GeometryBackend import get_backend, parse_distance
+from gis.BufferRingStore import BufferRingStore
+from pipeline.DagExecutor import DagExecutor, StageRef
+from pipeline.StageCache import OUTPUT_CONFIG_KEYS, run_cached, open_stage_cache
+from pipeline.Tracer import tracer
 
 # --- Setup Functions ---
 
@@ -22,33 +34,10 @@ def setup_logging(config_dict):
         level=logging.DEBUG
     )
 
-def run_tool(tool_func, *args, **kwargs):
-    """
-        Wrapper for running ArcPy tools with timing and messaging.
-
-        Parameters:
-            tool_func (callable): ArcPy tool function.
-            *args: Positional arguments for the tool.
-            **kwargs: Keyword arguments for the tool.
-
-        Returns:
-            Result object returned by the ArcPy tool function.
-    """
-    tool_name = tool_func.__name__
-    print(f"Starting {tool_name}...")
-    start = time.time()
-
-    result = tool_func(*args, **kwargs)
-
-    duration = time.time() - start
-    print(f"Finished {tool_name} in {duration:.2f} seconds.")
-    print(arcpy.GetMessages())
-    return result
-
 def setup():
     """
-       Initializes the project environment: reads config, sets workspace,
-       output folders, and logging.
+       Initializes the project environment: reads config, sets the geodatabase path,
+       output folders, and logging. The geometry backend sets up its own workspace.
 
        Returns:
            dict: Configuration dictionary loaded from YAML.
@@ -56,9 +45,7 @@ def setup():
     logging.debug("Entering setup method")
     with open('config/wnvoutbreak.yaml') as f:
         config_dict = yaml.load(f, Loader=yaml.FullLoader)
-    arcpy.env.workspace = os.path.join(config_dict.get('proj_dir'), 'WestNileOutbreak.gdb')
-    config_dict['gdb_path'] = arcpy.env.workspace
-    arcpy.env.overwriteOutput = True
+    config_dict['gdb_path'] = os.path.join(config_dict.get('proj_dir'), 'WestNileOutbreak.gdb')
     output_folder = config_dict.get('output_folder', r"C:\\Users\\Owner\\Documents\\GIS Programming\\westnileoutbreak\\Output")
     os.makedirs(output_folder, exist_ok=True)
     config_dict['output_folder'] = output_folder
@@ -68,11 +55,17 @@ def setup():
 
 # --- ETL Functions ---
 
-def load(config_dict):
+@tracer.traced()
+def load(config_dict, append_only=False):
     """
        Converts the geocoded CSV into a point feature class.
+       With upsert_load set, an existing feature class is updated in place by
+       address key (see upsert_avoid_points). Otherwise, when append_only is set, only the
+       rows in changed_addresses.csv are appended to the existing feature class
+       instead of rebuilding it.
 
        :param config_dict: Dictionary with paths and workspace settings.
+       :param append_only: True if the sheet only gained rows since the last load.
        :return: None
        """
     try:
@@ -82,39 +75,147 @@ def load(config_dict):
             raise FileNotFoundError(f"Input table '{in_table}' does not exist.")
 
         out_feature_class = config_dict.get('avoid_points_name', 'avoid_points')
-
-        if arcpy.Exists(out_feature_class):
+        backend = get_backend(config_dict)
+
+        if config_dict.get('upsert_load', False) and backend.exists(out_feature_class):
+            if upsert_avoid_points(in_table, out_feature_class, config_dict) is not None:
+                logging.debug("Exiting load method")
+                return
+            print(f"{out_feature_class} has no address keys, rebuilding it.")
+
+        if append_only and backend.exists(out_feature_class):
+            changes_table = os.path.join(config_dict.get('download_dir'), 'changed_addresses.csv')
+            new_points = backend.xy_table_to_point(changes_table, "new_avoid_points")
+            backend.append(new_points, out_feature_class)
+            logging.debug("Exiting load method")
+            return
+
+        if backend.exists(out_feature_class):
             print(f"Deleting existing {out_feature_class}...")
-            run_tool(arcpy.management.Delete, out_feature_class)
+            backend.delete(out_feature_class)
 
-        run_tool(arcpy.management.XYTableToPoint, in_table, out_feature_class, "X", "Y")
+        backend.xy_table_to_point(in_table, out_feature_class)
 
-        if not arcpy.Exists(out_feature_class):
+        if not backend.exists(out_feature_class):
             raise FileNotFoundError(f"Failed to create feature class '{out_feature_class}'.")
         logging.debug("Exiting load method")
     except Exception as e:
         print(f"Error in load: {e}")
+        # The caller must not record the incremental extract state for a load that failed
+        raise
 
+@tracer.traced()
+def upsert_avoid_points(in_table, out_feature_class, config_dict):
+    """
+    Brings the avoid points in line with the geocoded CSV by address key
+    (AddrKey, a hash of the normalized address): new keys are inserted, keys whose
+    location changed are updated, keys no longer in the CSV are deleted and every
+    other point is left untouched. Rows sharing a key load as a single point.
+    The changes are written to avoid_point_changes_name in download_dir for
+    downstream change tracking.
+
+    :param in_table: Path to new_addresses.csv.
+    :param out_feature_class: Avoid points feature class.
+    :param config_dict: Configuration dictionary.
+    :return: Dictionary of change counts, or None if the feature class has no address keys.
+    """
+    backend = get_backend(config_dict)
+    existing = backend.point_keys(out_feature_class)
+    if existing is None:
+        return None
+    with open(in_table, "r", encoding='utf-8') as table_file:
+        current = {row['AddrKey']: (float(row['X']), float(row['Y']), row['Type'])
+                   for row in csv.DictReader(table_file)}
+    # Sub-centimeter differences in WGS84 are geocoder noise, not moved points
+    upserts = {key: point for key, point in current.items()
+               if key not in existing or any(abs(a - b) > 1e-7 for a, b in zip(existing[key], point[:2]))}
+    deletes = set(existing) - set(current)
+    inserted, updated, deleted = backend.upsert_points(out_feature_class, upserts, deletes) \
+        if upserts or deletes else (0, 0, 0)
+
+    changes_path = os.path.join(config_dict.get('download_dir', ''),
+                                config_dict.get('avoid_point_changes_name', 'avoid_point_changes.csv'))
+    with open(changes_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["AddrKey", "Change", "Old_X", "Old_Y", "X", "Y"])
+        for key in sorted(upserts):
+            old_x, old_y = existing.get(key, ("", ""))
+            writer.writerow([key, "update" if key in existing else "insert", old_x, old_y,
+                             upserts[key][0], upserts[key][1]])
+        for key in sorted(deletes):
+            writer.writerow([key, "delete", existing[key][0], existing[key][1], "", ""])
+    counts = {'inserted': inserted, 'updated': updated, 'deleted': deleted,
+              'unchanged': len(current) - inserted - updated}
+    print(f"Upserted {out_feature_class}: {inserted} inserted, {updated} updated, {deleted} deleted, "
+          f"{counts['unchanged']} unchanged. Changes written to {changes_path}")
+    return counts
+
+@tracer.traced()
 def process(config_dict):
     """
         Executes the ETL pipeline: extract -> transform -> load.
+        In incremental mode an unchanged sheet skips transform and load entirely.
 
         :param config_dict: Configuration dictionary.
         :return: None
         """
     try:
         logging.debug("Entering process method")
+        # requests and the geocoders are only loaded by the commands that use them
+        from etl.GSheetsEtl import GSheetsEtl
         etl_instance = GSheetsEtl(config_dict)
-        etl_instance.extract()
+        if config_dict.get('pipelined_etl', False):
+            stream_process(etl_instance, config_dict)
+            logging.debug("Exiting process method")
+            return
+        with tracer.span("extract"):
+            etl_instance.extract()
+        if etl_instance.sheet_unchanged:
+            print("Spreadsheet unchanged, keeping existing avoid points.")
+            logging.debug("Exiting process method")
+            return
         input_file = os.path.join(config_dict.get('download_dir', ''), 'raw_addresses.csv')
         output_file = os.path.join(config_dict.get('download_dir', ''), 'new_addresses.csv')
-        etl_instance.transform(input_file, output_file)
-        load(config_dict)
+        with tracer.span("transform") as span:
+            etl_instance.transform(input_file, output_file)
+            span.args['added_rows'] = etl_instance.added_rows
+            span.args['unique_addresses'] = etl_instance.unique_addresses
+        load(config_dict, etl_instance.append_only)
+        etl_instance.commit_extract_state()
         logging.debug("Exiting process method")
     except Exception as e:
         print(f"Error in process: {e}")
 
+@tracer.traced()
+def stream_process(etl_instance, config_dict):
+    """
+    Pipelined ETL: rows are geocoded while the sheet is still downloading and the
+    points are bulk-inserted into the avoid points layer in batches as they arrive.
+
+    :param etl_instance: GSheetsEtl instance.
+    :param config_dict: Configuration dictionary.
+    :return: None
+    """
+    backend = get_backend(config_dict)
+    out_feature_class = config_dict.get('avoid_points_name', 'avoid_points')
+    output_file = os.path.join(config_dict.get('download_dir', ''), 'new_addresses.csv')
+
+    def create_output():
+        if backend.exists(out_feature_class):
+            print(f"Deleting existing {out_feature_class}...")
+            backend.delete(out_feature_class)
+        backend.create_points(out_feature_class)
+
+    with tracer.span("extract_transform_load") as span:
+        loaded = etl_instance.stream_process(output_file, create_output,
+                                             lambda batch: backend.insert_points(out_feature_class, batch))
+        span.args['loaded_points'] = loaded
+        span.args['unique_addresses'] = etl_instance.unique_addresses
+    if loaded is None:
+        print("Spreadsheet unchanged, keeping existing avoid points.")
+
 # --- GIS Functions ---
+@tracer.traced()
 def etl(config_dict):
     """
     Main ETL orchestration.
@@ -130,6 +231,7 @@ def etl(config_dict):
     except Exception as e:
         print(f"Error in etl: {e}")
 
+@tracer.traced()
 def spatial_reference():
     """
     Sets the map document’s spatial reference to NAD 1983 StatePlane Colorado North (WKID 26953).
@@ -137,6 +239,8 @@ def spatial_reference():
     :param aprx: The ArcGIS Project object.
     :return: None
     """
+    # Map functions need ArcGIS Pro; importing arcpy here lets the analysis run on the Shapely backend without it
+    import arcpy
     try:
         aprx = arcpy.mp.ArcGISProject(
             r"C:\\Users\\Owner\\Documents\\GIS Programming\\westnileoutbreak\\WestNileOutbreak\\WestNileOutbreak.aprx")
@@ -149,7 +253,8 @@ def spatial_reference():
         print(f"Error in spatial_reference: {e}")
 
 
-def buffer(layer_name, buf_dist, config_dict):
+@tracer.traced()
+def buffer(layer_name, buf_dist, config_dict, out_name=None):
     """
     Applies buffer analysis to the given layer.
 
@@ -157,33 +262,157 @@ def buffer(layer_name, buf_dist, config_dict):
        layer_name (str): Name of the input layer.
        buf_dist (str): Distance to buffer (e.g., '100 feet').
        config_dict (dict): Configuration dictionary.
+       out_name (str): Output name, defaults to buf_<layer_name>.
 
     Returns:
        str: File path to the output buffered layer.
     """
-    output_buffer_layer_path = os.path.join(config_dict.get('output_folder'), f"buf_{layer_name}.shp")
-    if arcpy.Exists(layer_name):
-        run_tool(arcpy.analysis.Buffer, layer_name, output_buffer_layer_path, buf_dist, "FULL", "ROUND", "ALL")
-        return output_buffer_layer_path
+    backend = get_backend(config_dict)
+    if backend.exists(layer_name):
+        if layer_name in config_dict.get('buffer_ring_layers', []):
+            return BufferRingStore(config_dict, backend).buffer(layer_name, buf_dist, out_name or f"buf_{layer_name}")
+        return backend.buffer(layer_name, out_name or f"buf_{layer_name}", buf_dist)
     else:
         raise FileNotFoundError(f"Input Features '{layer_name}' do not exist.")
 
-def intersect(buffer_layer_list, config_dict):
+@tracer.traced()
+def simplify_layer(layer_name, buf_dist, config_dict, out_name=None):
+    """
+    Simplifies a layer ahead of its buffer, preserving topology. The tolerance is
+    simplify_tolerance_ratio times the buffer distance, so the buffered outline
+    moves by at most that fraction of the distance. The vertex counts, time and
+    area change are written to simplify_<layer>_<distance>.json in the output
+    folder; with
+    simplify_compare_buffers set, the layer is also buffered before and after
+    simplification to record the buffer time saved and the buffered area change.
+
+    Parameters:
+       layer_name (str): Name of the input layer.
+       buf_dist (str): Buffer distance the output will be buffered by.
+       config_dict (dict): Configuration dictionary.
+       out_name (str): Output name, defaults to simp_<layer_name>.
+
+    Returns:
+       str: Path to the simplified layer.
+    """
+    backend = get_backend(config_dict)
+    if not backend.exists(layer_name):
+        raise FileNotFoundError(f"Input Features '{layer_name}' do not exist.")
+    tolerance = parse_distance(buf_dist, 'feet') * config_dict.get('simplify_tolerance_ratio', 0.01)
+    started = time.perf_counter()
+    simplified = backend.simplify(layer_name, out_name or f"simp_{layer_name}", tolerance)
+    report = {
+        'layer': layer_name,
+        'buffer_distance': buf_dist,
+        'tolerance_feet': tolerance,
+        'simplify_seconds': time.perf_counter() - started,
+        'vertices_before': backend.vertex_count(layer_name),
+        'vertices_after': backend.vertex_count(simplified),
+    }
+    area_before = backend.area(layer_name)
+    report['area_change_pct'] = 100.0 * (backend.area(simplified) - area_before) / area_before if area_before else 0.0
+    if config_dict.get('simplify_compare_buffers', False):
+        timings = {}
+        for label, dataset in (('original', layer_name), ('simplified', simplified)):
+            started = time.perf_counter()
+            timings[label] = backend.buffer(dataset, f"simp_check_{label}_{out_name or layer_name}", buf_dist)
+            report[f"buffer_seconds_{label}"] = time.perf_counter() - started
+        buffered_before = backend.area(timings['original'])
+        report['buffered_area_change_pct'] = (100.0 * (backend.area(timings['simplified']) - buffered_before)
+                                              / buffered_before if buffered_before else 0.0)
+        for dataset in timings.values():
+            backend.delete(dataset)
+    slug = re.sub(r"\W+", "_", str(buf_dist)).strip("_")
+    report_path = os.path.join(config_dict.get('output_folder'), f"simplify_{layer_name}_{slug}.json")
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return simplified
+
+def simplify_report(config_dict):
+    """
+    Collects the per-layer simplification reports written by simplify_layer,
+    prints them and writes them to simplify_report_file.
+
+    Returns:
+        list of dict: One report per simplified layer.
+    """
+    reports = []
+    report_files = sorted(name for name in os.listdir(config_dict.get('output_folder'))
+                          if name.startswith("simplify_") and name.endswith(".json"))
+    for layer in config_dict.get('simplify_layers', []):
+        for name in report_files:
+            if name.startswith(f"simplify_{layer}_"):
+                with open(os.path.join(config_dict.get('output_folder'), name)) as f:
+                    reports.append(json.load(f))
+    for report in reports:
+        line = (f"{report['layer']} @ {report['buffer_distance']}: {report['vertices_before']} -> {report['vertices_after']} vertices "
+                f"(tolerance {report['tolerance_feet']:.1f} ft, {report['simplify_seconds']:.2f} s), "
+                f"area {report['area_change_pct']:+.3f}%")
+        if 'buffered_area_change_pct' in report:
+            line += (f", buffer {report['buffer_seconds_original']:.2f} s -> "
+                     f"{report['buffer_seconds_simplified']:.2f} s, buffered area "
+                     f"{report['buffered_area_change_pct']:+.3f}%")
+        print(line)
+    if reports and config_dict.get('simplify_report_file'):
+        with open(os.path.join(config_dict.get('output_folder'), config_dict['simplify_report_file']), 'w') as f:
+            json.dump(reports, f, indent=2)
+    return reports
+
+@tracer.traced()
+def intersect(buffer_layer_list, config_dict, out_name="Intersect"):
     """
     Intersects a list of buffered layers.
 
     Parameters:
        buffer_layer_list (list of str): List of buffered layer names.
        config_dict (dict): Configuration dictionary.
+       out_name (str): Output name.
 
     Returns:
        str: Path to the intersected output feature.
        """
-    lyr_intersect = "Intersect"
-    lyr_intersect_path = os.path.join(config_dict.get('gdb_path'), lyr_intersect)
-    run_tool(arcpy.analysis.Intersect, buffer_layer_list, lyr_intersect_path, "ALL")
-    return lyr_intersect_path
+    return get_backend(config_dict).intersect(buffer_layer_list, out_name)
+
+@tracer.traced()
+def dissolve_layer(layer, out_name, config_dict):
+    """
+    Repairs a layer's geometry, checks it is not empty and dissolves it.
+
+    Parameters:
+        layer (str): Path to the layer.
+        out_name (str): Name of the dissolved output.
+        config_dict (dict): Configuration dictionary.
+
+    Returns:
+        str: Path to the dissolved layer.
+    """
+    backend = get_backend(config_dict)
+    backend.repair(layer)
+    if backend.count(layer) == 0:
+        raise ValueError(f"Layer {layer} is empty or invalid after geometry repair.")
+    return backend.dissolve(layer, out_name)
+
+@tracer.traced()
+def erase_dissolved(dissolved_intersect, dissolved_avoid, config_dict, out_name="Final_Analysis"):
+    """
+    Erases the dissolved avoid zones from the dissolved intersect layer.
+
+    Parameters:
+        dissolved_intersect (str): Path to the dissolved intersect layer.
+        dissolved_avoid (str): Path to the dissolved avoid points buffer.
+        config_dict (dict): Configuration dictionary.
+        out_name (str): Output name.
 
+    Returns:
+        str: Path to final erased analysis layer.
+    """
+    backend = get_backend(config_dict)
+    erased_layer_path = backend.erase(dissolved_intersect, dissolved_avoid, out_name)
+    if not backend.exists(erased_layer_path):
+        raise FileNotFoundError("Failed to create erased layer.")
+    return erased_layer_path
+
+@tracer.traced()
 def erase(intersect_layer, avoid_points_buffer_layer, config_dict):
     """
     Erases avoid zones from intersected buffer zones.
@@ -197,27 +426,15 @@ def erase(intersect_layer, avoid_points_buffer_layer, config_dict):
         str: Path to final erased analysis layer.
     """
     try:
-        for layer in [intersect_layer, avoid_points_buffer_layer]:
-            arcpy.management.RepairGeometry(layer, "DELETE_NULL")
-            if int(arcpy.management.GetCount(layer)[0]) == 0:
-                raise ValueError(f"Layer {layer} is empty or invalid after geometry repair.")
-
-        dissolved_intersect = os.path.join(config_dict.get('gdb_path'), "Dissolved_Intersect")
-        dissolved_avoid = os.path.join(config_dict.get('gdb_path'), "Dissolved_Avoid")
-        arcpy.management.Dissolve(intersect_layer, dissolved_intersect)
-        arcpy.management.Dissolve(avoid_points_buffer_layer, dissolved_avoid)
-
-        erased_layer_path = os.path.join(config_dict.get('gdb_path'), "Final_Analysis")
-        run_tool(arcpy.analysis.Erase, dissolved_intersect, dissolved_avoid, erased_layer_path)
-
-        if not arcpy.Exists(erased_layer_path):
-            raise FileNotFoundError("Failed to create erased layer.")
-        return erased_layer_path
+        dissolved_intersect = dissolve_layer(intersect_layer, "Dissolved_Intersect", config_dict)
+        dissolved_avoid = dissolve_layer(avoid_points_buffer_layer, "Dissolved_Avoid", config_dict)
+        return erase_dissolved(dissolved_intersect, dissolved_avoid, config_dict)
     except Exception as e:
         print(f"Error in erase: {e}")
         raise e
 
-def spatial_join(target_layer, join_layer, config_dict):
+@tracer.traced()
+def spatial_join(target_layer, join_layer, config_dict, out_name="Target_Addresses"):
     """
     Performs spatial join between target and join layers.
 
@@ -225,19 +442,14 @@ def spatial_join(target_layer, join_layer, config_dict):
         target_layer (str): Name of the target feature layer.
         join_layer (str): Name of the join feature layer.
         config_dict (dict): Configuration dictionary.
+        out_name (str): Output name.
 
     Returns:
         str: Path to the joined output feature class.
     """
-    join_layer_path = os.path.join(config_dict.get('gdb_path'), "Target_Addresses")
-    run_tool(arcpy.analysis.SpatialJoin,
-             target_features=target_layer,
-             join_features=join_layer,
-             out_feature_class=join_layer_path,
-             join_type="KEEP_COMMON",
-             match_option="INTERSECT")
-    return join_layer_path
+    return get_backend(config_dict).spatial_join(target_layer, join_layer, out_name)
 
+@tracer.traced()
 def add_to_project(new_layer_path, config_dict):
     """
     Adds the specified layer to the ArcGIS Pro project.
@@ -246,20 +458,25 @@ def add_to_project(new_layer_path, config_dict):
         new_layer_path (str): Path to the layer to add.
         config_dict (dict): Configuration dictionary.
     """
+    import arcpy
     aprx = arcpy.mp.ArcGISProject(os.path.join(config_dict.get('proj_dir'), "WestNileOutbreak.aprx"))
     map_doc = aprx.listMaps()[0]
     map_doc.addDataFromPath(new_layer_path)
     aprx.save()
     print(f"Added {new_layer_path} to project.")
 
-def export_map(config_dict):
+@tracer.traced()
+def export_map(config_dict, subtitle=None):
     """
     Exports the final layout map to a PDF with fixed scale and centered extent.
     Also updates dynamic title and date text.
 
     Parameters:
        config_dict (dict): Configuration dictionary with paths and export info.
+       subtitle (str): Map subtitle; prompted for when None.
    """
+    import arcpy
+    from gis.ArcpyBackend import run_tool
     try:
         print("Starting export_map...")
         aprx = arcpy.mp.ArcGISProject(os.path.join(config_dict.get('proj_dir'), "WestNileOutbreak.aprx"))
@@ -274,7 +491,8 @@ def export_map(config_dict):
         map_frame.camera.X = 3079059
         map_frame.camera.Y = 1248932
 
-        subtitle = input("Enter subtitle for map: ")
+        if subtitle is None:
+            subtitle = input("Enter subtitle for map: ")
         model_run_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         for el in lyt.listElements("TEXT_ELEMENT"):
@@ -297,6 +515,7 @@ def export_map(config_dict):
         print(f"Error in export_map: {e}")
         raise e
 
+@tracer.traced()
 def generate_address_report(config_dict):
     """
     Generates a CSV report of street addresses from Building_Addresses
@@ -307,82 +526,890 @@ def generate_address_report(config_dict):
     """
     try:
         print("Generating address report...")
+        backend = get_backend(config_dict)
         final_analysis = os.path.join(config_dict.get('gdb_path'), "Final_Analysis")
-        output_fc = os.path.join(config_dict.get('gdb_path'), "Addresses_Within_Buffer")
 
         # Spatial join using Building_Addresses
-        run_tool(arcpy.analysis.SpatialJoin,
-                 target_features="Building_Addresses",
-                 join_features=final_analysis,
-                 out_feature_class=output_fc,
-                 join_type="KEEP_COMMON",
-                 match_option="INTERSECT")
-
-        # Add and calculate X and Y fields if missing
-        existing_fields = [f.name for f in arcpy.ListFields(output_fc)]
-        if 'X' not in existing_fields:
-            arcpy.management.AddField(output_fc, "X", "DOUBLE")
-            arcpy.management.CalculateGeometryAttributes(output_fc, [["X", "POINT_X"]])
-        if 'Y' not in existing_fields:
-            arcpy.management.AddField(output_fc, "Y", "DOUBLE")
-            arcpy.management.CalculateGeometryAttributes(output_fc, [["Y", "POINT_Y"]])
-
-        # Export to CSV
+        output_fc = backend.spatial_join("Building_Addresses", final_analysis, "Addresses_Within_Buffer")
+
+        # Export to CSV with the point coordinates
         csv_path = os.path.join(config_dict.get('output_folder'), "addresses_within_final_analysis.csv")
-        fields = ["FULLADDR", "X", "Y"]
         with open(csv_path, 'w') as f:
             f.write("FULLADDR,X,Y\n")
-            with arcpy.da.SearchCursor(output_fc, fields) as cursor:
-                for row in cursor:
-                    f.write(','.join(map(str, row)) + '\n')
+            for row in backend.iter_points(output_fc, ["FULLADDR"]):
+                f.write(','.join(map(str, row)) + '\n')
 
         print(f"Report generated at: {csv_path}")
 
     except Exception as e:
         print(f"Error in generate_address_report: {e}")
 
-# --- Main ---
+# --- Approximate Overlay ---
 
-if __name__ == '__main__':
-    config_dict = setup()
-    arcpy.env.parallelProcessingFactor = "100%"
+def address_coordinates(backend):
+    """
+    Reads the Building_Addresses point coordinates.
 
-    print("\n=== Starting ETL Process ===")
-    etl(config_dict)
+    Parameters:
+        backend (GeometryBackend): Geometry backend.
 
-    print("\n=== Setting Spatial Reference ===")
-    spatial_reference()
+    Returns:
+        numpy.ndarray: Array of shape (n, 2) with the X and Y of every address.
+    """
+    import numpy as np
+    return np.array([row[-2:] for row in backend.iter_points("Building_Addresses", [])], dtype=float).reshape(-1, 2)
+
+@tracer.traced()
+def approximate_overlay(buffer_layers, avoid_buffer_layer, config_dict, out_name="Final_Analysis_Approx"):
+    """
+    Fast approximate replacement for intersect -> dissolve -> erase: the buffered
+    layers and the avoid points buffer are rasterized to one grid at
+    raster_overlay_cell_size and combined with NumPy AND / AND-NOT, and addresses
+    are classified by looking up their cells.
 
-    buffer_layer_list = ["Mosquito_Larval_Sites", "Wetlands", "Lakes_and_Reservoirs", "OSMP_Properties"]
+    Parameters:
+        buffer_layers (list of str): Buffered hazard layers.
+        avoid_buffer_layer (str): Buffered avoid points layer.
+        config_dict (dict): Configuration dictionary.
+        out_name (str): Name for the polygonized result, or None to skip writing it.
+
+    Returns:
+        dict: 'treatment_acres', 'address_count' and, when written, 'dataset'.
+    """
+    # The raster overlay needs NumPy and Shapely; importing here keeps them optional for the exact workflow
+    import numpy as np
+    from gis.RasterOverlay import RasterOverlay
+    backend = get_backend(config_dict)
+    engine = RasterOverlay(config_dict, backend)
+    mask, grid = engine.overlay(buffer_layers, [avoid_buffer_layer])
+    xy = address_coordinates(backend)
+    result = {
+        'treatment_acres': engine.area_m2(mask) / 4046.8564224,
+        'address_count': int(np.count_nonzero(grid.points_in_mask(mask, xy[:, 0], xy[:, 1]))),
+    }
+    if out_name:
+        result['dataset'] = backend.write_geometry(out_name, grid.polygonize(mask))
+    return result
+
+@tracer.traced()
+def compare_overlays(final_analysis, approximate, config_dict):
+    """
+    Reports how far the approximate overlay is from the exact Final_Analysis, and
+    writes the report to overlay_disagreement_file when it is set.
+
+    Parameters:
+        final_analysis (str): Path to the exact erased analysis layer.
+        approximate (dict): Result of approximate_overlay, with its 'dataset'.
+        config_dict (dict): Configuration dictionary.
+
+    Returns:
+        dict: Area disagreement (percent of the exact area) and address counts.
+    """
+    from gis.RasterOverlay import overlay_disagreement
+    backend = get_backend(config_dict)
+    xy = address_coordinates(backend)
+    report = {
+        'exact_acres': backend.area(final_analysis) / 4046.8564224,
+        'approx_acres': approximate['treatment_acres'],
+        **overlay_disagreement(backend.geometries(final_analysis), backend.geometries(approximate['dataset']),
+                               xy[:, 0], xy[:, 1]),
+    }
+    print(f"Approximate overlay: {report['area_disagreement_pct']:.2f}% of the exact area differs, "
+          f"{report['missed_addresses']} address(es) missed, {report['extra_addresses']} extra")
+    if config_dict.get('overlay_disagreement_file'):
+        report_path = os.path.join(config_dict.get('output_folder'), config_dict['overlay_disagreement_file'])
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+# --- Workflow ---
+
+def build_buffer_rings(layer_name, config_dict):
+    """
+    Builds or refreshes the multi-ring buffers of a layer ahead of the buffer
+    stages that read them, so parallel stages do not build the same rings.
+
+    Parameters:
+        layer_name (str): Name of the input layer.
+        config_dict (dict): Configuration dictionary.
+
+    Returns:
+        str: Path to the rings feature class.
+    """
+    return BufferRingStore(config_dict, get_backend(config_dict)).rings_for(layer_name)['rings']
+
+def ring_deps(dag, layer_name, config_dict):
+    """
+    Adds the ring-building stage for a layer listed in buffer_ring_layers.
+
+    Returns:
+        list of str: Stage names a buffer of the layer must wait for.
+    """
+    if layer_name not in config_dict.get('buffer_ring_layers', []):
+        return []
+    stage_name = f"rings_{layer_name}"
+    if stage_name not in dag.stages:
+        dag.add(stage_name, build_buffer_rings, layer_name, config_dict)
+    return [stage_name]
+
+def buffer_stage(dag, stage_name, layer_name, buf_dist, config_dict, out_name):
+    """
+    Adds the buffer stage of a layer. Layers listed in simplify_layers are
+    simplified first (stage 'simp_<stage_name>') and the simplified copy is
+    buffered; other layers wait for their rings when they use buffer rings.
+
+    Returns:
+        StageRef: Reference to the buffer stage.
+    """
+    if layer_name not in config_dict.get('simplify_layers', []):
+        return dag.add(stage_name, cached_stage, stage_name, buffer, [layer_name, buf_dist], [layer_name],
+                       config_dict, out_name, deps=ring_deps(dag, layer_name, config_dict))
+    simplified = dag.add(f"simp_{stage_name}", cached_stage, f"simp_{stage_name}", simplify_layer,
+                         [layer_name, buf_dist], [layer_name], config_dict, f"simp_{out_name}")
+    return dag.add(stage_name, cached_stage, stage_name, buffer, [simplified, buf_dist], [simplified],
+                   config_dict, out_name)
+
+def cached_stage(stage_name, func, args, input_datasets, config_dict, out_name=None):
+    """
+    Runs a spatial stage through the stage cache, so a rerun with unchanged
+    inputs and parameters reuses the stored output instead of recomputing it.
+
+    Parameters:
+        stage_name (str): Stage name used in the cache key and report.
+        func (callable): Stage function taking *args followed by config_dict.
+        args (list): Stage arguments before config_dict.
+        input_datasets (list of str): Datasets whose content the output depends on.
+        config_dict (dict): Configuration dictionary.
+        out_name (str): Output name passed to func, or None for its default.
+
+    Returns:
+        str: Path to the stage output.
+    """
+    kwargs = {'out_name': out_name} if out_name else None
+    return run_cached(stage_name, func, args, input_datasets, config_dict, get_backend(config_dict), kwargs)
+
+def build_workflow(buffer_distances, config_dict):
+    """
+    Declares the analysis as a dependency graph. The layer buffers, the avoid
+    points buffer and the two dissolves are independent and run in parallel;
+    intersect, erase, spatial join and the address report wait for their inputs.
+    The geoprocessing stages go through the stage cache when stage_cache_enabled is set.
+
+    analysis_mode selects the overlay: 'exact' (vector intersect/erase), 'approximate'
+    (raster overlay only), 'compare' (both, plus an 'overlay_disagreement' stage) or
+    'tiled' (exact overlay split into tiles, see add_tiled_overlay).
+
+    Parameters:
+        buffer_distances (dict): Layer name -> buffer distance (e.g. '1500 feet').
+        config_dict (dict): Configuration dictionary.
+
+    Returns:
+        DagExecutor: Workflow ready to run. Stage results are keyed 'intersect',
+        'erase', 'spatial_join' and 'address_report' for the exact overlay, and
+        'approximate_overlay' for the raster one.
+    """
+    mode = config_dict.get('analysis_mode', 'exact')
+    config_dict.setdefault('run_id', uuid.uuid4().hex)
+    dag = DagExecutor(max_workers=config_dict.get('dag_workers'))
+    if mode == 'tiled':
+        add_tiled_overlay(dag, buffer_distances, config_dict)
+        return dag
+    buffered = [buffer_stage(dag, f"buffer_{layer}", layer, distance, config_dict, f"buf_{layer}")
+                for layer, distance in buffer_distances.items()]
+    avoid_points = config_dict.get('avoid_points_name', 'avoid_points')
+    avoid_buffer = dag.add("buffer_avoid_points", cached_stage, "buffer_avoid_points", buffer,
+                           [avoid_points, config_dict.get('avoid_buffer_distance', '100 feet')], [avoid_points],
+                           config_dict, deps=ring_deps(dag, avoid_points, config_dict))
+    if mode != 'exact':
+        approximate = dag.add("approximate_overlay", approximate_overlay, buffered, avoid_buffer, config_dict)
+    if mode == 'approximate':
+        return dag
+    intersect_layer = dag.add("intersect", cached_stage, "intersect", intersect, [buffered], buffered, config_dict)
+    dissolved_intersect = dag.add("dissolve_intersect", cached_stage, "dissolve_intersect", dissolve_layer,
+                                  [intersect_layer, "Dissolved_Intersect"], [intersect_layer], config_dict)
+    dissolved_avoid = dag.add("dissolve_avoid", cached_stage, "dissolve_avoid", dissolve_layer,
+                              [avoid_buffer, "Dissolved_Avoid"], [avoid_buffer], config_dict)
+    final_analysis = dag.add("erase", cached_stage, "erase", erase_dissolved, [dissolved_intersect, dissolved_avoid],
+                             [dissolved_intersect, dissolved_avoid], config_dict)
+    dag.add("spatial_join", cached_stage, "spatial_join", spatial_join, ["Building_Addresses", intersect_layer],
+            ["Building_Addresses", intersect_layer], config_dict)
+    dag.add("address_report", generate_address_report, config_dict, deps=["erase"])
+    if mode == 'compare':
+        dag.add("overlay_disagreement", compare_overlays, final_analysis, approximate, config_dict)
+    return dag
+
+def add_tiled_overlay(dag, buffer_distances, config_dict):
+    """
+    Declares buffer -> intersect -> erase as one stage per tile, for study areas
+    too large to overlay in one piece. The study extent is split into tiles of
+    tile_size; each tile reads only the features within a halo of the largest
+    buffer distance around it, overlays them in a worker process and clips the
+    result to its core. A merge stage dissolves the tile seams into Final_Analysis.
+    Stages 'erase', 'spatial_join' and 'address_report' are declared as in the
+    untiled workflow; as no Intersect layer is produced, the spatial join targets
+    Final_Analysis.
+
+    Parameters:
+        dag (DagExecutor): Workflow to add the stages to.
+        buffer_distances (dict): Layer name -> buffer distance.
+        config_dict (dict): Configuration dictionary.
 
-    print("\n=== Buffering Layers ===")
-    for layer in buffer_layer_list:
-        if arcpy.Exists(layer):
+    Returns:
+        None
+    """
+    from gis.GeometryBackend import parse_distance
+    from gis.TiledOverlay import plan_tiles, study_extent, overlay_tile, merge_tiles
+    linear_unit = config_dict.get('vector_linear_unit', 'feet')
+    avoid_distances = {config_dict.get('avoid_points_name', 'avoid_points'):
+                       config_dict.get('avoid_buffer_distance', '100 feet')}
+    halo = max(parse_distance(d, linear_unit) for d in list(buffer_distances.values()) + list(avoid_distances.values()))
+    tiles = plan_tiles(study_extent(buffer_distances, config_dict),
+                       parse_distance(config_dict.get('tile_size', '10000 feet'), linear_unit), halo)
+    print(f"Tiled overlay: {len(tiles)} tile(s) with a {halo:g} {linear_unit} halo")
+    pieces = [dag.add(f"tile_{number:04d}", overlay_tile, core, halo_bounds, buffer_distances, avoid_distances,
+                      config_dict)
+              for number, (core, halo_bounds) in enumerate(tiles, start=1)]
+    final_analysis = dag.add("erase", merge_tiles, pieces, "Final_Analysis", config_dict)
+    dag.add("spatial_join", spatial_join, "Building_Addresses", final_analysis, config_dict)
+    dag.add("address_report", generate_address_report, config_dict, deps=["erase"])
+
+# --- Incremental Re-analysis ---
+
+def analysis_state_path(config_dict):
+    return os.path.join(config_dict.get('output_folder'), config_dict.get('analysis_state_name', 'analysis_state.json'))
+
+def analysis_base(buffer_distances, config_dict):
+    """
+    Describes everything the analysis depends on apart from the avoid points:
+    the buffer distances, the hazard layers and every setting that changes
+    Final_Analysis.
+
+    Parameters:
+        buffer_distances (dict): Layer name -> buffer distance.
+        config_dict (dict): Configuration dictionary.
+
+    Returns:
+        dict: JSON-compatible description; equal descriptions mean only the avoid points can differ.
+    """
+    backend = get_backend(config_dict)
+    return json.loads(json.dumps({
+        'backend': backend.name,
+        'buffer_distances': buffer_distances,
+        'avoid_buffer_distance': config_dict.get('avoid_buffer_distance', '100 feet'),
+        'config': {name: config_dict.get(name) for name in OUTPUT_CONFIG_KEYS},
+        'layers': {layer: backend.fingerprint(layer) for layer in buffer_distances},
+    }))
+
+def analysis_outputs(config_dict):
+    """
+    Fingerprints the stored outputs an incremental update patches.
+
+    Returns:
+        dict: Output name -> fingerprint, or None if an output is missing.
+    """
+    backend = get_backend(config_dict)
+    outputs = {}
+    for name in ("Final_Analysis", "Dissolved_Intersect"):
+        path = os.path.join(config_dict.get('gdb_path'), name)
+        if not backend.exists(path):
+            return None
+        outputs[name] = backend.fingerprint(path)
+    return json.loads(json.dumps(outputs))
+
+def avoid_point_coordinates(config_dict):
+    """
+    Returns:
+        numpy.ndarray: Array of shape (n, 2) with the avoid points in the analysis coordinate system.
+    """
+    import shapely
+    backend = get_backend(config_dict)
+    return shapely.get_coordinates(backend.geometries(config_dict.get('avoid_points_name', 'avoid_points')))
+
+def save_analysis_state(buffer_distances, config_dict):
+    """
+    Records the inputs and outputs of a completed analysis, so the next run can
+    tell whether only the avoid points changed since the outputs were written.
+
+    Parameters:
+        buffer_distances (dict): Layer name -> buffer distance.
+        config_dict (dict): Configuration dictionary.
+
+    Returns:
+        None
+    """
+    state = {
+        'base': analysis_base(buffer_distances, config_dict),
+        'avoid_points': [[round(x, 2), round(y, 2)] for x, y in avoid_point_coordinates(config_dict).tolist()],
+        'outputs': analysis_outputs(config_dict),
+    }
+    tmp_path = analysis_state_path(config_dict) + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, analysis_state_path(config_dict))
+
+def clear_analysis_state(config_dict):
+    """
+    Removes the saved analysis state ahead of a run that rewrites Final_Analysis
+    without recording it, so a later incremental run cannot patch the new outputs
+    as if they were the old ones.
+    """
+    if os.path.exists(analysis_state_path(config_dict)):
+        os.remove(analysis_state_path(config_dict))
+
+@tracer.traced()
+def patch_address_report(final_geometry, affected, config_dict):
+    """
+    Updates the address report CSV inside the affected area only: rows there are
+    dropped and the Building_Addresses points there that fall in the new
+    Final_Analysis are added.
+
+    Parameters:
+        final_geometry (shapely geometry): Patched Final_Analysis.
+        affected (shapely geometry): Area that was recomputed.
+        config_dict (dict): Configuration dictionary.
+
+    Returns:
+        int: Number of addresses in the report.
+    """
+    import numpy as np
+    import shapely
+    backend = get_backend(config_dict)
+    csv_path = os.path.join(config_dict.get('output_folder'), "addresses_within_final_analysis.csv")
+    with open(csv_path, 'r', newline='') as f:
+        rows = list(csv.reader(f))[1:]
+    shapely.prepare(affected)
+    if rows:
+        xy = np.array([[float(r[-2]), float(r[-1])] for r in rows])
+        rows = [r for r, hit in zip(rows, shapely.intersects_xy(affected, xy[:, 0], xy[:, 1])) if not hit]
+    candidates = list(backend.iter_points("Building_Addresses", ["FULLADDR"]))
+    if candidates:
+        xy = np.array([row[-2:] for row in candidates], dtype=float)
+        local = shapely.intersection(final_geometry, affected)
+        shapely.prepare(local)
+        added = [row for row, hit in zip(candidates, shapely.intersects_xy(local, xy[:, 0], xy[:, 1])) if hit]
+        rows.extend([str(v) for v in row] for row in added)
+    with open(csv_path, 'w') as f:
+        f.write("FULLADDR,X,Y\n")
+        for row in rows:
+            f.write(','.join(row) + '\n')
+    return len(rows)
+
+@tracer.traced()
+def incremental_reanalysis(buffer_distances, config_dict):
+    """
+    Patches Final_Analysis and the address report for added or removed avoid
+    points, recomputing only the area within their buffers. Falls back (returns
+    False) when there is no saved state, when anything besides the avoid points
+    changed, or when the stored outputs are missing or were rewritten since the
+    state was saved. Target_Addresses joins the
+    addresses to the intersect layer, which avoid points do not affect, so it
+    is left as is.
+
+    Parameters:
+        buffer_distances (dict): Layer name -> buffer distance.
+        config_dict (dict): Configuration dictionary.
+
+    Returns:
+        bool: True if the outputs are current, False if a full run is needed.
+    """
+    from gis.GeometryBackend import parse_distance
+    from gis.IncrementalErase import avoid_point_delta, patch_erase
+    backend = get_backend(config_dict)
+    try:
+        with open(analysis_state_path(config_dict), 'r') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        print("No saved analysis state, running the full workflow.")
+        return False
+    if state.get('base') != analysis_base(buffer_distances, config_dict):
+        print("Buffer distances or hazard layers changed, running the full workflow.")
+        return False
+    final_analysis = os.path.join(config_dict.get('gdb_path'), "Final_Analysis")
+    dissolved_intersect = os.path.join(config_dict.get('gdb_path'), "Dissolved_Intersect")
+    outputs = analysis_outputs(config_dict)
+    if outputs is None:
+        print("Stored analysis outputs missing, running the full workflow.")
+        return False
+    if state.get('outputs') != outputs:
+        print("Stored analysis outputs changed since the state was saved, running the full workflow.")
+        return False
+
+    avoid_xy = avoid_point_coordinates(config_dict)
+    added, removed = avoid_point_delta(state['avoid_points'], avoid_xy.tolist())
+    if not added and not removed:
+        print("Avoid points unchanged, outputs are current.")
+        return True
+
+    distance = parse_distance(config_dict.get('avoid_buffer_distance', '100 feet'),
+                              config_dict.get('vector_linear_unit', 'feet'))
+    new_final, affected = patch_erase(backend.geometries(final_analysis), backend.geometries(dissolved_intersect),
+                                      avoid_xy, added + removed, distance, config_dict.get('buffer_quad_segments', 16))
+    backend.write_geometry("Final_Analysis", new_final)
+    address_count = patch_address_report(new_final, affected, config_dict)
+    save_analysis_state(buffer_distances, config_dict)
+    print(f"Incremental update: {len(added)} avoid point(s) added, {len(removed)} removed; "
+          f"{backend.area(final_analysis) / 4046.8564224:.1f} acres in Final_Analysis, "
+          f"{address_count} addresses in the report")
+    return True
+
+# --- Scenario Sweeps ---
+
+def buffer_distance(value):
+    """
+    Normalizes a buffer distance from the config or command line; bare numbers are feet.
+
+    Parameters:
+        value (str or int or float): Distance such as 1500 or '1500 feet'.
+
+    Returns:
+        str: Distance string such as '1500 feet'.
+    """
+    text = str(value).strip()
+    return f"{text} feet" if re.fullmatch(r"\d+(\.\d+)?", text) else text
+
+def expand_grid(grid):
+    """
+    Expands a grid of buffer distances into scenarios.
+
+    Parameters:
+        grid (dict): Layer name -> distance or list of distances.
+
+    Returns:
+        list of dict: One layer -> distance dictionary per combination.
+    """
+    layers = list(grid)
+    choices = [[buffer_distance(d) for d in (grid[layer] if isinstance(grid[layer], list) else [grid[layer]])]
+               for layer in layers]
+    return [dict(zip(layers, combination)) for combination in itertools.product(*choices)]
+
+def summarize_scenario(final_analysis, addresses, config_dict):
+    """
+    Measures a scenario's treatment area and the addresses inside it.
+
+    Parameters:
+        final_analysis (str): Path to the scenario's erased analysis layer.
+        addresses (str): Path to the scenario's joined address layer.
+        config_dict (dict): Configuration dictionary.
+
+    Returns:
+        dict: 'treatment_acres' and 'address_count'.
+    """
+    backend = get_backend(config_dict)
+    return {
+        'treatment_acres': backend.area(final_analysis) / 4046.8564224,
+        'address_count': backend.count(addresses),
+    }
+
+def build_sweep(scenarios, config_dict):
+    """
+    Declares every scenario in one dependency graph. Buffer stages are named by
+    layer and distance, so a buffer used by several scenarios is computed once and
+    shared, as are the avoid points buffer and its dissolve; intersect, dissolve,
+    erase and the address join run per scenario in parallel workers.
+
+    Parameters:
+        scenarios (list of dict): Layer name -> buffer distance, one per scenario.
+        config_dict (dict): Configuration dictionary.
+
+    With analysis_mode 'approximate' each scenario is a single raster overlay
+    stage; with 'compare' both overlays run and '<id>_disagreement' reports
+    their difference.
+
+    Returns:
+        tuple: (DagExecutor, list of scenario ids); each scenario's summary is the
+        result of stage '<id>_summary'.
+    """
+    mode = config_dict.get('analysis_mode', 'exact')
+    config_dict.setdefault('run_id', uuid.uuid4().hex)
+    dag = DagExecutor(max_workers=config_dict.get('dag_workers'))
+
+    def shared_buffer(layer, distance):
+        slug = re.sub(r"\W+", "_", distance).strip("_")
+        stage_name = f"buffer_{layer}_{slug}"
+        if stage_name not in dag.stages:
+            buffer_stage(dag, stage_name, layer, distance, config_dict, f"buf_{layer}_{slug}")
+        return StageRef(stage_name)
+
+    avoid_points = config_dict.get('avoid_points_name', 'avoid_points')
+    avoid_buffer = shared_buffer(avoid_points, buffer_distance(config_dict.get('avoid_buffer_distance', '100 feet')))
+    dissolved_avoid = None if mode == 'approximate' else dag.add("dissolve_avoid", cached_stage, "dissolve_avoid", dissolve_layer,
+                              [avoid_buffer, "Dissolved_Avoid"], [avoid_buffer], config_dict)
+    scenario_ids = []
+    for number, distances in enumerate(scenarios, start=1):
+        sid = f"s{number:03d}"
+        scenario_ids.append(sid)
+        buffered = [shared_buffer(layer, distance) for layer, distance in distances.items()]
+        if mode == 'approximate':
+            dag.add(f"{sid}_summary", approximate_overlay, buffered, avoid_buffer, config_dict, None)
+            continue
+        intersect_layer = dag.add(f"{sid}_intersect", cached_stage, f"{sid}_intersect", intersect, [buffered],
+                                  buffered, config_dict, f"Intersect_{sid}")
+        dissolved_intersect = dag.add(f"{sid}_dissolve_intersect", cached_stage, f"{sid}_dissolve_intersect",
+                                      dissolve_layer, [intersect_layer, f"Dissolved_Intersect_{sid}"],
+                                      [intersect_layer], config_dict)
+        final_analysis = dag.add(f"{sid}_erase", cached_stage, f"{sid}_erase", erase_dissolved,
+                                 [dissolved_intersect, dissolved_avoid], [dissolved_intersect, dissolved_avoid],
+                                 config_dict, f"Final_Analysis_{sid}")
+        addresses = dag.add(f"{sid}_addresses", cached_stage, f"{sid}_addresses", spatial_join,
+                            ["Building_Addresses", final_analysis], ["Building_Addresses", final_analysis],
+                            config_dict, f"Addresses_{sid}")
+        dag.add(f"{sid}_summary", summarize_scenario, final_analysis, addresses, config_dict)
+        if mode == 'compare':
+            approximate = dag.add(f"{sid}_approximate", approximate_overlay, buffered, avoid_buffer, config_dict,
+                                  f"Final_Analysis_Approx_{sid}")
+            dag.add(f"{sid}_disagreement", compare_overlays, final_analysis, approximate,
+                    {**config_dict, 'overlay_disagreement_file': None})
+    return dag, scenario_ids
+
+def run_sweep(grid, config_dict):
+    """
+    Runs every combination of buffer distances and writes the results table.
+
+    Parameters:
+        grid (dict): Layer name -> distance or list of distances.
+        config_dict (dict): Configuration dictionary.
+
+    Returns:
+        list of dict: One row per scenario with its distances, treatment area and address count.
+    """
+    scenarios = expand_grid(grid)
+    print(f"Running {len(scenarios)} scenario(s)")
+    dag, scenario_ids = build_sweep(scenarios, config_dict)
+    results = dag.run()
+    layers = list(grid)
+    rows = []
+    for sid, distances in zip(scenario_ids, scenarios):
+        row = {'scenario': sid, **{layer: distances[layer] for layer in layers}, **results[f"{sid}_summary"]}
+        disagreement = results.get(f"{sid}_disagreement")
+        if disagreement:
+            row.update(area_disagreement_pct=disagreement['area_disagreement_pct'],
+                       missed_addresses=disagreement['missed_addresses'],
+                       extra_addresses=disagreement['extra_addresses'])
+        rows.append(row)
+    write_results_table(rows, layers, config_dict)
+    return rows
+
+def write_results_table(rows, layers, config_dict):
+    """
+    Prints the scenario results and writes them to sweep_results_file.
+
+    Parameters:
+        rows (list of dict): Scenario rows from run_sweep or run_raster_sweep.
+        layers (list of str): Layer columns.
+        config_dict (dict): Configuration dictionary.
+
+    Returns:
+        str: Path to the results table.
+    """
+    table_path = os.path.join(config_dict.get('output_folder'), config_dict.get('sweep_results_file',
+                                                                                 'scenario_results.csv'))
+    with open(table_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=[k for k in rows[0] if k != 'dataset'] if rows else ['scenario'],
+                                extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+
+    compared = bool(rows) and 'area_disagreement_pct' in rows[0]
+    print(f"{'scenario':<10}" + ''.join(f"{layer[:20]:>22}" for layer in layers) + f"{'acres':>12}{'addresses':>11}"
+          + (f"{'diff %':>9}{'missed':>8}{'extra':>7}" if compared else ""))
+    for row in rows:
+        print(f"{row['scenario']:<10}" + ''.join(f"{row[layer]:>22}" for layer in layers)
+              + f"{row['treatment_acres']:>12.1f}{row['address_count']:>11}"
+              + (f"{row['area_disagreement_pct']:>9.2f}{row['missed_addresses']:>8}{row['extra_addresses']:>7}"
+                 if compared else ""))
+    print(f"Scenario results written to {table_path}")
+    return table_path
+
+BUFFER_LAYERS = ["Mosquito_Larval_Sites", "Wetlands", "Lakes_and_Reservoirs", "OSMP_Properties"]
+
+@tracer.traced()
+def run_raster_sweep(grid, config_dict, polygonize=False):
+    """
+    Answers every scenario of a grid from distance-field rasters instead of
+    vector geoprocessing: each buffer is a threshold on its layer's cached
+    distance raster, the intersect a max across layers and the erase a
+    threshold on the avoid points raster. Addresses are counted by looking up
+    their cells. Results are within the documented raster error bound.
+
+    Parameters:
+        grid (dict): Layer name -> distance or list of distances.
+        config_dict (dict): Configuration dictionary.
+        polygonize (bool): Also write each scenario's area as Final_Analysis_raster_<id>.
+
+    Returns:
+        list of dict: One row per scenario with its distances, treatment area and address count.
+    """
+    # The raster mode needs NumPy and Shapely; importing them here keeps them optional for the vector workflow
+    import numpy as np
+    from gis.DistanceField import DistanceFieldStore
+    backend = get_backend(config_dict)
+    # Fields are only built for the layers in the grid, and the intersect lies within their extent
+    store = DistanceFieldStore(config_dict, backend, list(grid))
+    avoid_points = config_dict.get('avoid_points_name', 'avoid_points')
+    avoid = {avoid_points: buffer_distance(config_dict.get('avoid_buffer_distance', '100 feet'))}
+    scenarios = expand_grid(grid)
+    # Checked up front so a distance beyond the field cap fails before any field is computed
+    for distances in scenarios + [avoid]:
+        store.check_distances(distances)
+    address_xy = address_coordinates(backend)
+
+    rows = []
+    for number, distances in enumerate(scenarios, start=1):
+        sid = f"s{number:03d}"
+        with tracer.span(f"{sid}_raster", 'stage'):
+            mask = store.overlay_mask(distances, avoid)
+            inside = store.points_in_mask(mask, address_xy[:, 0], address_xy[:, 1])
+            rows.append({'scenario': sid, **distances, 'treatment_acres': store.area_m2(mask) / 4046.8564224,
+                         'address_count': int(np.count_nonzero(inside))})
+            if polygonize:
+                backend.write_geometry(f"Final_Analysis_raster_{sid}", store.polygonize(mask))
+    print(f"Raster error bound: boundaries within {store.error_bound:.1f} {store.linear_unit} of the vector result")
+    write_results_table(rows, list(grid), config_dict)
+    return rows
+
+# --- Commands ---
+
+def run_extract(args, config_dict):
+    """
+    Downloads the spreadsheet to raw_addresses.csv.
+
+    :param args: Parsed command line arguments.
+    :param config_dict: Configuration dictionary.
+    :return: None
+    """
+    from etl.GSheetsEtl import GSheetsEtl
+    with tracer.span("extract"):
+        GSheetsEtl(config_dict).extract()
+
+def run_geocode(args, config_dict):
+    """
+    Geocodes raw_addresses.csv into new_addresses.csv and loads the avoid points.
+
+    :param args: Parsed command line arguments.
+    :param config_dict: Configuration dictionary.
+    :return: None
+    """
+    from etl.GSheetsEtl import GSheetsEtl
+    etl_instance = GSheetsEtl(config_dict)
+    input_file = os.path.join(config_dict.get('download_dir', ''), 'raw_addresses.csv')
+    output_file = os.path.join(config_dict.get('download_dir', ''), 'new_addresses.csv')
+    with tracer.span("transform") as span:
+        etl_instance.transform(input_file, output_file)
+        span.args['unique_addresses'] = etl_instance.unique_addresses
+    load(config_dict, etl_instance.append_only)
+    etl_instance.commit_extract_state()
+
+def run_analysis(args, config_dict):
+    """
+    Runs the analysis workflow, or the scenario sweep with --sweep. Buffer
+    distances are prompted for unless --batch is given.
+
+    :param args: Parsed command line arguments.
+    :param config_dict: Configuration dictionary.
+    :return: dict of stage results, empty for a sweep.
+    """
+    config_dict.setdefault('run_id', uuid.uuid4().hex)
+    backend = get_backend(config_dict)
+    if args.sweep:
+        print("\n=== Running Scenario Sweep ===")
+        grid = parse_grid(args.grid) if args.grid else config_dict.get('buffer_distance_grid')
+        if not grid:
+            raise ValueError("No buffer distance grid: pass --grid or set buffer_distance_grid in the config")
+        grid = {layer: grid[layer] for layer in grid if backend.exists(layer)}
+        if args.raster:
+            run_raster_sweep(grid, config_dict, args.polygonize)
+        else:
+            run_sweep(grid, config_dict)
+        return {}
+
+    print("\n=== Collecting Buffer Distances ===")
+    buffer_distances = {}
+    for layer in BUFFER_LAYERS:
+        if backend.exists(layer):
+            if args.batch:
+                buffer_distances[layer] = buffer_distance(config_dict['buffer_distances'][layer])
+                continue
             input_distance = input(f"Enter buffer distance for {layer} in feet: ").strip()
             input_distance_clean = ''.join(c for c in input_distance if c.isdigit())
             if not input_distance_clean:
                 raise ValueError(f"Invalid buffer distance: {input_distance}")
-            buffer(layer, input_distance_clean + " feet", config_dict)
-
-    print("\n=== Intersecting Buffers ===")
-    intersect_layer = intersect([f"buf_{layer}" for layer in buffer_layer_list], config_dict)
-
-    print("\n=== Buffering Avoid Points ===")
-    avoid_points_buffer = buffer(config_dict.get('avoid_points_name', 'avoid_points'), config_dict.get('avoid_buffer_distance', '100 feet'), config_dict)
+            buffer_distances[layer] = input_distance_clean + " feet"
+
+    print("\n=== Running Analysis Workflow ===")
+    mode = config_dict.get('analysis_mode', 'exact')
+    incremental = ((args.incremental or config_dict.get('incremental_analysis', False))
+                   and mode in ('exact', 'compare'))
+    if incremental and incremental_reanalysis(buffer_distances, config_dict):
+        results = {'spatial_join': os.path.join(config_dict.get('gdb_path'), "Target_Addresses")}
+    else:
+        # Cleared first so a failed run does not leave a state describing the outputs it replaced
+        clear_analysis_state(config_dict)
+        results = build_workflow(buffer_distances, config_dict).run()
+        # Recording the state fingerprints every hazard layer, so it is only done when a later run can use it
+        if incremental:
+            save_analysis_state(buffer_distances, config_dict)
+    if 'approximate_overlay' in results:
+        approximate = results['approximate_overlay']
+        print(f"Approximate treatment area: {approximate['treatment_acres']:.1f} acres, "
+              f"{approximate['address_count']} addresses")
+    if config_dict.get('simplify_layers'):
+        print("\n=== Simplification Report ===")
+        simplify_report(config_dict)
+    if config_dict.get('stage_cache_enabled', False):
+        stage_cache = open_stage_cache(config_dict, backend)
+        stage_cache.report(config_dict['run_id'])
+        stage_cache.close()
+    return results
+
+def run_report(args, config_dict):
+    """
+    Regenerates the address CSV from the existing Final_Analysis and prints the
+    simplification and stage cache reports of the latest run.
 
-    print("\n=== Erasing Avoid Points ===")
-    erased_layer = erase(intersect_layer, avoid_points_buffer, config_dict)
+    :param args: Parsed command line arguments.
+    :param config_dict: Configuration dictionary.
+    :return: None
+    """
+    generate_address_report(config_dict)
+    if config_dict.get('simplify_layers'):
+        simplify_report(config_dict)
+    if config_dict.get('stage_cache_enabled', False):
+        stage_cache = open_stage_cache(config_dict, get_backend(config_dict))
+        run_id = stage_cache.latest_run_id()
+        if run_id:
+            stage_cache.report(run_id)
+        stage_cache.close()
+
+def run_export(args, config_dict, target_addresses=None):
+    """
+    Adds the target addresses to the ArcGIS Pro project and exports the map.
 
-    print("\n=== Spatial Join ===")
-    target_addresses = spatial_join("Building_Addresses", intersect_layer, config_dict)
+    :param args: Parsed command line arguments.
+    :param config_dict: Configuration dictionary.
+    :param target_addresses: Target address layer, defaults to Target_Addresses in the geodatabase.
+    :return: None
+    """
+    print("\n=== Setting Spatial Reference ===")
+    spatial_reference()
 
     print("\n=== Adding Target Addresses to Project ===")
-    add_to_project(target_addresses, config_dict)
+    add_to_project(target_addresses or os.path.join(config_dict.get('gdb_path'), "Target_Addresses"), config_dict)
 
     print("\n=== Exporting Map ===")
-    export_map(config_dict)
+    export_map(config_dict, args.subtitle or (config_dict.get('map_subtitle') if args.batch else None))
+
+def run_all(args, config_dict):
+    """
+    Runs the whole project: ETL, analysis and, on ArcGIS with an exact overlay,
+    the map export.
+
+    :param args: Parsed command line arguments.
+    :param config_dict: Configuration dictionary.
+    :return: None
+    """
+    if not args.skip_etl:
+        print("\n=== Starting ETL Process ===")
+        etl(config_dict)
+    results = run_analysis(args, config_dict)
+    # Checked from the config so the check itself does not load arcpy
+    if (config_dict.get('geometry_backend', 'arcpy') == 'arcpy' and not args.sweep
+            and config_dict.get('analysis_mode', 'exact') != 'approximate'):
+        run_export(args, config_dict, results.get('spatial_join'))
+
+COMMANDS = {
+    'run': run_all,
+    'extract': run_extract,
+    'geocode': run_geocode,
+    'analyze': run_analysis,
+    'report': run_report,
+    'export': run_export,
+}
+
+def parse_args(argv=None):
+    """
+    Parses the command line. The first argument selects a subcommand; without
+    one the whole project runs ('run'), prompting for buffer distances and the
+    map subtitle unless --batch is given.
+
+    Parameters:
+        argv (list of str): Arguments, defaults to sys.argv[1:].
+
+    Returns:
+        argparse.Namespace: Parsed arguments; 'command' holds the subcommand.
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in COMMANDS and argv[0] not in ("-h", "--help"):
+        argv = ['run'] + argv
+
+    analysis = argparse.ArgumentParser(add_help=False)
+    analysis.add_argument("--batch", action="store_true",
+                          help="Run unattended using buffer_distances and map_subtitle from the config")
+    analysis.add_argument("--sweep", action="store_true",
+                          help="Run every combination of buffer_distance_grid from the config and write a results "
+                               "table")
+    analysis.add_argument("--grid", nargs="+", metavar="LAYER=D1,D2",
+                          help="Buffer distance grid for --sweep, overriding buffer_distance_grid (distances in feet)")
+    analysis.add_argument("--mode", choices=["exact", "approximate", "compare", "tiled"],
+                          help="Overlay mode, overriding analysis_mode: exact vector, approximate raster, both "
+                               "compared, or exact vector in parallel tiles")
+    analysis.add_argument("--raster", action="store_true",
+                          help="Answer --sweep from cached distance-field rasters instead of vector geoprocessing")
+    analysis.add_argument("--polygonize", action="store_true",
+                          help="With --raster, also write each scenario's area as a polygon layer")
+    analysis.add_argument("--incremental", action="store_true",
+                          help="Patch the previous results when only the avoid points changed")
+    export = argparse.ArgumentParser(add_help=False)
+    export.add_argument("--subtitle", help="Map subtitle, instead of prompting for it")
+
+    parser = argparse.ArgumentParser(description="West Nile Virus outbreak analysis")
+    commands = parser.add_subparsers(dest="command")
+    run = commands.add_parser("run", parents=[analysis, export], help="ETL, analysis and map export (default)")
+    run.add_argument("--skip-etl", action="store_true", help="Use the existing avoid points")
+    commands.add_parser("extract", help="Download the spreadsheet")
+    commands.add_parser("geocode", help="Geocode the downloaded addresses and load the avoid points")
+    commands.add_parser("analyze", parents=[analysis], help="Run the analysis workflow or a sweep")
+    commands.add_parser("report", help="Regenerate the address report and print the run reports")
+    export_command = commands.add_parser("export", parents=[export], help="Add the results to the project and "
+                                                                         "export the map")
+    export_command.add_argument("--batch", action="store_true", help="Use map_subtitle from the config")
+    return parser.parse_args(argv)
+
+def parse_grid(items):
+    """
+    Parses LAYER=D1,D2 command line items into a grid.
+
+    Parameters:
+        items (list of str): Items such as 'Wetlands=1000,1500'.
+
+    Returns:
+        dict: Layer name -> list of distances.
+    """
+    grid = {}
+    for item in items:
+        layer, _, distances = item.partition("=")
+        if not layer or not distances:
+            raise ValueError(f"Invalid grid item: {item}")
+        grid[layer] = [d for d in distances.split(",") if d]
+    return grid
+
+# --- Main ---
+
+if __name__ == '__main__':
+    args = parse_args()
+    config_dict = setup()
+    if getattr(args, 'mode', None):
+        config_dict['analysis_mode'] = args.mode
+    startup_seconds = time.perf_counter() - START_TIME
+    tracer.record("startup", 'stage', START_TIME, startup_seconds, command=args.command)
+    print(f"Startup for '{args.command}': {startup_seconds:.2f} seconds")
+
+    COMMANDS[args.command](args, config_dict)
 
     print("\n=== All operations completed successfully! ===")
 
-    print("\n=== Generating Address Report ===")
-    generate_address_report(config_dict)
\ No newline at end of file
+    trace_path = os.path.join(config_dict.get('output_folder'), config_dict.get('trace_file', 'wnv_trace.json'))
+    summary_path = os.path.join(config_dict.get('output_folder'),
+                                config_dict.get('trace_summary_file', 'wnv_trace_summary.json'))
+    tracer.write(trace_path, summary_path)
+    tracer.print_summary()
+    print(f"Trace written to {trace_path}")
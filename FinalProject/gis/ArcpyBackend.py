@@ -0,0 +1,272 @@
+import hashlib
+import os
+import arcpy
+from gis.GeometryBackend import GeometryBackend
+from pipeline.Tracer import tracer
+
+
+def feature_count(dataset):
+    """
+        Counts the features in a dataset for tracing.
+
+        Parameters:
+            dataset (str): Path or name of a feature class or table.
+
+        Returns:
+            int or None: Feature count, or None if the dataset cannot be counted.
+    """
+    try:
+        return int(arcpy.management.GetCount(dataset)[0])
+    except Exception:
+        return None
+
+def run_tool(tool_func, *args, **kwargs):
+    """
+        Wrapper for running ArcPy tools with timing and messaging.
+        Each call is recorded as a traced span with its input and output feature counts.
+
+        Parameters:
+            tool_func (callable): ArcPy tool function.
+            *args: Positional arguments for the tool.
+            **kwargs: Keyword arguments for the tool.
+
+        Returns:
+            Result object returned by the ArcPy tool function.
+    """
+    tool_name = tool_func.__name__
+    print(f"Starting {tool_name}...")
+    with tracer.span(tool_name, 'tool') as span:
+        in_features = args[0] if args else kwargs.get('target_features', kwargs.get('in_features'))
+        if isinstance(in_features, (list, tuple)):
+            span.args['input_count'] = sum(feature_count(f) or 0 for f in in_features)
+        elif isinstance(in_features, str):
+            span.args['input_count'] = feature_count(in_features)
+
+        result = tool_func(*args, **kwargs)
+
+        try:
+            span.args['output'] = result.getOutput(0)
+            span.args['output_count'] = feature_count(span.args['output'])
+        except Exception:
+            pass
+
+    print(f"Finished {tool_name} in {span.duration:.2f} seconds.")
+    print(arcpy.GetMessages())
+    return result
+
+
+class ArcpyBackend(GeometryBackend):
+    """
+    Geometry backend running the ArcGIS geoprocessing tools against the project
+    geodatabase. Buffers are written as shapefiles to output_folder, all other
+    outputs to gdb_path.
+
+    :param config_dict: Configuration dictionary.
+    :return: None
+    """
+
+    name = 'arcpy'
+
+    def __init__(self, config_dict):
+        super().__init__(config_dict)
+        arcpy.env.workspace = config_dict.get('gdb_path')
+        arcpy.env.overwriteOutput = True
+        arcpy.env.parallelProcessingFactor = config_dict.get('parallel_processing_factor', "100%")
+
+    def gdb_output(self, out_name):
+        return os.path.join(self.config_dict.get('gdb_path'), out_name)
+
+    def exists(self, dataset):
+        return arcpy.Exists(dataset)
+
+    def count(self, dataset):
+        return int(arcpy.management.GetCount(dataset)[0])
+
+    def delete(self, dataset):
+        run_tool(arcpy.management.Delete, dataset)
+
+    def xy_table_to_point(self, csv_path, out_name, x_field="X", y_field="Y"):
+        run_tool(arcpy.management.XYTableToPoint, csv_path, out_name, x_field, y_field)
+        return out_name
+
+    def create_points(self, out_name):
+        run_tool(arcpy.management.CreateFeatureclass, self.config_dict.get('gdb_path'), out_name, "POINT",
+                 spatial_reference=arcpy.SpatialReference(4326))
+        for field_name, field_type in (("X", "DOUBLE"), ("Y", "DOUBLE"), ("Type", "TEXT"), ("AddrKey", "TEXT")):
+            arcpy.management.AddField(out_name, field_name, field_type)
+        return out_name
+
+    def insert_points(self, dataset, points):
+        with arcpy.da.InsertCursor(dataset, ["SHAPE@XY", "X", "Y", "Type", "AddrKey"]) as cursor:
+            for lon, lat, point_type, key in points:
+                cursor.insertRow(((lon, lat), lon, lat, point_type, key))
+        return dataset
+
+    def point_keys(self, dataset, key_field="AddrKey"):
+        if key_field not in [f.name for f in arcpy.ListFields(dataset)]:
+            return None
+        with arcpy.da.SearchCursor(dataset, [key_field, "X", "Y"]) as cursor:
+            return {key: (float(x), float(y)) for key, x, y in cursor if key}
+
+    def upsert_points(self, dataset, upserts, deletes, key_field="AddrKey"):
+        remaining = dict(upserts)
+        updated = deleted = 0
+        changed_keys = sorted(set(upserts) | set(deletes))
+        batch_size = self.config_dict.get('upsert_batch_size', 500)
+        # Only the changed rows are visited: the cursor is restricted to a batch of keys at a time
+        for start in range(0, len(changed_keys), batch_size):
+            keys = ", ".join(f"'{key}'" for key in changed_keys[start:start + batch_size])
+            where_clause = f"{arcpy.AddFieldDelimiters(dataset, key_field)} IN ({keys})"
+            with arcpy.da.UpdateCursor(dataset, [key_field, "SHAPE@XY", "X", "Y", "Type"], where_clause) as cursor:
+                for row in cursor:
+                    if row[0] in deletes:
+                        cursor.deleteRow()
+                        deleted += 1
+                    elif row[0] in remaining:
+                        lon, lat, point_type = remaining.pop(row[0])
+                        cursor.updateRow([row[0], (lon, lat), lon, lat, point_type])
+                        updated += 1
+        self.insert_points(dataset, [(lon, lat, point_type, key) for key, (lon, lat, point_type) in remaining.items()])
+        return len(remaining), updated, deleted
+
+    def append(self, in_dataset, target_dataset):
+        run_tool(arcpy.management.Append, in_dataset, target_dataset, "NO_TEST")
+        return target_dataset
+
+    def buffer(self, in_dataset, out_name, buf_dist):
+        out_path = os.path.join(self.config_dict.get('output_folder'), f"{out_name}.shp")
+        run_tool(arcpy.analysis.Buffer, in_dataset, out_path, buf_dist, "FULL", "ROUND", "ALL")
+        return out_path
+
+    def simplify(self, in_dataset, out_name, tolerance):
+        out_path = self.gdb_output(out_name)
+        run_tool(arcpy.cartography.SimplifyPolygon, in_dataset, out_path, "POINT_REMOVE", f"{tolerance:g} Feet",
+                 "0 SquareFeet", "RESOLVE_ERRORS", "NO_KEEP")
+        return out_path
+
+    def vertex_count(self, dataset):
+        with arcpy.da.SearchCursor(dataset, ["SHAPE@"]) as cursor:
+            return sum(row[0].pointCount for row in cursor if row[0])
+
+    def multi_ring_buffer(self, in_dataset, out_name, distances):
+        out_path = self.gdb_output(out_name)
+        run_tool(arcpy.analysis.MultipleRingBuffer, in_dataset, out_path, distances, "Feet", "distance", "ALL",
+                 "FULL")
+        return out_path
+
+    def ring_buffer(self, rings, ring_distance, out_name, extra_distance):
+        # MultipleRingBuffer with ALL writes non-overlapping annuli, so the full buffer at
+        # ring_distance is the union of every ring up to it
+        out_path = os.path.join(self.config_dict.get('output_folder'), f"{out_name}.shp")
+        ring_layer = arcpy.management.MakeFeatureLayer(rings, f"{out_name}_ring",
+                                                       f"distance <= {ring_distance:g}")[0]
+        try:
+            if extra_distance > 0:
+                run_tool(arcpy.analysis.Buffer, ring_layer, out_path, f"{extra_distance:g} Feet", "FULL", "ROUND",
+                         "ALL")
+            else:
+                run_tool(arcpy.management.Dissolve, ring_layer, out_path)
+        finally:
+            arcpy.management.Delete(ring_layer)
+        return out_path
+
+    def intersect(self, in_datasets, out_name):
+        out_path = self.gdb_output(out_name)
+        run_tool(arcpy.analysis.Intersect, in_datasets, out_path, "ALL")
+        return out_path
+
+    def repair(self, dataset):
+        run_tool(arcpy.management.RepairGeometry, dataset, "DELETE_NULL")
+
+    def dissolve(self, in_dataset, out_name):
+        out_path = self.gdb_output(out_name)
+        run_tool(arcpy.management.Dissolve, in_dataset, out_path)
+        return out_path
+
+    def erase(self, in_dataset, erase_dataset, out_name):
+        out_path = self.gdb_output(out_name)
+        run_tool(arcpy.analysis.Erase, in_dataset, erase_dataset, out_path)
+        return out_path
+
+    def spatial_join(self, target_dataset, join_dataset, out_name):
+        out_path = self.gdb_output(out_name)
+        run_tool(arcpy.analysis.SpatialJoin,
+                 target_features=target_dataset,
+                 join_features=join_dataset,
+                 out_feature_class=out_path,
+                 join_type="KEEP_COMMON",
+                 match_option="INTERSECT")
+        return out_path
+
+    def iter_points(self, dataset, fields):
+        with arcpy.da.SearchCursor(dataset, list(fields) + ["SHAPE@X", "SHAPE@Y"],
+                                   spatial_reference=self.analysis_sr) as cursor:
+            for row in cursor:
+                yield row
+
+    @property
+    def analysis_sr(self):
+        # Avoid points are created in WGS84 while the other layers are projected, so geometries
+        # handed to Shapely are projected to vector_crs to be overlaid in one system
+        return arcpy.SpatialReference(int(str(self.config_dict.get('vector_crs', 'EPSG:2876')).split(':')[-1]))
+
+    def geometries(self, dataset, bbox=None):
+        # Shapely is only needed for the raster and tiled modes, so it is imported here
+        import shapely
+        spatial_filter = arcpy.Extent(*bbox, spatial_reference=self.analysis_sr).polygon if bbox is not None else None
+        with arcpy.da.SearchCursor(dataset, ["SHAPE@WKB"], spatial_reference=self.analysis_sr,
+                                   spatial_filter=spatial_filter) as cursor:
+            return [shapely.from_wkb(bytes(wkb)) for (wkb,) in cursor if wkb]
+
+    def extent(self, dataset):
+        extent = arcpy.Describe(dataset).extent.projectAs(self.analysis_sr)
+        return extent.XMin, extent.YMin, extent.XMax, extent.YMax
+
+    def write_geometry(self, out_name, geometry):
+        import shapely
+        out_path = self.gdb_output(out_name)
+        arcpy.management.CopyFeatures([arcpy.FromWKB(bytearray(shapely.to_wkb(geometry)), self.analysis_sr)],
+                                      out_path)
+        return out_path
+
+    def area(self, dataset):
+        meters_per_unit = arcpy.Describe(dataset).spatialReference.metersPerUnit
+        with arcpy.da.SearchCursor(dataset, ["SHAPE@AREA"]) as cursor:
+            return sum(row[0] or 0.0 for row in cursor) * meters_per_unit ** 2
+
+    def fingerprint(self, dataset):
+        geometry_hash = hashlib.sha1()
+        count = 0
+        with arcpy.da.SearchCursor(dataset, ["SHAPE@WKB"]) as cursor:
+            for (wkb,) in cursor:
+                geometry_hash.update(bytes(wkb) if wkb else b"")
+                count += 1
+        return {
+            'schema': [[f.name, f.type] for f in arcpy.ListFields(dataset) if f.type not in ("OID", "Geometry")],
+            'count': count,
+            'geometry': geometry_hash.hexdigest(),
+        }
+
+    def copy(self, in_dataset, out_path):
+        workspace = os.path.dirname(out_path)
+        if workspace.lower().endswith(".gdb") and not arcpy.Exists(workspace):
+            arcpy.management.CreateFileGDB(os.path.dirname(workspace), os.path.basename(workspace))
+        run_tool(arcpy.management.CopyFeatures, in_dataset, out_path)
+        return out_path
+
+    def scratch_path(self, folder, name):
+        return os.path.join(folder, "stage.gdb", name)
+
+    def export_geojson(self, datasets, out_dir):
+        """
+        Exports layers as GeoJSON in their own coordinate system, for use by the
+        Shapely backend on machines without ArcGIS.
+
+        :param datasets: Layer names in the geodatabase.
+        :param out_dir: Folder to write <layer>.geojson files to.
+        :return: None
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        for dataset in datasets:
+            run_tool(arcpy.conversion.FeaturesToJSON, dataset, os.path.join(out_dir, f"{dataset}.geojson"),
+                     geoJSON="GEOJSON", outputToWGS84="KEEP_INPUT_SR")
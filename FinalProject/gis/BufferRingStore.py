@@ -0,0 +1,94 @@
+import json
+import os
+from gis.GeometryBackend import parse_distance
+
+
+class BufferRingStore:
+    """
+    Precomputed multi-ring buffers, so changing a layer's buffer distance does
+    not rerun a full Buffer over the layer.
+
+    For each layer the store holds one dissolved buffer per ring distance
+    (buffer_ring_step up to buffer_ring_max, in feet). A request for a ring
+    distance is answered by selecting that ring. Any other distance d is derived
+    from the nearest smaller ring r by buffering the ring by d - r, which equals
+    buffering the layer by d (the buffer of a buffer is the buffer by the summed
+    distance) but only touches one dissolved polygon instead of every feature.
+    Distances below the first ring fall back to a regular buffer.
+
+    Rings are rebuilt when the layer's fingerprint no longer matches the one
+    they were built from.
+
+    :param config_dict: Configuration dictionary.
+    :param backend: GeometryBackend instance.
+    :return: None
+    """
+
+    def __init__(self, config_dict, backend):
+        self.backend = backend
+        self.store_dir = config_dict.get('buffer_ring_dir') or os.path.join(config_dict.get('output_folder', ''),
+                                                                             'buffer_rings')
+        step = float(config_dict.get('buffer_ring_step', 100))
+        maximum = float(config_dict.get('buffer_ring_max', 5000))
+        self.distances = [step * i for i in range(1, int(maximum // step) + 1)]
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    def index_path(self, layer):
+        return os.path.join(self.store_dir, f"rings_{layer}.json")
+
+    def read_index(self, layer):
+        try:
+            with open(self.index_path(layer), "r", encoding='utf-8') as index_file:
+                return json.load(index_file)
+        except (OSError, ValueError):
+            return None
+
+    def build(self, layer):
+        """
+        Builds (or rebuilds) the rings for a layer.
+
+        :param layer: Input layer name.
+        :return: Dictionary describing the stored rings.
+        """
+        print(f"Building {len(self.distances)} buffer rings for {layer}...")
+        rings = self.backend.multi_ring_buffer(layer, f"rings_{layer}", self.distances)
+        index = {
+            'layer': layer,
+            'rings': rings,
+            'distances': self.distances,
+            'fingerprint': self.backend.fingerprint(layer),
+        }
+        tmp_path = self.index_path(layer) + ".tmp"
+        with open(tmp_path, "w", encoding='utf-8') as index_file:
+            json.dump(index, index_file)
+        os.replace(tmp_path, self.index_path(layer))
+        return index
+
+    def rings_for(self, layer):
+        """
+        Returns the ring index for a layer, building it if it is missing or stale.
+
+        :param layer: Input layer name.
+        :return: Dictionary describing the stored rings.
+        """
+        index = self.read_index(layer)
+        if (index is None or index['distances'] != self.distances or not self.backend.exists(index['rings'])
+                or index['fingerprint'] != json.loads(json.dumps(self.backend.fingerprint(layer)))):
+            index = self.build(layer)
+        return index
+
+    def buffer(self, layer, buf_dist, out_name):
+        """
+        Buffers a layer using the stored rings.
+
+        :param layer: Input layer name.
+        :param buf_dist: Buffer distance such as '1500 feet'.
+        :param out_name: Output name.
+        :return: Path or name of the buffered output.
+        """
+        distance = parse_distance(buf_dist, 'feet')
+        if distance < self.distances[0]:
+            return self.backend.buffer(layer, out_name, buf_dist)
+        index = self.rings_for(layer)
+        ring = max(d for d in index['distances'] if d <= distance + 1e-6)
+        return self.backend.ring_buffer(index['rings'], ring, out_name, max(distance - ring, 0.0))
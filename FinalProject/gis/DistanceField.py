@@ -0,0 +1,265 @@
+import json
+import math
+import os
+import numpy as np
+import shapely
+from shapely.strtree import STRtree
+from gis.GeometryBackend import parse_distance, UNIT_TO_FEET
+from pipeline.Tracer import tracer
+
+
+class DistanceGrid:
+    """
+    Raster grid shared by all distance fields, in the layer coordinate system.
+    Row 0 is the top (maximum Y) row; values describe cell centers.
+
+    :param x_min: Left edge of the grid.
+    :param y_max: Top edge of the grid.
+    :param cell_size: Cell size in layer units.
+    :param rows: Number of rows.
+    :param cols: Number of columns.
+    :return: None
+    """
+
+    def __init__(self, x_min, y_max, cell_size, rows, cols):
+        self.x_min = x_min
+        self.y_max = y_max
+        self.cell_size = cell_size
+        self.rows = rows
+        self.cols = cols
+
+    @classmethod
+    def covering(cls, bounds, cell_size, padding):
+        """
+        Builds a grid covering bounds (x_min, y_min, x_max, y_max) plus padding on every side.
+        """
+        x_min, y_min, x_max, y_max = bounds
+        x_min, y_min, x_max, y_max = x_min - padding, y_min - padding, x_max + padding, y_max + padding
+        return cls(x_min, y_max, cell_size, max(1, math.ceil((y_max - y_min) / cell_size)),
+                   max(1, math.ceil((x_max - x_min) / cell_size)))
+
+    def to_dict(self):
+        return {'x_min': self.x_min, 'y_max': self.y_max, 'cell_size': self.cell_size,
+                'rows': self.rows, 'cols': self.cols}
+
+    def cell_centers(self, row_start, row_stop):
+        """
+        :return: Tuple of (xs, ys) arrays of the cell centers in rows [row_start, row_stop).
+        """
+        xs = self.x_min + (np.arange(self.cols) + 0.5) * self.cell_size
+        ys = self.y_max - (np.arange(row_start, row_stop) + 0.5) * self.cell_size
+        grid_x, grid_y = np.meshgrid(xs, ys)
+        return grid_x.ravel(), grid_y.ravel()
+
+    def cell_index(self, xs, ys):
+        """
+        :return: Tuple of (rows, cols, inside) arrays locating points on the grid.
+        """
+        cols = np.floor((np.asarray(xs, dtype=float) - self.x_min) / self.cell_size).astype(np.int64)
+        rows = np.floor((self.y_max - np.asarray(ys, dtype=float)) / self.cell_size).astype(np.int64)
+        inside = (rows >= 0) & (rows < self.rows) & (cols >= 0) & (cols < self.cols)
+        return rows, cols, inside
+
+    def points_in_mask(self, mask, xs, ys):
+        """
+        :return: Boolean array, True for points whose cell is set in mask.
+        """
+        rows, cols, inside = self.cell_index(xs, ys)
+        hits = np.zeros(len(rows), dtype=bool)
+        hits[inside] = mask[rows[inside], cols[inside]]
+        return hits
+
+    def polygonize(self, mask):
+        """
+        Converts a mask into a polygon. Horizontal runs of set cells that repeat
+        unchanged over consecutive rows are merged into one rectangle, and the
+        rectangles are unioned.
+
+        :param mask: Boolean array of shape (rows, cols).
+        :return: Shapely Polygon or MultiPolygon.
+        """
+        rectangles = []
+        open_runs = {}
+        for row in range(self.rows + 1):
+            runs = set()
+            if row < self.rows and mask[row].any():
+                edges = np.diff(np.concatenate(([0], mask[row].view(np.int8), [0])))
+                runs = set(zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()))
+            for run in list(open_runs):
+                if run not in runs:
+                    rectangles.append((run, open_runs.pop(run), row))
+            for run in runs:
+                open_runs.setdefault(run, row)
+        if not rectangles:
+            return shapely.Polygon()
+        (starts, stops), top_rows, bottom_rows = np.array([r for r, _, _ in rectangles]).T, \
+            np.array([t for _, t, _ in rectangles]), np.array([b for _, _, b in rectangles])
+        boxes = shapely.box(self.x_min + starts * self.cell_size, self.y_max - bottom_rows * self.cell_size,
+                            self.x_min + stops * self.cell_size, self.y_max - top_rows * self.cell_size)
+        return shapely.union_all(boxes)
+
+
+class DistanceFieldStore:
+    """
+    Euclidean distance rasters for the hazard layers, so any buffer distance is
+    a threshold instead of a Buffer run.
+
+    Each layer's field holds, for every cell center, the exact distance to the
+    nearest feature of the layer (capped at distance_field_max_distance), and is
+    cached as a .npy file opened as a read-only memory map. The buffer of a layer
+    at distance d is the set of cells with field <= d; the intersection of several
+    buffers is max(field_i - d_i) <= 0, evaluated in row blocks across layers.
+
+    Error bound: distance is 1-Lipschitz, so a cell whose center is classified
+    differs from the true buffer only where the true boundary passes within half
+    a cell diagonal (cell_size * sqrt(2) / 2) of the center. Every misclassified
+    area therefore lies in a band of that width along the vector buffer boundary.
+
+    Fields are rebuilt when the grid settings or the layer fingerprint change.
+
+    :param config_dict: Configuration dictionary.
+    :param backend: GeometryBackend instance used to read the layers.
+    :param extent_layers: Layers whose combined extent, padded by the maximum distance, sets the grid.
+    :return: None
+    """
+
+    def __init__(self, config_dict, backend, extent_layers):
+        self.backend = backend
+        self.extent_layers = list(extent_layers)
+        self.linear_unit = config_dict.get('vector_linear_unit', 'feet')
+        self.store_dir = config_dict.get('distance_field_dir') or os.path.join(config_dict.get('output_folder', ''),
+                                                                                'distance_fields')
+        self.cell_size = parse_distance(config_dict.get('distance_field_cell_size', '25 feet'), self.linear_unit)
+        self.max_distance = parse_distance(config_dict.get('distance_field_max_distance', '5000 feet'),
+                                           self.linear_unit)
+        self.block_rows = config_dict.get('distance_field_block_rows', 256)
+        self._grid = None
+        self._fields = {}
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    @property
+    def error_bound(self):
+        """
+        :return: Maximum distance, in layer units, between a misclassified cell center and the true buffer boundary.
+        """
+        return self.cell_size * math.sqrt(2) / 2
+
+    @property
+    def cell_area_m2(self):
+        meters_per_unit = UNIT_TO_FEET[self.linear_unit] / UNIT_TO_FEET['meters']
+        return (self.cell_size * meters_per_unit) ** 2
+
+    @property
+    def grid(self):
+        if self._grid is None:
+            bounds = np.array([shapely.total_bounds(self.backend.geometries(layer)) for layer in self.extent_layers])
+            self._grid = DistanceGrid.covering((np.nanmin(bounds[:, 0]), np.nanmin(bounds[:, 1]),
+                                                np.nanmax(bounds[:, 2]), np.nanmax(bounds[:, 3])),
+                                               self.cell_size, self.max_distance)
+        return self._grid
+
+    def field_path(self, layer):
+        return os.path.join(self.store_dir, f"{layer}.npy")
+
+    def meta_path(self, layer):
+        return os.path.join(self.store_dir, f"{layer}.json")
+
+    def field(self, layer):
+        """
+        Returns a layer's distance field, computing it if missing or stale.
+
+        :param layer: Layer name.
+        :return: Read-only float32 memory map of shape (rows, cols).
+        """
+        if layer in self._fields:
+            return self._fields[layer]
+        meta = {
+            'grid': self.grid.to_dict(),
+            'max_distance': self.max_distance,
+            'fingerprint': json.loads(json.dumps(self.backend.fingerprint(layer))),
+        }
+        try:
+            with open(self.meta_path(layer), "r", encoding='utf-8') as meta_file:
+                stored = json.load(meta_file)
+        except (OSError, ValueError):
+            stored = None
+        if stored != meta or not os.path.exists(self.field_path(layer)):
+            self.compute(layer)
+            with open(self.meta_path(layer), "w", encoding='utf-8') as meta_file:
+                json.dump(meta, meta_file)
+        self._fields[layer] = np.load(self.field_path(layer), mmap_mode='r')
+        return self._fields[layer]
+
+    def compute(self, layer):
+        """
+        Computes a layer's distance field block by block into a memory-mapped file.
+
+        :param layer: Layer name.
+        :return: None
+        """
+        grid = self.grid
+        print(f"Computing {grid.rows} x {grid.cols} distance field for {layer}...")
+        with tracer.span("DistanceField", 'tool', layer=layer, cells=grid.rows * grid.cols):
+            tree = STRtree(self.backend.geometries(layer))
+            tmp_path = self.field_path(layer) + ".tmp"
+            field = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(grid.rows, grid.cols))
+            for row_start in range(0, grid.rows, self.block_rows):
+                row_stop = min(row_start + self.block_rows, grid.rows)
+                xs, ys = grid.cell_centers(row_start, row_stop)
+                block = np.full(len(xs), np.inf, dtype=np.float32)
+                (cell_idx, _), distances = tree.query_nearest(shapely.points(xs, ys), max_distance=self.max_distance,
+                                                             return_distance=True, all_matches=False)
+                block[cell_idx] = distances
+                field[row_start:row_stop] = block.reshape(row_stop - row_start, grid.cols)
+            field.flush()
+            del field
+            os.replace(tmp_path, self.field_path(layer))
+
+    def check_distances(self, distances):
+        """
+        Raises ValueError for a distance beyond max_distance, where the fields hold
+        no distances and the grid has no room for the buffer.
+
+        :param distances: Dictionary of layer -> buffer distance.
+        :return: Dictionary of layer -> distance in layer units.
+        """
+        parsed = {layer: parse_distance(d, self.linear_unit) for layer, d in distances.items()}
+        too_far = [f"{layer} {distances[layer]}" for layer, d in parsed.items() if d > self.max_distance]
+        if too_far:
+            raise ValueError(f"Buffer distance beyond distance_field_max_distance ({self.max_distance:g} "
+                             f"{self.linear_unit}): {', '.join(too_far)}")
+        return parsed
+
+    def overlay_mask(self, buffer_distances, erase_distances=None):
+        """
+        Thresholds the distance fields: cells inside every buffer in buffer_distances
+        and outside every buffer in erase_distances. Every distance must be within
+        max_distance (see check_distances).
+
+        :param buffer_distances: Dictionary of layer -> buffer distance to intersect.
+        :param erase_distances: Dictionary of layer -> buffer distance to erase.
+        :return: Boolean array of shape (rows, cols).
+        """
+        grid = self.grid
+        intersect_distances = self.check_distances(buffer_distances)
+        erase_distances = self.check_distances(erase_distances or {})
+        intersect = [(self.field(layer), d) for layer, d in intersect_distances.items()]
+        erase = [(self.field(layer), d) for layer, d in erase_distances.items()]
+        mask = np.empty((grid.rows, grid.cols), dtype=bool)
+        for row_start in range(0, grid.rows, self.block_rows):
+            rows = slice(row_start, min(row_start + self.block_rows, grid.rows))
+            excess = np.max([field[rows] - distance for field, distance in intersect], axis=0)
+            block = excess <= 0
+            for field, distance in erase:
+                block &= field[rows] > distance
+            mask[rows] = block
+        return mask
+
+    def area_m2(self, mask):
+        return float(np.count_nonzero(mask)) * self.cell_area_m2
+
+    def points_in_mask(self, mask, xs, ys):
+        return self.grid.points_in_mask(mask, xs, ys)
+
+    def polygonize(self, mask):
+        return self.grid.polygonize(mask)
@@ -0,0 +1,240 @@
+import re
+from pipeline.Tracer import tracer
+
+# Conversion factors to feet for the linear units accepted in buffer distances
+UNIT_TO_FEET = {
+    'feet': 1.0, 'foot': 1.0, 'ft': 1.0,
+    'meters': 3.280839895, 'meter': 3.280839895, 'm': 3.280839895,
+    'kilometers': 3280.839895, 'kilometer': 3280.839895, 'km': 3280.839895,
+    'miles': 5280.0, 'mile': 5280.0, 'mi': 5280.0,
+    'yards': 3.0, 'yard': 3.0, 'yd': 3.0,
+}
+
+
+def parse_distance(buf_dist, linear_unit='feet'):
+    """
+    Converts a buffer distance such as '1500 feet' into the layer's linear unit.
+
+    :param buf_dist: Distance string with an optional unit (defaults to feet), or a number.
+    :param linear_unit: Linear unit of the layer coordinates.
+    :return: Distance as a float in linear_unit.
+    """
+    if isinstance(buf_dist, (int, float)):
+        return float(buf_dist)
+    match = re.fullmatch(r"\s*([-+]?\d*\.?\d+)\s*([A-Za-z]*)\s*", str(buf_dist))
+    if not match:
+        raise ValueError(f"Invalid buffer distance: {buf_dist}")
+    value, unit = float(match.group(1)), (match.group(2) or 'feet').lower()
+    if unit not in UNIT_TO_FEET or linear_unit not in UNIT_TO_FEET:
+        raise ValueError(f"Unsupported linear unit in '{buf_dist}' or '{linear_unit}'")
+    return value * UNIT_TO_FEET[unit] / UNIT_TO_FEET[linear_unit]
+
+
+class GeometryBackend:
+    """
+    Interface for the geoprocessing operations used by finalproject.py.
+
+    Datasets are identified by the strings each backend returns: paths for
+    arcpy, layer names for the Shapely backend. Operations take an output
+    name and return the identifier of the dataset they wrote.
+
+    :param config_dict: Configuration dictionary.
+    :return: None
+    """
+
+    name = None
+
+    def __init__(self, config_dict):
+        self.config_dict = config_dict
+
+    def exists(self, dataset):
+        raise NotImplementedError
+
+    def count(self, dataset):
+        raise NotImplementedError
+
+    def delete(self, dataset):
+        raise NotImplementedError
+
+    def xy_table_to_point(self, csv_path, out_name, x_field="X", y_field="Y"):
+        """
+        Creates a point dataset from a CSV of WGS84 longitude/latitude values.
+        """
+        raise NotImplementedError
+
+    def create_points(self, out_name):
+        """
+        Creates an empty point dataset with the fields written by xy_table_to_point
+        (X, Y, Type and AddrKey).
+        """
+        raise NotImplementedError
+
+    def insert_points(self, dataset, points):
+        """
+        Bulk-inserts WGS84 points given as (lon, lat, type, key) tuples.
+        """
+        raise NotImplementedError
+
+    def point_keys(self, dataset, key_field="AddrKey"):
+        """
+        Reads the WGS84 location of every keyed point.
+
+        :return: Dictionary of key -> (lon, lat), or None if the dataset has no key field.
+        """
+        raise NotImplementedError
+
+    def upsert_points(self, dataset, upserts, deletes, key_field="AddrKey"):
+        """
+        Updates the points whose key is in upserts, inserts the other upserts and
+        deletes the points whose key is in deletes, leaving all other rows untouched.
+
+        :param upserts: Dictionary of key -> (lon, lat, type).
+        :param deletes: Set of keys to delete.
+        :return: Tuple of (inserted, updated, deleted) counts.
+        """
+        raise NotImplementedError
+
+    def append(self, in_dataset, target_dataset):
+        raise NotImplementedError
+
+    def buffer(self, in_dataset, out_name, buf_dist):
+        """
+        Buffers with FULL sides, ROUND ends and ALL dissolve.
+        """
+        raise NotImplementedError
+
+    def simplify(self, in_dataset, out_name, tolerance):
+        """
+        Topology-preserving simplification: vertices are removed while every
+        output stays valid and within tolerance (feet) of its input.
+        """
+        raise NotImplementedError
+
+    def vertex_count(self, dataset):
+        raise NotImplementedError
+
+    def multi_ring_buffer(self, in_dataset, out_name, distances):
+        """
+        Writes the buffers of a layer at several distances (in feet), with the ring
+        distance in a 'distance' field. Rings may be stored as full buffers or as
+        the non-overlapping bands between consecutive distances; ring_buffer
+        accounts for either.
+        """
+        raise NotImplementedError
+
+    def ring_buffer(self, rings, ring_distance, out_name, extra_distance):
+        """
+        Extracts the full (hole-free) buffer at ring_distance (feet) and buffers it
+        by a further extra_distance (feet), writing it like buffer() does. The
+        result equals buffer() of the layer by ring_distance + extra_distance.
+        """
+        raise NotImplementedError
+
+    def intersect(self, in_datasets, out_name):
+        """
+        Intersects all inputs, keeping ALL attributes.
+        """
+        raise NotImplementedError
+
+    def repair(self, dataset):
+        """
+        Repairs geometries in place, deleting null geometries.
+        """
+        raise NotImplementedError
+
+    def dissolve(self, in_dataset, out_name):
+        raise NotImplementedError
+
+    def erase(self, in_dataset, erase_dataset, out_name):
+        raise NotImplementedError
+
+    def spatial_join(self, target_dataset, join_dataset, out_name):
+        """
+        One-to-one spatial join with KEEP_COMMON and INTERSECT.
+        """
+        raise NotImplementedError
+
+    def iter_points(self, dataset, fields):
+        """
+        Yields the requested field values followed by the point X and Y.
+        """
+        raise NotImplementedError
+
+    def geometries(self, dataset, bbox=None):
+        """
+        Reads geometries for the NumPy/Shapely engines. Every backend returns
+        them in one analysis coordinate system (vector_crs), so layers stored
+        in different systems can be overlaid.
+
+        :param bbox: Optional (x_min, y_min, x_max, y_max); only features intersecting it are returned.
+        :return: List of the dataset's non-null geometries as Shapely objects.
+        """
+        raise NotImplementedError
+
+    def extent(self, dataset):
+        """
+        :return: (x_min, y_min, x_max, y_max) of the dataset in the analysis coordinate system.
+        """
+        raise NotImplementedError
+
+    def write_geometry(self, out_name, geometry):
+        """
+        Writes a single Shapely geometry given in the analysis coordinate system.
+        """
+        raise NotImplementedError
+
+    def area(self, dataset):
+        """
+        :return: Total area of a polygon dataset in square meters.
+        """
+        raise NotImplementedError
+
+    def fingerprint(self, dataset):
+        """
+        Describes a dataset's content for the stage cache.
+
+        :return: Dictionary with the 'schema' (field names and types), feature
+                 'count' and a 'geometry' hash over all shapes in order.
+        """
+        raise NotImplementedError
+
+    def copy(self, in_dataset, out_path):
+        """
+        Copies a dataset to a path (a cache snapshot) or back to a dataset identifier.
+        """
+        raise NotImplementedError
+
+    def scratch_path(self, folder, name):
+        """
+        :return: Path in folder that copy() can write a dataset named name to.
+        """
+        raise NotImplementedError
+
+
+def get_backend(config_dict):
+    """
+    Returns the geometry backend named by 'geometry_backend' ('arcpy' or 'shapely').
+    Each backend's dependencies are only imported when it is selected, so the
+    Shapely backend runs on machines without ArcGIS, and commands that never
+    touch a dataset never pay for the arcpy import. The import time is traced.
+
+    :param config_dict: Configuration dictionary.
+    :return: GeometryBackend instance, shared for the life of the process.
+    """
+    name = config_dict.get('geometry_backend', 'arcpy')
+    backend = _backends.get(name)
+    if backend is None:
+        with tracer.span(f"load {name} backend", 'tool'):
+            if name == 'arcpy':
+                from gis.ArcpyBackend import ArcpyBackend
+                backend = ArcpyBackend(config_dict)
+            elif name == 'shapely':
+                from gis.ShapelyBackend import ShapelyBackend
+                backend = ShapelyBackend(config_dict)
+            else:
+                raise ValueError(f"Unknown geometry backend: {name}")
+        _backends[name] = backend
+    return backend
+
+
+_backends = {}
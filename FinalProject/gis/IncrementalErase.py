@@ -0,0 +1,47 @@
+import numpy as np
+import shapely
+
+
+def avoid_point_delta(old_xy, new_xy, precision=2):
+    """
+    Compares two sets of avoid point coordinates.
+
+    :param old_xy: Sequence of (x, y) used by the last analysis.
+    :param new_xy: Sequence of (x, y) of the current avoid points.
+    :param precision: Decimal places coordinates are rounded to before comparing.
+    :return: Tuple of (added, removed) lists of (x, y).
+    """
+    old_keys = {(round(x, precision), round(y, precision)) for x, y in old_xy}
+    new_keys = {(round(x, precision), round(y, precision)) for x, y in new_xy}
+    return sorted(new_keys - old_keys), sorted(old_keys - new_keys)
+
+
+def patch_erase(final_geometries, intersect_geometries, avoid_xy, changed_xy, distance, quad_segs=16):
+    """
+    Updates an erase result after some avoid points were added or removed.
+
+    Final_Analysis is Dissolved_Intersect minus the union of the avoid point
+    buffers. Outside the buffers of the changed points that union is unchanged,
+    so only the affected area R (the changed points buffered by distance) is
+    recomputed:
+
+        new = (old - R) | ((intersect & R) - buffers of the current points near R)
+
+    :param final_geometries: Geometries of the current Final_Analysis.
+    :param intersect_geometries: Geometries of Dissolved_Intersect (before the erase).
+    :param avoid_xy: NumPy array of shape (n, 2) with the current avoid points.
+    :param changed_xy: Added and removed avoid points as (x, y).
+    :param distance: Avoid buffer distance in layer units.
+    :param quad_segs: Segments per quarter circle of the buffers.
+    :return: Tuple of (new Final_Analysis geometry, affected area geometry).
+    """
+    affected = shapely.union_all(shapely.buffer(shapely.points(np.asarray(changed_xy, dtype=float)), distance,
+                                                quad_segs=quad_segs))
+    avoid_points = shapely.points(np.asarray(avoid_xy, dtype=float).reshape(-1, 2))
+    nearby = avoid_points[shapely.dwithin(affected, avoid_points, distance)]
+    local_avoid = shapely.union_all(shapely.buffer(nearby, distance, quad_segs=quad_segs)) if len(nearby) \
+        else shapely.Polygon()
+    recomputed = shapely.difference(shapely.intersection(shapely.union_all(intersect_geometries), affected),
+                                    local_avoid)
+    kept = shapely.difference(shapely.union_all(final_geometries), affected)
+    return shapely.union(kept, recomputed), affected
@@ -0,0 +1,116 @@
+import numpy as np
+import shapely
+from gis.DistanceField import DistanceGrid
+from gis.GeometryBackend import parse_distance, UNIT_TO_FEET
+from pipeline.Tracer import tracer
+
+
+class RasterOverlay:
+    """
+    Approximate intersect/erase: buffered layers are rasterized to a shared grid
+    and overlaid as NumPy boolean arrays.
+
+    The grid covers the intersection of the extents of the layers being
+    intersected, as nothing outside it can be in the result. A cell is set for a
+    layer when its center lies in the layer's (dissolved) polygons; intersect is
+    a logical AND over the layers and erase an AND-NOT. Cells touched by a
+    polygon boundary may be misclassified, so the result differs from the vector
+    overlay only within one cell diagonal of its boundaries.
+
+    :param config_dict: Configuration dictionary.
+    :param backend: GeometryBackend instance used to read the layers.
+    :return: None
+    """
+
+    def __init__(self, config_dict, backend):
+        self.backend = backend
+        self.linear_unit = config_dict.get('vector_linear_unit', 'feet')
+        self.cell_size = parse_distance(config_dict.get('raster_overlay_cell_size', '25 feet'), self.linear_unit)
+        self.block_rows = config_dict.get('raster_overlay_block_rows', 256)
+
+    @property
+    def cell_area_m2(self):
+        meters_per_unit = UNIT_TO_FEET[self.linear_unit] / UNIT_TO_FEET['meters']
+        return (self.cell_size * meters_per_unit) ** 2
+
+    def rasterize(self, geometry, grid):
+        """
+        Marks the grid cells whose centers lie in a geometry.
+
+        :param geometry: Shapely polygonal geometry.
+        :param grid: DistanceGrid.
+        :return: Boolean array of shape (grid.rows, grid.cols).
+        """
+        mask = np.zeros((grid.rows, grid.cols), dtype=bool)
+        if geometry.is_empty:
+            return mask
+        shapely.prepare(geometry)
+        # Only the rows and columns under the geometry's bounding box need testing
+        x_min, y_min, x_max, y_max = geometry.bounds
+        row_lo = max(0, int((grid.y_max - y_max) // grid.cell_size))
+        col_lo = max(0, int((x_min - grid.x_min) // grid.cell_size))
+        row_hi = min(grid.rows, int((grid.y_max - y_min) // grid.cell_size) + 1)
+        col_hi = min(grid.cols, int((x_max - grid.x_min) // grid.cell_size) + 1)
+        xs = grid.x_min + (np.arange(col_lo, col_hi) + 0.5) * grid.cell_size
+        for row_start in range(row_lo, row_hi, self.block_rows):
+            row_stop = min(row_start + self.block_rows, row_hi)
+            ys = grid.y_max - (np.arange(row_start, row_stop) + 0.5) * grid.cell_size
+            grid_x, grid_y = np.meshgrid(xs, ys)
+            mask[row_start:row_stop, col_lo:col_hi] = shapely.contains_xy(geometry, grid_x, grid_y)
+        return mask
+
+    def overlay(self, intersect_datasets, erase_datasets=()):
+        """
+        Rasterizes the layers and overlays them.
+
+        :param intersect_datasets: Buffered layers to intersect.
+        :param erase_datasets: Layers to erase from the intersection.
+        :return: Tuple of (mask, grid).
+        """
+        with tracer.span("RasterOverlay", 'tool', cell_size=self.cell_size):
+            geometries = [shapely.union_all(self.backend.geometries(d)) for d in intersect_datasets]
+            bounds = np.array([g.bounds for g in geometries if not g.is_empty])
+            if len(bounds) < len(geometries):
+                grid = DistanceGrid(0.0, 0.0, self.cell_size, 0, 0)
+                return np.zeros((0, 0), dtype=bool), grid
+            x_min, y_min = bounds[:, 0].max(), bounds[:, 1].max()
+            x_max, y_max = bounds[:, 2].min(), bounds[:, 3].min()
+            grid = DistanceGrid.covering((x_min, y_min, max(x_min, x_max), max(y_min, y_max)), self.cell_size, 0)
+            mask = np.ones((grid.rows, grid.cols), dtype=bool)
+            for geometry in geometries:
+                mask &= self.rasterize(geometry, grid)
+            for dataset in erase_datasets:
+                mask &= ~self.rasterize(shapely.union_all(self.backend.geometries(dataset)), grid)
+            return mask, grid
+
+    def area_m2(self, mask):
+        return float(np.count_nonzero(mask)) * self.cell_area_m2
+
+
+def overlay_disagreement(exact_geometries, approx_geometries, xs, ys):
+    """
+    Measures how far an approximate overlay result is from the exact one.
+
+    :param exact_geometries: Shapely geometries of the exact (vector) result.
+    :param approx_geometries: Shapely geometries of the approximate result.
+    :param xs: NumPy array of address X coordinates.
+    :param ys: NumPy array of address Y coordinates.
+    :return: Dictionary with the symmetric-difference area as a share of the exact
+             area, and the numbers of addresses inside each result, only inside the
+             exact result (missed) and only inside the approximate one (extra).
+    """
+    exact_geometry = shapely.union_all(exact_geometries)
+    approx_geometry = shapely.union_all(approx_geometries)
+    exact_area = exact_geometry.area
+    difference_area = shapely.symmetric_difference(exact_geometry, approx_geometry).area
+    shapely.prepare(exact_geometry)
+    shapely.prepare(approx_geometry)
+    in_exact = shapely.intersects_xy(exact_geometry, xs, ys) if len(xs) else np.zeros(0, dtype=bool)
+    in_approx = shapely.intersects_xy(approx_geometry, xs, ys) if len(xs) else np.zeros(0, dtype=bool)
+    return {
+        'area_disagreement_pct': 100.0 * difference_area / exact_area if exact_area else 0.0,
+        'exact_addresses': int(np.count_nonzero(in_exact)),
+        'approx_addresses': int(np.count_nonzero(in_approx)),
+        'missed_addresses': int(np.count_nonzero(in_exact & ~in_approx)),
+        'extra_addresses': int(np.count_nonzero(in_approx & ~in_exact)),
+    }
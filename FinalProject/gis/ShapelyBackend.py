@@ -0,0 +1,360 @@
+import csv
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import shapely
+from shapely.geometry import shape, mapping, Polygon, MultiPolygon, GeometryCollection
+from shapely.strtree import STRtree
+from gis.GeometryBackend import GeometryBackend, parse_distance, UNIT_TO_FEET
+from gis.SpatialJoinEngine import PointInPolygonJoin
+from pipeline.Tracer import tracer
+
+
+def polygonal(geom):
+    """
+    Keeps only the polygon parts of a geometry, as overlays can return collections
+    with slivers of lower dimension.
+
+    :param geom: Shapely geometry.
+    :return: Polygon or MultiPolygon, possibly empty.
+    """
+    if isinstance(geom, (Polygon, MultiPolygon)):
+        return geom
+    if isinstance(geom, GeometryCollection):
+        parts = [g for g in geom.geoms if isinstance(g, (Polygon, MultiPolygon))]
+        return shapely.union_all(parts) if parts else Polygon()
+    return Polygon()
+
+
+class ShapelyBackend(GeometryBackend):
+    """
+    Open-source geometry backend using Shapely/GEOS and NumPy.
+
+    Layers are GeoJSON files named <layer>.geojson in vector_dir, in the projected
+    coordinate system given by vector_crs (linear unit vector_linear_unit). Use
+    ArcpyBackend.export_geojson once to produce them from the geodatabase. Outputs
+    are written to the same folder and kept in memory for the rest of the run.
+
+    :param config_dict: Configuration dictionary.
+    :return: None
+    """
+
+    name = 'shapely'
+
+    def __init__(self, config_dict):
+        super().__init__(config_dict)
+        self.vector_dir = config_dict.get('vector_dir') or os.path.join(config_dict.get('proj_dir', ''), 'vector')
+        self.crs = config_dict.get('vector_crs', 'EPSG:2876')
+        self.linear_unit = config_dict.get('vector_linear_unit', 'feet')
+        self.resolution = config_dict.get('buffer_quad_segments', 16)
+        self._layers = {}
+        os.makedirs(self.vector_dir, exist_ok=True)
+
+    # --- Layer storage ---
+
+    def layer_name(self, dataset):
+        return os.path.splitext(os.path.basename(str(dataset)))[0]
+
+    def layer_path(self, dataset):
+        return os.path.join(self.vector_dir, f"{self.layer_name(dataset)}.geojson")
+
+    def read(self, dataset):
+        """
+        Returns a layer as a list of (geometry, properties) tuples.
+
+        :param dataset: Layer name or path.
+        :return: List of features.
+        """
+        name = self.layer_name(dataset)
+        if name not in self._layers:
+            with open(self.layer_path(name), "r", encoding='utf-8') as layer_file:
+                collection = json.load(layer_file)
+            self._layers[name] = [(shape(f['geometry']) if f.get('geometry') else None, f.get('properties') or {})
+                                  for f in collection['features']]
+        return self._layers[name]
+
+    def write(self, out_name, features):
+        """
+        Stores a layer in memory and writes it to vector_dir.
+
+        :param out_name: Output layer name.
+        :param features: List of (geometry, properties) tuples.
+        :return: Layer name.
+        """
+        name = self.layer_name(out_name)
+        self._layers[name] = features
+        collection = {
+            'type': 'FeatureCollection',
+            'crs': {'type': 'name', 'properties': {'name': self.crs}},
+            'features': [{'type': 'Feature', 'properties': props,
+                          'geometry': mapping(geom) if geom is not None else None}
+                         for geom, props in features],
+        }
+        tmp_path = self.layer_path(name) + ".tmp"
+        with open(tmp_path, "w", encoding='utf-8') as layer_file:
+            json.dump(collection, layer_file)
+        os.replace(tmp_path, self.layer_path(name))
+        return name
+
+    # --- GeometryBackend operations ---
+
+    def exists(self, dataset):
+        return self.layer_name(dataset) in self._layers or os.path.exists(self.layer_path(dataset))
+
+    def count(self, dataset):
+        return len(self.read(dataset))
+
+    def delete(self, dataset):
+        self._layers.pop(self.layer_name(dataset), None)
+        if os.path.exists(self.layer_path(dataset)):
+            os.remove(self.layer_path(dataset))
+
+    def xy_table_to_point(self, csv_path, out_name, x_field="X", y_field="Y"):
+        # The geocoded CSV holds WGS84 lon/lat; project it to the layer coordinate system
+        from pyproj import Transformer
+        transformer = Transformer.from_crs("EPSG:4326", self.crs, always_xy=True)
+        with tracer.span("XYTableToPoint", 'tool'):
+            with open(csv_path, "r", encoding='utf-8') as csv_file:
+                rows = list(csv.DictReader(csv_file))
+            xs, ys = transformer.transform([float(r[x_field]) for r in rows], [float(r[y_field]) for r in rows])
+            features = [(shapely.Point(x, y), dict(row)) for x, y, row in zip(xs, ys, rows)]
+            return self.write(out_name, features)
+
+    def create_points(self, out_name):
+        return self.write(out_name, [])
+
+    def insert_points(self, dataset, points):
+        from pyproj import Transformer
+        transformer = Transformer.from_crs("EPSG:4326", self.crs, always_xy=True)
+        with tracer.span("InsertCursor", 'tool', input_count=len(points)):
+            xs, ys = transformer.transform([p[0] for p in points], [p[1] for p in points])
+            features = [(shapely.Point(x, y), {'X': lon, 'Y': lat, 'Type': point_type, 'AddrKey': key})
+                        for x, y, (lon, lat, point_type, key) in zip(xs, ys, points)]
+            return self.write(dataset, self.read(dataset) + features)
+
+    def point_keys(self, dataset, key_field="AddrKey"):
+        features = self.read(dataset)
+        if any(key_field not in props for _, props in features):
+            return None
+        return {props[key_field]: (float(props['X']), float(props['Y'])) for _, props in features}
+
+    def upsert_points(self, dataset, upserts, deletes, key_field="AddrKey"):
+        # GeoJSON has no in-place update, so the layer is rewritten, but only changed features are rebuilt
+        from pyproj import Transformer
+        transformer = Transformer.from_crs("EPSG:4326", self.crs, always_xy=True)
+        with tracer.span("UpsertPoints", 'tool', upserts=len(upserts), deletes=len(deletes)):
+            remaining = dict(upserts)
+            features = []
+            updated = deleted = 0
+            for geom, props in self.read(dataset):
+                key = props.get(key_field)
+                if key in deletes:
+                    deleted += 1
+                    continue
+                if key in remaining:
+                    lon, lat, point_type = remaining.pop(key)
+                    geom = shapely.Point(*transformer.transform(lon, lat))
+                    props = dict(props, X=lon, Y=lat, Type=point_type)
+                    updated += 1
+                features.append((geom, props))
+            for key, (lon, lat, point_type) in remaining.items():
+                features.append((shapely.Point(*transformer.transform(lon, lat)),
+                                 {'X': lon, 'Y': lat, 'Type': point_type, key_field: key}))
+            self.write(dataset, features)
+            return len(remaining), updated, deleted
+
+    def append(self, in_dataset, target_dataset):
+        with tracer.span("Append", 'tool'):
+            return self.write(target_dataset, self.read(target_dataset) + self.read(in_dataset))
+
+    def buffer(self, in_dataset, out_name, buf_dist):
+        distance = parse_distance(buf_dist, self.linear_unit)
+        with tracer.span("Buffer", 'tool', input_count=self.count(in_dataset)):
+            geoms = [g for g, _ in self.read(in_dataset) if g is not None]
+            # FULL sides, ROUND ends, ALL dissolve
+            buffered = shapely.buffer(geoms, distance, quad_segs=self.resolution)
+            dissolved = shapely.union_all(buffered)
+            return self.write(out_name, [(dissolved, {})])
+
+    def simplify(self, in_dataset, out_name, tolerance):
+        with tracer.span("SimplifyPolygon", 'tool', input_count=self.count(in_dataset)):
+            features = [(g, p) for g, p in self.read(in_dataset) if g is not None]
+            simplified = shapely.simplify([g for g, _ in features], parse_distance(f"{tolerance} feet", self.linear_unit),
+                                          preserve_topology=True)
+            return self.write(out_name, [(g, p) for g, (_, p) in zip(simplified, features) if not g.is_empty])
+
+    def vertex_count(self, dataset):
+        return int(shapely.get_num_coordinates(self.geometries(dataset)).sum())
+
+    def multi_ring_buffer(self, in_dataset, out_name, distances):
+        with tracer.span("MultipleRingBuffer", 'tool', input_count=self.count(in_dataset)):
+            geoms = [g for g, _ in self.read(in_dataset) if g is not None]
+            rings = [(shapely.union_all(shapely.buffer(geoms, parse_distance(f"{d} feet", self.linear_unit),
+                                                       quad_segs=self.resolution)), {'distance': d})
+                     for d in distances]
+            return self.write(out_name, rings)
+
+    def ring_buffer(self, rings, ring_distance, out_name, extra_distance):
+        with tracer.span("RingBuffer", 'tool'):
+            ring = next(g for g, p in self.read(rings) if abs(p['distance'] - ring_distance) < 1e-6)
+            if extra_distance > 0:
+                ring = shapely.buffer(ring, parse_distance(f"{extra_distance} feet", self.linear_unit),
+                                      quad_segs=self.resolution)
+            return self.write(out_name, [(ring, {})])
+
+    def intersect(self, in_datasets, out_name):
+        with tracer.span("Intersect", 'tool'):
+            first = self.layer_name(in_datasets[0])
+            result = [(g, {**p, f"FID_{first}": i}) for i, (g, p) in enumerate(self.read(first))
+                      if g is not None]
+            for dataset in in_datasets[1:]:
+                name = self.layer_name(dataset)
+                other = [(i, g, p) for i, (g, p) in enumerate(self.read(name)) if g is not None]
+                if not result or not other:
+                    result = []
+                    break
+                tree = STRtree([g for _, g, _ in other])
+                left, right = tree.query([g for g, _ in result], predicate='intersects')
+                pieces = shapely.intersection([result[i][0] for i in left], [other[j][1] for j in right])
+                next_result = []
+                for piece, i, j in zip(pieces, left, right):
+                    piece = polygonal(piece)
+                    if not piece.is_empty:
+                        fid, _, props = other[j]
+                        next_result.append((piece, {**result[i][1], **props, f"FID_{name}": fid}))
+                result = next_result
+            return self.write(out_name, result)
+
+    def repair(self, dataset):
+        features = [(shapely.make_valid(g), p) for g, p in self.read(dataset) if g is not None and not g.is_empty]
+        self.write(dataset, features)
+
+    def dissolve(self, in_dataset, out_name):
+        with tracer.span("Dissolve", 'tool'):
+            geoms = [g for g, _ in self.read(in_dataset) if g is not None]
+            return self.write(out_name, [(shapely.union_all(geoms), {})] if geoms else [])
+
+    def erase(self, in_dataset, erase_dataset, out_name):
+        with tracer.span("Erase", 'tool'):
+            eraser = shapely.union_all([g for g, _ in self.read(erase_dataset) if g is not None])
+            features = []
+            for geom, props in self.read(in_dataset):
+                if geom is None:
+                    continue
+                remaining = polygonal(geom.difference(eraser))
+                if not remaining.is_empty:
+                    features.append((remaining, props))
+            return self.write(out_name, features)
+
+    def spatial_join(self, target_dataset, join_dataset, out_name):
+        with tracer.span("SpatialJoin", 'tool'):
+            targets = self.read(target_dataset)
+            joins = [(g, p) for g, p in self.read(join_dataset) if g is not None]
+            features = []
+            if joins:
+                target_ids = [i for i, (g, _) in enumerate(targets) if g is not None]
+                target_geoms = [targets[i][0] for i in target_ids]
+                if all(g.geom_type == 'Point' for g in target_geoms):
+                    matches = self.point_join_matches(target_ids, target_geoms, [g for g, _ in joins])
+                else:
+                    tree = STRtree([g for g, _ in joins])
+                    target_idx, join_idx = tree.query(target_geoms, predicate='intersects')
+                    matches = {}
+                    for t, j in zip(target_idx, join_idx):
+                        first, count = matches.get(target_ids[t], (j, 0))
+                        matches[target_ids[t]] = (min(first, j), count + 1)
+                # JOIN_ONE_TO_ONE: count every match but carry the first match's attributes
+                for i in sorted(matches):
+                    geom, props = targets[i]
+                    first, count = matches[i]
+                    joined = {**joins[first][1], **props}
+                    joined.update({'Join_Count': count, 'TARGET_FID': i})
+                    features.append((geom, joined))
+            return self.write(out_name, features)
+
+    def point_join_matches(self, target_ids, points, polygons):
+        """
+        Matches point targets to polygons with the batched STR-tree engine.
+
+        :param target_ids: Feature index of each point in the target layer.
+        :param points: Point geometries.
+        :param polygons: Join polygon geometries.
+        :return: Dictionary of target index -> (first polygon index, match count).
+        """
+        coords = shapely.get_coordinates(points)
+        engine = PointInPolygonJoin(polygons, batch_size=self.config_dict.get('join_batch_size', 200000))
+        join_count, first_match = engine.join(coords[:, 0], coords[:, 1])
+        return {target_ids[k]: (int(first_match[k]), int(join_count[k])) for k in np.flatnonzero(join_count)}
+
+    def iter_points(self, dataset, fields):
+        for geom, props in self.read(dataset):
+            if geom is None:
+                continue
+            point = geom if geom.geom_type == 'Point' else geom.representative_point()
+            yield tuple(props.get(f) for f in fields) + (point.x, point.y)
+
+    def geometries(self, dataset, bbox=None):
+        if bbox is not None and self.layer_name(dataset) not in self._layers:
+            return self.read_window(dataset, bbox)
+        geoms = [g for g, _ in self.read(dataset) if g is not None]
+        if bbox is None or not geoms:
+            return geoms
+        return list(np.asarray(geoms, dtype=object)[shapely.intersects(geoms, shapely.box(*bbox))])
+
+    def read_window(self, dataset, bbox):
+        """
+        Reads the geometries of a layer that intersect bbox without caching the
+        layer, so a tile worker only keeps its own features. The GeoJSON file is
+        still parsed in full while it is read.
+
+        :param dataset: Layer name or path.
+        :param bbox: (x_min, y_min, x_max, y_max).
+        :return: List of Shapely geometries.
+        """
+        with open(self.layer_path(dataset), "r", encoding='utf-8') as layer_file:
+            features = json.load(layer_file)['features']
+        window = shapely.box(*bbox)
+        shapely.prepare(window)
+        geoms = []
+        for feature in features:
+            if feature.get('geometry'):
+                geom = shape(feature['geometry'])
+                if window.intersects(geom):
+                    geoms.append(geom)
+        return geoms
+
+    def extent(self, dataset):
+        return tuple(shapely.total_bounds(self.geometries(dataset)))
+
+    def write_geometry(self, out_name, geometry):
+        return self.write(out_name, [(geometry, {})])
+
+    def area(self, dataset):
+        meters_per_unit = UNIT_TO_FEET[self.linear_unit] / UNIT_TO_FEET['meters']
+        return sum(g.area for g, _ in self.read(dataset) if g is not None) * meters_per_unit ** 2
+
+    def fingerprint(self, dataset):
+        features = self.read(dataset)
+        geometry_hash = hashlib.sha1()
+        for wkb in shapely.to_wkb([g for g, _ in features], hex=False):
+            geometry_hash.update(wkb or b"")
+        schema = {}
+        for _, props in features:
+            for key, value in props.items():
+                schema.setdefault(key, type(value).__name__)
+        return {'schema': sorted(schema.items()), 'count': len(features), 'geometry': geometry_hash.hexdigest()}
+
+    def copy(self, in_dataset, out_path):
+        # Snapshots are plain GeoJSON paths; anything else is a layer in vector_dir
+        source = in_dataset if str(in_dataset).endswith(".geojson") else self.layer_path(in_dataset)
+        if str(out_path).endswith(".geojson"):
+            shutil.copyfile(source, out_path)
+            return out_path
+        self._layers.pop(self.layer_name(out_path), None)
+        shutil.copyfile(source, self.layer_path(out_path))
+        return self.layer_name(out_path)
+
+    def scratch_path(self, folder, name):
+        return os.path.join(folder, f"{name}.geojson")
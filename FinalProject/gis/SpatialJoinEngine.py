@@ -0,0 +1,67 @@
+import numpy as np
+import shapely
+from shapely.strtree import STRtree
+
+
+class PointInPolygonJoin:
+    """
+    Joins large point sets (e.g. Building_Addresses) to polygons with INTERSECT
+    semantics: a point on a polygon boundary counts as a match.
+
+    The polygons are prepared and loaded into an STR-tree once. Points are processed
+    in batches of NumPy coordinate arrays: points outside the combined polygon extent
+    are rejected with a vectorized bounding-box test, the STR-tree pairs the rest with
+    candidate polygons by bounding box, and the exact test runs per polygon with
+    shapely.intersects_xy over all of its candidate points at once.
+
+    :param polygons: Sequence of Shapely polygon geometries.
+    :param batch_size: Number of points handled per batch.
+    :return: None
+    """
+
+    def __init__(self, polygons, batch_size=200000):
+        self.polygons = np.asarray(polygons, dtype=object)
+        self.batch_size = batch_size
+        shapely.prepare(self.polygons)
+        self.tree = STRtree(self.polygons)
+        bounds = shapely.bounds(self.polygons)
+        self.extent = (np.nanmin(bounds[:, 0]), np.nanmin(bounds[:, 1]),
+                       np.nanmax(bounds[:, 2]), np.nanmax(bounds[:, 3])) if len(bounds) else None
+
+    def join(self, xs, ys):
+        """
+        Finds the polygons each point intersects.
+
+        :param xs: NumPy array of point X coordinates.
+        :param ys: NumPy array of point Y coordinates.
+        :return: Tuple of (join_count, first_match) arrays, one entry per point;
+                 first_match is the lowest matching polygon index, or -1 when there is none.
+        """
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        join_count = np.zeros(len(xs), dtype=np.int64)
+        first_match = np.full(len(xs), -1, dtype=np.int64)
+        if self.extent is None or not len(xs):
+            return join_count, first_match
+
+        min_x, min_y, max_x, max_y = self.extent
+        inside_extent = np.flatnonzero((xs >= min_x) & (xs <= max_x) & (ys >= min_y) & (ys <= max_y))
+
+        for start in range(0, len(inside_extent), self.batch_size):
+            batch = inside_extent[start:start + self.batch_size]
+            # Bounding-box candidates from the STR-tree: (point position in batch, polygon index)
+            point_pos, poly_idx = self.tree.query(shapely.points(xs[batch], ys[batch]))
+            if not len(point_pos):
+                continue
+            order = np.argsort(poly_idx, kind='stable')
+            point_pos, poly_idx = point_pos[order], poly_idx[order]
+            splits = np.flatnonzero(np.diff(poly_idx)) + 1
+            for positions, polys in zip(np.split(point_pos, splits), np.split(poly_idx, splits)):
+                polygon_index = polys[0]
+                candidates = batch[positions]
+                hits = candidates[shapely.intersects_xy(self.polygons[polygon_index],
+                                                        xs[candidates], ys[candidates])]
+                join_count[hits] += 1
+                unset = hits[(first_match[hits] == -1) | (first_match[hits] > polygon_index)]
+                first_match[unset] = polygon_index
+        return join_count, first_match
@@ -0,0 +1,97 @@
+import math
+import shapely
+from gis.GeometryBackend import get_backend, parse_distance
+from pipeline.Tracer import tracer
+
+
+def plan_tiles(bounds, tile_size, halo):
+    """
+    Splits an extent into square tiles.
+
+    :param bounds: (x_min, y_min, x_max, y_max) of the study extent.
+    :param tile_size: Tile edge length in layer units.
+    :param halo: Distance the read window extends past each tile core.
+    :return: List of (core_bounds, halo_bounds) tuples.
+    """
+    x_min, y_min, x_max, y_max = bounds
+    if x_max <= x_min or y_max <= y_min:
+        return []
+    tiles = []
+    for i in range(max(1, math.ceil((x_max - x_min) / tile_size))):
+        for j in range(max(1, math.ceil((y_max - y_min) / tile_size))):
+            core = (x_min + i * tile_size, y_min + j * tile_size,
+                    min(x_min + (i + 1) * tile_size, x_max), min(y_min + (j + 1) * tile_size, y_max))
+            tiles.append((core, (core[0] - halo, core[1] - halo, core[2] + halo, core[3] + halo)))
+    return tiles
+
+
+def study_extent(buffer_distances, config_dict):
+    """
+    Extent that can hold the overlay result: the intersection of the layer
+    extents, each grown by its buffer distance.
+
+    :param buffer_distances: Dictionary of layer -> buffer distance.
+    :param config_dict: Configuration dictionary.
+    :return: (x_min, y_min, x_max, y_max); empty when x_max <= x_min or y_max <= y_min.
+    """
+    backend = get_backend(config_dict)
+    linear_unit = config_dict.get('vector_linear_unit', 'feet')
+    grown = []
+    for layer, buf_dist in buffer_distances.items():
+        distance = parse_distance(buf_dist, linear_unit)
+        x_min, y_min, x_max, y_max = backend.extent(layer)
+        grown.append((x_min - distance, y_min - distance, x_max + distance, y_max + distance))
+    return (max(b[0] for b in grown), max(b[1] for b in grown),
+            min(b[2] for b in grown), min(b[3] for b in grown))
+
+
+def overlay_tile(core, halo, buffer_distances, avoid_distances, config_dict):
+    """
+    Runs buffer -> intersect -> erase for one tile and clips the result to the tile core.
+
+    Only features inside the halo window are read. Because the halo is at least
+    the largest buffer distance, every feature whose buffer reaches the core is
+    read, so the clipped result equals the untiled result inside the core.
+
+    :param core: Tile core bounds.
+    :param halo: Read window bounds (core grown by the halo distance).
+    :param buffer_distances: Dictionary of hazard layer -> buffer distance.
+    :param avoid_distances: Dictionary of avoid layer -> buffer distance to erase.
+    :param config_dict: Configuration dictionary.
+    :return: WKB of the tile's result, or None when the tile is empty.
+    """
+    backend = get_backend(config_dict)
+    linear_unit = config_dict.get('vector_linear_unit', 'feet')
+    quad_segs = config_dict.get('buffer_quad_segments', 16)
+    core_box = shapely.box(*core)
+    result = core_box
+    for layer, buf_dist in buffer_distances.items():
+        geoms = backend.geometries(layer, bbox=halo)
+        if not geoms:
+            return None
+        buffered = shapely.union_all(shapely.buffer(geoms, parse_distance(buf_dist, linear_unit), quad_segs=quad_segs))
+        result = shapely.intersection(result, buffered)
+        if result.is_empty:
+            return None
+    for layer, buf_dist in avoid_distances.items():
+        geoms = backend.geometries(layer, bbox=halo)
+        if geoms:
+            result = shapely.difference(result, shapely.union_all(
+                shapely.buffer(geoms, parse_distance(buf_dist, linear_unit), quad_segs=quad_segs)))
+    result = shapely.intersection(result, core_box)
+    return None if result.is_empty else shapely.to_wkb(result)
+
+
+def merge_tiles(pieces, out_name, config_dict):
+    """
+    Merges the clipped tile results, dissolving the seams between tiles.
+
+    :param pieces: WKB results of overlay_tile (None for empty tiles).
+    :param out_name: Output name.
+    :param config_dict: Configuration dictionary.
+    :return: Path or name of the merged output.
+    """
+    with tracer.span("MergeTiles", 'tool', tiles=len(pieces)):
+        geoms = shapely.from_wkb([p for p in pieces if p is not None])
+        merged = shapely.union_all(geoms) if len(geoms) else shapely.Polygon()
+        return get_backend(config_dict).write_geometry(out_name, merged)
@@ -0,0 +1,193 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from pipeline.Tracer import tracer
+
+
+class StageRef:
+    """
+    Placeholder for the output of another stage. Stage arguments may contain
+    StageRefs (also inside lists/tuples/dicts); they are replaced by the
+    referenced stage's return value before the stage runs, and make the stage
+    depend on it.
+
+    :param name: Name of the stage whose output is used.
+    :return: None
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f"StageRef({self.name!r})"
+
+
+class Stage:
+    """
+    One node of the workflow graph.
+
+    :param name: Unique stage name.
+    :param func: Module-level function to call (must be picklable).
+    :param args: Positional arguments, possibly containing StageRefs.
+    :param kwargs: Keyword arguments, possibly containing StageRefs.
+    :param deps: Extra stage names to wait for whose outputs are not passed in.
+    :return: None
+    """
+
+    def __init__(self, name, func, args, kwargs, deps):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.deps = set(deps) | find_refs(args) | find_refs(kwargs)
+
+
+def find_refs(value):
+    """
+    :return: Set of stage names referenced anywhere in value.
+    """
+    if isinstance(value, StageRef):
+        return {value.name}
+    if isinstance(value, (list, tuple)):
+        return set().union(*(find_refs(v) for v in value)) if value else set()
+    if isinstance(value, dict):
+        return set().union(*(find_refs(v) for v in value.values())) if value else set()
+    return set()
+
+
+def resolve_refs(value, results):
+    """
+    :return: value with every StageRef replaced by the stage's result.
+    """
+    if isinstance(value, StageRef):
+        return results[value.name]
+    if isinstance(value, list):
+        return [resolve_refs(v, results) for v in value]
+    if isinstance(value, tuple):
+        return tuple(resolve_refs(v, results) for v in value)
+    if isinstance(value, dict):
+        return {k: resolve_refs(v, results) for k, v in value.items()}
+    return value
+
+
+def run_stage(func, args, kwargs):
+    """
+    Runs a stage in a worker process, times it there and collects the spans
+    the stage recorded in the worker's tracer.
+
+    :return: Tuple of (result, seconds, exported spans).
+    """
+    first = len(tracer.spans)
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start, tracer.export(first, start)
+
+
+class DagExecutor:
+    """
+    Runs a workflow declared as a dependency graph. Stages whose inputs are
+    ready are submitted to a process pool, so independent stages (e.g. the
+    layer buffers, or the two dissolves before erase) run in parallel, while
+    dependent stages wait for their inputs. With one worker the stages run
+    in-process in dependency order.
+
+    Each stage is recorded in the tracer as a span measured from the parent
+    process, so the Chrome trace shows what ran concurrently; the spans a
+    stage recorded inside its worker are nested under it.
+
+    :param max_workers: Worker process count, defaults to os.cpu_count().
+    :return: None
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.stages = {}
+
+    def add(self, name, func, *args, deps=(), **kwargs):
+        """
+        Declares a stage.
+
+        :param name: Unique stage name.
+        :param func: Module-level function to call.
+        :param args: Positional arguments, possibly containing StageRefs.
+        :param deps: Extra stage names to wait for.
+        :param kwargs: Keyword arguments, possibly containing StageRefs.
+        :return: StageRef to this stage's output.
+        """
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage name: {name}")
+        self.stages[name] = Stage(name, func, args, kwargs, deps)
+        return StageRef(name)
+
+    def order(self):
+        """
+        Returns the stage names in a dependency-respecting order.
+
+        :return: List of stage names.
+        """
+        ordered, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage dependency: {name}")
+            if name in visiting:
+                raise ValueError(f"Dependency cycle at stage: {name}")
+            visiting.add(name)
+            for dep in sorted(self.stages[name].deps):
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            ordered.append(name)
+
+        for stage_name in self.stages:
+            visit(stage_name)
+        return ordered
+
+    def run(self):
+        """
+        Runs every stage once its dependencies have finished.
+
+        :return: Dictionary of stage name -> return value.
+        """
+        ordered = self.order()
+        results = {}
+        if self.max_workers == 1:
+            for name in ordered:
+                stage = self.stages[name]
+                with tracer.span(name, 'stage'):
+                    results[name] = stage.func(*resolve_refs(stage.args, results),
+                                               **resolve_refs(stage.kwargs, results))
+            return results
+
+        waiting = list(ordered)
+        running = {}
+        # Trace lanes so concurrently running stages do not overlap in one row of the trace
+        free_lanes = list(range(self.max_workers))
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            while waiting or running:
+                for name in [n for n in waiting if self.stages[n].deps <= results.keys()]:
+                    stage = self.stages[name]
+                    print(f"Starting stage {name}")
+                    future = executor.submit(run_stage, stage.func, resolve_refs(stage.args, results),
+                                             resolve_refs(stage.kwargs, results))
+                    running[future] = (name, time.perf_counter(), free_lanes.pop(0) if free_lanes else 0)
+                    waiting.remove(name)
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, submitted, lane = running.pop(future)
+                    free_lanes.append(lane)
+                    try:
+                        results[name], worker_seconds, worker_spans = future.result()
+                    except Exception:
+                        for pending in running:
+                            pending.cancel()
+                        raise
+                    finished = time.perf_counter()
+                    stage_span = tracer.record(name, 'stage', submitted, finished - submitted,
+                                               thread_id=f"worker {lane}", worker_seconds=worker_seconds)
+                    # The worker's tool spans end where the stage finished in the worker
+                    tracer.merge(worker_spans, stage_span, finished - worker_seconds, f"worker {lane}")
+                    print(f"Finished stage {name} in {worker_seconds:.2f} seconds")
+        return results
@@ -0,0 +1,227 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+
+
+class StageCache:
+    """
+    Content-addressed cache of spatial stage outputs.
+
+    A stage's key is a hash of the stage name, its parameters, the geometry
+    backend and the fingerprint (schema, feature count, geometry hash) of every
+    input dataset. After a stage runs, a snapshot of its output is copied into
+    the cache. When the same key comes up again the stage is skipped: the output
+    is reused as-is if it still matches the stored fingerprint, or restored from
+    the snapshot if it was overwritten since.
+
+    Snapshots are evicted least-recently-used once the cache grows past
+    ``max_bytes``. The index lives in SQLite, so stages running in parallel
+    worker processes can share it.
+
+    :param cache_dir: Folder holding the index and snapshots.
+    :param backend: GeometryBackend used to fingerprint, copy and restore datasets.
+    :param max_bytes: Size cap for the snapshots.
+    :return: None
+    """
+
+    def __init__(self, cache_dir, backend, max_bytes=2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.backend = backend
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(cache_dir, 'stage_cache.sqlite'), timeout=60)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS stage_cache ("
+            "cache_key TEXT PRIMARY KEY, "
+            "stage TEXT NOT NULL, "
+            "output TEXT NOT NULL, "
+            "output_fingerprint TEXT NOT NULL, "
+            "snapshot TEXT NOT NULL, "
+            "bytes INTEGER NOT NULL, "
+            "last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS stage_log ("
+            "run_id TEXT NOT NULL, "
+            "stage TEXT NOT NULL, "
+            "hit INTEGER NOT NULL, "
+            "logged REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def make_key(self, stage, params, input_datasets):
+        """
+        Hashes everything a stage's output depends on.
+
+        :param stage: Stage name.
+        :param params: JSON-serializable tool parameters and output-affecting settings.
+        :param input_datasets: Datasets the stage reads.
+        :return: Hex digest.
+        """
+        fingerprints = [self.backend.fingerprint(dataset) for dataset in input_datasets]
+        payload = json.dumps([stage, self.backend.name, params, fingerprints], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def lookup(self, key):
+        """
+        Returns the stored output for a key, restoring it from the snapshot if needed.
+
+        :param key: Stage cache key.
+        :return: Output dataset identifier, or None on a miss.
+        """
+        row = self._conn.execute(
+            "SELECT output, output_fingerprint, snapshot FROM stage_cache WHERE cache_key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        output, output_fingerprint, snapshot = row
+        try:
+            current = self.backend.fingerprint(output) if self.backend.exists(output) else None
+            if json.dumps(current, sort_keys=True) != output_fingerprint:
+                self.backend.copy(snapshot, output)
+        except Exception as e:
+            print(f"Stage cache entry {key[:12]} unusable, recomputing: {e}")
+            self.drop(key)
+            return None
+        self._conn.execute("UPDATE stage_cache SET last_used = ? WHERE cache_key = ?", (time.time(), key))
+        self._conn.commit()
+        return output
+
+    def store(self, key, stage, output):
+        """
+        Snapshots a stage output into the cache and evicts old entries past the size cap.
+
+        :param key: Stage cache key.
+        :param stage: Stage name.
+        :param output: Output dataset identifier returned by the stage.
+        :return: None
+        """
+        entry_dir = os.path.join(self.cache_dir, key[:2], key)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.makedirs(entry_dir)
+        snapshot = self.backend.copy(output, self.backend.scratch_path(entry_dir, 'snapshot'))
+        size = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(entry_dir) for f in files)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO stage_cache (cache_key, stage, output, output_fingerprint, snapshot, bytes, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, stage, output, json.dumps(self.backend.fingerprint(output), sort_keys=True), snapshot, size,
+             time.time())
+        )
+        self._conn.commit()
+        self.evict()
+
+    def drop(self, key):
+        """
+        Removes an entry and its snapshot.
+
+        :param key: Stage cache key.
+        :return: None
+        """
+        self._conn.execute("DELETE FROM stage_cache WHERE cache_key = ?", (key,))
+        self._conn.commit()
+        shutil.rmtree(os.path.join(self.cache_dir, key[:2], key), ignore_errors=True)
+
+    def evict(self):
+        """
+        Drops least recently used entries until the snapshots fit in max_bytes.
+
+        :return: None
+        """
+        total = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM stage_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+                "SELECT cache_key, bytes FROM stage_cache ORDER BY last_used ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            self.drop(key)
+            total -= size
+
+    def log(self, run_id, stage, hit):
+        self._conn.execute("INSERT INTO stage_log (run_id, stage, hit, logged) VALUES (?, ?, ?, ?)",
+                           (run_id, stage, 1 if hit else 0, time.time()))
+        self._conn.commit()
+
+    def report(self, run_id):
+        """
+        Prints which stages of a run were served from the cache.
+
+        :param run_id: Run identifier passed to run_cached.
+        :return: List of (stage, hit) tuples.
+        """
+        rows = self._conn.execute(
+            "SELECT stage, hit FROM stage_log WHERE run_id = ? ORDER BY logged", (run_id,)
+        ).fetchall()
+        hits = [stage for stage, hit in rows if hit]
+        print(f"Stage cache: {len(hits)} of {len(rows)} stages served from cache")
+        for stage, hit in rows:
+            print(f"  {stage:<30} {'cached' if hit else 'computed'}")
+        return rows
+
+    def latest_run_id(self):
+        """
+        :return: Run identifier of the most recently logged stage, or None if nothing was logged.
+        """
+        row = self._conn.execute("SELECT run_id FROM stage_log ORDER BY logged DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        self._conn.close()
+
+
+def open_stage_cache(config_dict, backend):
+    """
+    Opens the stage cache configured by stage_cache_dir/stage_cache_max_mb.
+
+    :param config_dict: Configuration dictionary.
+    :param backend: GeometryBackend instance.
+    :return: StageCache instance.
+    """
+    cache_dir = config_dict.get('stage_cache_dir') or os.path.join(config_dict.get('output_folder', ''), 'stage_cache')
+    return StageCache(cache_dir, backend, max_bytes=config_dict.get('stage_cache_max_mb', 2048) * 1024 ** 2)
+
+
+# Settings that stage functions read from config_dict and that change their output
+OUTPUT_CONFIG_KEYS = (
+    'vector_crs', 'vector_linear_unit', 'gdb_path', 'output_folder',
+    'buffer_quad_segments', 'buffer_ring_layers', 'buffer_ring_step', 'buffer_ring_max',
+    'simplify_layers', 'simplify_tolerance_ratio', 'tile_size',
+)
+
+
+def run_cached(stage, func, args, input_datasets, config_dict, backend, kwargs=None):
+    """
+    Runs func(*args, config_dict, **kwargs) unless an identical stage is already cached.
+    The OUTPUT_CONFIG_KEYS settings are part of the key, so changing e.g. the
+    buffer segments or the layer coordinate system reruns the stage.
+
+    :param stage: Stage name used in the key and the report.
+    :param func: Stage function; its last argument is config_dict.
+    :param args: Positional arguments before config_dict; must be JSON-serializable.
+    :param input_datasets: Datasets among the inputs whose content determines the output.
+    :param config_dict: Configuration dictionary; 'run_id' tags the report.
+    :param backend: GeometryBackend instance.
+    :param kwargs: Keyword arguments after config_dict, e.g. output names; must be JSON-serializable.
+    :return: The stage output.
+    """
+    kwargs = kwargs or {}
+    if not config_dict.get('stage_cache_enabled', False):
+        return func(*args, config_dict, **kwargs)
+    cache = open_stage_cache(config_dict, backend)
+    try:
+        settings = {name: config_dict.get(name) for name in OUTPUT_CONFIG_KEYS}
+        key = cache.make_key(stage, {'args': list(args), 'kwargs': kwargs, 'config': settings}, input_datasets)
+        output = cache.lookup(key)
+        hit = output is not None
+        if hit:
+            print(f"Stage {stage} served from cache")
+        else:
+            output = func(*args, config_dict, **kwargs)
+            cache.store(key, stage, output)
+        cache.log(config_dict.get('run_id', ''), stage, hit)
+        return output
+    finally:
+        cache.close()
@@ -0,0 +1,251 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Span:
+    """
+    One timed pipeline stage or tool call. Attributes such as input/output
+    feature counts are stored in ``args`` and exported with the span.
+
+    :param name: Stage or tool name.
+    :param category: 'stage' or 'tool'.
+    :param parent: Enclosing Span, or None for a top-level span.
+    :return: None
+    """
+
+    def __init__(self, name, category, parent):
+        self.name = name
+        self.category = category
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent else 0
+        self.args = {}
+        self.start = None
+        self.duration = None
+        self.thread_id = threading.get_ident()
+        self.error = None
+
+
+class Tracer:
+    """
+    Collects nested spans for pipeline stages and tool calls, and exports them as
+    Chrome trace-event JSON (load in chrome://tracing or Perfetto) and as a
+    machine-readable per-stage summary.
+
+    :return: None
+    """
+
+    def __init__(self):
+        self.spans = []
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def current(self):
+        """
+        :return: The innermost open span on this thread, or None.
+        """
+        stack = getattr(self._local, 'stack', None)
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name, category='stage', **args):
+        """
+        Times a block of code as a span nested under the current span.
+
+        :param name: Stage or tool name.
+        :param category: 'stage' or 'tool'.
+        :param args: Initial span attributes.
+        :return: Context manager yielding the Span.
+        """
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        span = Span(name, category, self.current())
+        span.args.update(args)
+        self._local.stack.append(span)
+        span.start = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            span.error = str(e)
+            raise
+        finally:
+            span.duration = time.perf_counter() - span.start
+            self._local.stack.pop()
+            with self._lock:
+                self.spans.append(span)
+
+    def record(self, name, category, start, duration, thread_id=None, **args):
+        """
+        Adds a span that was timed elsewhere, e.g. a stage run in a worker process.
+
+        :param name: Stage or tool name.
+        :param category: 'stage' or 'tool'.
+        :param start: time.perf_counter() value when the span started.
+        :param duration: Span length in seconds.
+        :param thread_id: Lane to show the span in, defaults to the current thread.
+        :param args: Span attributes.
+        :return: Span
+        """
+        span = Span(name, category, self.current())
+        span.args.update(args)
+        if thread_id is not None:
+            span.thread_id = thread_id
+        span.start = start
+        span.duration = duration
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def export(self, first, origin):
+        """
+        Removes the spans recorded since index ``first`` and returns them as
+        picklable dictionaries, so a worker process can hand them to the parent.
+
+        :param first: len(self.spans) before the work being exported started.
+        :param origin: time.perf_counter() value the start offsets are measured from.
+        :return: List of span dictionaries, parents before their children.
+        """
+        with self._lock:
+            spans = sorted(self.spans[first:], key=lambda s: (s.start, s.depth))
+            del self.spans[first:]
+        index = {id(span): i for i, span in enumerate(spans)}
+        return [{
+            'name': s.name,
+            'category': s.category,
+            # Spans opened before the export started stay behind, so their children become top-level
+            'parent': index.get(id(s.parent)),
+            'start': s.start - origin,
+            'duration': s.duration,
+            'args': s.args,
+            'error': s.error,
+        } for s in spans]
+
+    def merge(self, exported, parent, origin, thread_id):
+        """
+        Adds spans exported by another process under a span of this tracer.
+
+        :param exported: List returned by export().
+        :param parent: Span the exported top-level spans are nested under.
+        :param origin: time.perf_counter() value in this process matching the exporter's origin.
+        :param thread_id: Lane to show the spans in.
+        :return: None
+        """
+        merged = []
+        for entry in exported:
+            span = Span(entry['name'], entry['category'],
+                        merged[entry['parent']] if entry['parent'] is not None else parent)
+            span.args.update(entry['args'])
+            span.start = origin + entry['start']
+            span.duration = entry['duration']
+            span.thread_id = thread_id
+            span.error = entry['error']
+            merged.append(span)
+        with self._lock:
+            self.spans.extend(merged)
+
+    def traced(self, name=None, category='stage'):
+        """
+        Decorator that runs a function inside a span.
+
+        :param name: Span name, defaults to the function name.
+        :param category: 'stage' or 'tool'.
+        :return: Decorator.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name or func.__name__, category):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def chrome_trace(self):
+        """
+        Builds the Chrome trace-event representation of the recorded spans.
+
+        :return: Dictionary with a 'traceEvents' list of complete ('X') events.
+        """
+        with self._lock:
+            spans = list(self.spans)
+        events = []
+        for span in sorted(spans, key=lambda s: s.start):
+            args = dict(span.args)
+            if span.error:
+                args['error'] = span.error
+            events.append({
+                'name': span.name,
+                'cat': span.category,
+                'ph': 'X',
+                'ts': (span.start - self.origin) * 1e6,
+                'dur': span.duration * 1e6,
+                'pid': self.pid,
+                'tid': span.thread_id,
+                'args': args,
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def summary(self):
+        """
+        Summarizes the run: every span with its parent, duration and attributes,
+        plus totals per span name.
+
+        :return: Dictionary with 'total_seconds', 'spans' and 'by_name' keys.
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        by_name = {}
+        for span in spans:
+            entry = by_name.setdefault(span.name, {'category': span.category, 'calls': 0,
+                                                   'total_seconds': 0.0, 'max_seconds': 0.0})
+            entry['calls'] += 1
+            entry['total_seconds'] += span.duration
+            entry['max_seconds'] = max(entry['max_seconds'], span.duration)
+        return {
+            # Wall-clock time covered by the spans; stages may overlap when run in parallel
+            'total_seconds': (max(s.start + s.duration for s in spans) - spans[0].start) if spans else 0.0,
+            'spans': [{
+                'name': s.name,
+                'category': s.category,
+                'parent': s.parent.name if s.parent else None,
+                'depth': s.depth,
+                'start_seconds': s.start - self.origin,
+                'duration_seconds': s.duration,
+                'args': s.args,
+                'error': s.error,
+            } for s in spans],
+            'by_name': by_name,
+        }
+
+    def write(self, trace_path, summary_path=None):
+        """
+        Writes the Chrome trace and, optionally, the summary to JSON files.
+
+        :param trace_path: Path of the Chrome trace JSON file.
+        :param summary_path: Path of the summary JSON file, or None.
+        :return: None
+        """
+        with open(trace_path, 'w', encoding='utf-8') as trace_file:
+            json.dump(self.chrome_trace(), trace_file)
+        if summary_path:
+            with open(summary_path, 'w', encoding='utf-8') as summary_file:
+                json.dump(self.summary(), summary_file, indent=2)
+
+    def print_summary(self):
+        """
+        Prints per-stage totals, slowest first.
+
+        :return: None
+        """
+        summary = self.summary()
+        print(f"Traced run time: {summary['total_seconds']:.2f} seconds")
+        for name, entry in sorted(summary['by_name'].items(), key=lambda item: -item[1]['total_seconds']):
+            print(f"  {name:<30} {entry['calls']:>4} call(s) {entry['total_seconds']:>10.2f} s")
+
+
+# Process-wide tracer used by finalproject.py
+tracer = Tracer()
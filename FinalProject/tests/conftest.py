@@ -0,0 +1,154 @@
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+# finalproject.py imports its packages relative to FinalProject, and the ETL base class from Lab2
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(0, os.path.dirname(PROJECT_DIR))
+
+
+@pytest.fixture
+def config_dict(tmp_path):
+    """
+    Configuration for the Shapely backend with every folder under tmp_path.
+    """
+    from gis import GeometryBackend
+    GeometryBackend._backends.clear()
+    config = {
+        'geometry_backend': 'shapely',
+        'vector_dir': str(tmp_path / "vector"),
+        'output_folder': str(tmp_path / "output"),
+        'gdb_path': str(tmp_path / "gdb"),
+        'download_dir': str(tmp_path / "download") + os.sep,
+        'stage_cache_dir': str(tmp_path / "stage_cache"),
+        'buffer_ring_dir': str(tmp_path / "rings"),
+        'dag_workers': 1,
+    }
+    for key in ('output_folder', 'download_dir'):
+        os.makedirs(config[key], exist_ok=True)
+    yield config
+    GeometryBackend._backends.clear()
+
+
+@pytest.fixture
+def backend(config_dict):
+    from gis.GeometryBackend import get_backend
+    return get_backend(config_dict)
+
+
+@pytest.fixture
+def study_area(config_dict, backend):
+    """
+    Writes a small synthetic study area: the four hazard layers, address points
+    and avoid points, in the layer coordinate system.
+    """
+    import shapely
+    backend.write("Mosquito_Larval_Sites", [(shapely.Point(x, y), {}) for x, y in
+                                            [(0, 0), (1200, 400), (2500, 2500), (600, 1800)]])
+    backend.write("Wetlands", [(shapely.box(-500, -500, 1500, 900), {}), (shapely.box(2000, 1800, 3200, 3000), {})])
+    backend.write("Lakes_and_Reservoirs", [(shapely.box(300, 200, 900, 700), {}),
+                                           (shapely.box(2300, 2300, 2700, 2600), {})])
+    backend.write("OSMP_Properties", [(shapely.box(-1500, -1500, 4000, 4000), {})])
+    backend.write("Building_Addresses", [(shapely.Point(x, y), {'FULLADDR': f"{i} MAIN ST"})
+                                         for i, (x, y) in enumerate((x, y) for x in range(-400, 3200, 150)
+                                                                    for y in range(-400, 3200, 150))])
+    backend.write("avoid_points", [(shapely.Point(x, y), {}) for x, y in [(100, 100), (2500, 2400)]])
+    config_dict.update(
+        avoid_buffer_distance="150 feet",
+        buffer_distances={'Mosquito_Larval_Sites': 1000, 'Wetlands': 500, 'Lakes_and_Reservoirs': 800,
+                          'OSMP_Properties': 100},
+    )
+    return config_dict
+
+
+class StandInServer:
+    """
+    Local HTTP server standing in for the spreadsheet and geocoding services.
+    A path in ``routes`` is answered by calling its handler with the request;
+    any other request gets the next queued (status, headers, body) from
+    ``responses``. Bytes and string bodies are sent as-is, anything else as
+    JSON. Every request is recorded as (method, path, headers, body) in
+    ``requests``. Connections are kept alive between requests.
+    """
+
+    def __init__(self):
+        self.responses = []
+        self.routes = {}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def handle_request(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                server.requests.append((self.command, self.path, dict(self.headers), body))
+                route = server.routes.get(urlsplit(self.path).path)
+                if route is not None:
+                    status, headers, payload = route(self, body)
+                else:
+                    status, headers, payload = server.responses.pop(0) if server.responses else (200, {}, [])
+                if isinstance(payload, bytes):
+                    data = payload
+                else:
+                    data = payload.encode() if isinstance(payload, str) else json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = handle_request
+            do_POST = handle_request
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.url = f"{self.base_url}/search"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def server():
+    stand_in = StandInServer()
+    yield stand_in
+    stand_in.httpd.shutdown()
+
+
+@pytest.fixture
+def etl_config(config_dict, server):
+    """
+    ETL configuration reading the spreadsheet (``server.sheet``, ETag "v1") and
+    geocoding with Nominatim from the stand-in server. Every address geocodes to
+    a longitude of -105 minus its house number / 10000.
+    """
+    server.sheet = "Timestamp,Street Address\n1/1/2024,1 Main St\n1/2/2024,2 Main St\n"
+
+    def sheet(request, body):
+        if request.headers.get('If-None-Match') == '"v1"':
+            return 304, {}, ""
+        return 200, {'ETag': '"v1"'}, server.sheet
+
+    def search(request, body):
+        query = parse_qs(urlsplit(request.path).query)['q'][0]
+        number = int(query.split()[0])
+        return 200, {}, [{'lon': str(-105 - number / 10000), 'lat': "40.01"}]
+
+    server.routes.update({'/sheet.csv': sheet, '/search': search})
+    config_dict.update(
+        remote_url=f"{server.base_url}/sheet.csv",
+        nominatim_url=f"{server.base_url}/search",
+        geocoders=['nominatim'],
+        geocoder_rate_limits={'nominatim': 1000},
+        incremental_extract=True,
+    )
+    return config_dict
@@ -0,0 +1,39 @@
+import csv
+import os
+
+from etl.AddressPointIndex import normalize_address
+from etl.GSheetsEtl import GSheetsEtl
+
+
+def test_normalize_address_spelling_variants():
+    assert normalize_address("1234 North Broadway Street,") == "1234 N BROADWAY ST"
+    assert normalize_address("  1234  n.  broadway st ") == "1234 N BROADWAY ST"
+    assert normalize_address("10 Pearl St Apt 4") == "10 PEARL ST APT 4"
+
+
+def test_normalize_address_drops_units():
+    for variant in ["10 Pearl St Apt 4", "10 Pearl Street #12", "10 pearl st, Unit B", "10 Pearl St Suite 200"]:
+        assert normalize_address(variant, drop_units=True) == "10 PEARL ST"
+    # A street named like a designator keeps its name
+    assert normalize_address("5 Lot Rd", drop_units=True) == "5 LOT RD"
+
+
+def test_transform_geocodes_each_normalized_address_once(etl_config, server):
+    etl_config['incremental_extract'] = False
+    raw = os.path.join(etl_config['download_dir'], 'raw_addresses.csv')
+    out = os.path.join(etl_config['download_dir'], 'new_addresses.csv')
+    with open(raw, 'w', encoding='utf-8') as f:
+        f.write("Timestamp,Street Address\n1/1,1 Main Street\n1/2,1 MAIN ST Apt 4\n1/3,1 main st #2\n"
+                "1/4,2 Main St\n")
+    etl = GSheetsEtl(etl_config)
+    etl.transform(raw, out)
+    etl.close()
+
+    assert len([r for r in server.requests if r[1].startswith('/search')]) == 2
+    assert (etl.geocoded_rows, etl.unique_addresses) == (4, 2)
+    with open(out, encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 4
+    assert len({row['AddrKey'] for row in rows[:3]}) == 1
+    assert rows[3]['AddrKey'] != rows[0]['AddrKey']
+    assert float(rows[3]['X']) == -105.0002
@@ -0,0 +1,33 @@
+from etl.AddressPointIndex import AddressPointIndex
+
+
+def make_index():
+    return AddressPointIndex({
+        "1234 BROADWAY": (-105.27, 40.01),
+        "1234 PEARL ST": (-105.28, 40.02),
+        "55 N 28TH ST": (-105.25, 40.03),
+    })
+
+
+def test_exact_lookup_normalizes_spelling():
+    index = make_index()
+    assert index.lookup("1234 Pearl Street") == (-105.28, 40.02)
+    assert index.lookup("55 north 28th st.") == (-105.25, 40.03)
+    assert index.exact_hits == 2
+
+
+def test_fuzzy_lookup_is_blocked_by_house_number():
+    index = make_index()
+    assert index.lookup("1234 Pearll St") == (-105.28, 40.02)
+    # Same street, different house number: no candidates to compare with
+    assert index.lookup("1235 Pearl St") is None
+    assert (index.fuzzy_hits, index.misses) == (1, 1)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "address_index.json")
+    make_index().save(path)
+    loaded = AddressPointIndex.load(path, min_similarity=0.9)
+    assert len(loaded) == 3
+    assert loaded.lookup("1234 Broadway") == (-105.27, 40.01)
+    assert loaded.lookup("1234 Pearll St") is None
@@ -0,0 +1,46 @@
+import shapely
+
+from gis.BufferRingStore import BufferRingStore
+
+
+def write_sites(backend):
+    sites = [shapely.Point(0, 0), shapely.Point(900, 200), shapely.box(3000, 3000, 3400, 3600)]
+    return backend.write("Sites", [(geom, {'id': i}) for i, geom in enumerate(sites)])
+
+
+def union(backend, dataset):
+    return shapely.union_all(backend.geometries(dataset))
+
+
+def test_ring_buffer_matches_buffer(config_dict, backend):
+    config_dict.update(buffer_ring_step=100, buffer_ring_max=1000)
+    write_sites(backend)
+    store = BufferRingStore(config_dict, backend)
+    for distance in ("300 feet", "450 feet", "1000 feet"):
+        from_rings = union(backend, store.buffer("Sites", distance, "from_rings"))
+        direct = union(backend, backend.buffer("Sites", "direct", distance))
+        assert shapely.symmetric_difference(from_rings, direct).area / direct.area < 1e-3
+        # A full buffer has no holes around the input features
+        assert from_rings.contains(shapely.Point(0, 0))
+
+
+def test_rings_rebuilt_when_layer_changes(config_dict, backend):
+    config_dict.update(buffer_ring_step=100, buffer_ring_max=300)
+    write_sites(backend)
+    store = BufferRingStore(config_dict, backend)
+    builds = []
+    build = store.build
+    store.build = lambda layer: builds.append(layer) or build(layer)
+    store.rings_for("Sites")
+    store.rings_for("Sites")
+    assert builds == ["Sites"]
+    backend.write("Sites", [(shapely.Point(5000, 5000), {'id': 0})])
+    store.rings_for("Sites")
+    assert builds == ["Sites", "Sites"]
+
+
+def test_small_distance_falls_back_to_buffer(config_dict, backend):
+    config_dict.update(buffer_ring_step=100, buffer_ring_max=300)
+    write_sites(backend)
+    out = BufferRingStore(config_dict, backend).buffer("Sites", "50 feet", "small")
+    assert abs(union(backend, out).area - union(backend, backend.buffer("Sites", "ref", "50 feet")).area) < 1e-6
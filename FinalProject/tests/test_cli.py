@@ -0,0 +1,28 @@
+import subprocess
+import sys
+
+import pytest
+
+import finalproject
+from conftest import PROJECT_DIR
+
+
+def test_no_subcommand_runs_everything():
+    args = finalproject.parse_args(["--batch", "--mode", "tiled"])
+    assert (args.command, args.batch, args.mode, args.skip_etl) == ("run", True, "tiled", False)
+
+
+def test_subcommands_take_only_their_options():
+    assert finalproject.parse_args(["analyze", "--sweep", "--raster"]).raster
+    assert finalproject.parse_args(["export", "--subtitle", "June"]).subtitle == "June"
+    with pytest.raises(SystemExit):
+        finalproject.parse_args(["geocode", "--sweep"])
+
+
+def test_import_does_not_load_arcpy_or_the_etl():
+    code = ("import sys, finalproject; "
+            "print(any(m == 'arcpy' or m.startswith('arcpy.') for m in sys.modules), "
+            "'etl.GSheetsEtl' in sys.modules, 'gis.ShapelyBackend' in sys.modules)")
+    out = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_DIR, check=True,
+                         capture_output=True, text=True).stdout
+    assert out.split() == ["False", "False", "False"]
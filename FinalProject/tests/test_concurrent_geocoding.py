@@ -0,0 +1,36 @@
+import csv
+import os
+import threading
+import time
+
+from etl.GSheetsEtl import GSheetsEtl
+
+
+def test_parallel_geocoding_keeps_input_order(etl_config, server):
+    numbers = [17, 3, 42, 8, 25, 1, 33, 12, 29, 5, 40, 21]
+    server.sheet = "Timestamp,Street Address\n" + "".join(f"1/1/2024,{n} Main St\n" for n in numbers)
+    search = server.routes['/search']
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def slow_search(request, body):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        # Lower house numbers answer later, so responses arrive out of input order
+        time.sleep((45 - int(request.path.split('q=')[1].split('+')[0])) / 1000)
+        with lock:
+            active[0] -= 1
+        return search(request, body)
+
+    server.routes['/search'] = slow_search
+    etl_config.update(geocode_workers=4, incremental_extract=False)
+    etl = GSheetsEtl(etl_config)
+    etl.extract()
+    output_file = os.path.join(etl_config['download_dir'], 'new_addresses.csv')
+    etl.transform(os.path.join(etl_config['download_dir'], 'raw_addresses.csv'), output_file)
+    etl.close()
+
+    with open(output_file, encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert [float(row['X']) for row in rows] == [-105 - n / 10000 for n in numbers]
+    assert peak[0] > 1
@@ -0,0 +1,66 @@
+import pytest
+
+from pipeline.DagExecutor import DagExecutor, StageRef
+from pipeline.Tracer import Tracer, tracer
+
+
+def traced_sum(*values):
+    with tracer.span("sum tool", 'tool', count=len(values)):
+        with tracer.span("inner tool", 'tool'):
+            return sum(values)
+
+
+@pytest.fixture
+def clean_tracer():
+    first = len(tracer.spans)
+    yield tracer
+    del tracer.spans[first:]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_stages_run_in_dependency_order(workers, clean_tracer):
+    dag = DagExecutor(max_workers=workers)
+    a = dag.add("a", traced_sum, 1, 2)
+    b = dag.add("b", traced_sum, 10)
+    dag.add("c", traced_sum, a, b)
+    assert dag.run() == {'a': 3, 'b': 10, 'c': 13}
+
+
+def test_worker_spans_are_merged_under_their_stage(clean_tracer):
+    first = len(tracer.spans)
+    dag = DagExecutor(max_workers=2)
+    dag.add("a", traced_sum, 1, 2)
+    dag.add("b", traced_sum, StageRef("a"), 3)
+    dag.run()
+    spans = tracer.spans[first:]
+    for stage_name in ("a", "b"):
+        stage = next(s for s in spans if s.name == stage_name)
+        tool = next(s for s in spans if s.name == "sum tool" and s.parent is stage)
+        inner = next(s for s in spans if s.name == "inner tool" and s.parent is tool)
+        assert tool.args == {'count': 2}
+        assert inner.depth == stage.depth + 2
+        assert tool.thread_id == stage.thread_id
+        assert stage.start <= tool.start <= inner.start
+        assert inner.start + inner.duration <= stage.start + stage.duration + 1e-6
+
+
+def test_export_and_merge_round_trip():
+    worker = Tracer()
+    with worker.span("outside"):
+        first = len(worker.spans)
+        start = worker.origin
+        with worker.span("stage work", 'tool'):
+            with worker.span("tool call", 'tool'):
+                pass
+        exported = worker.export(first, start)
+    assert [e['name'] for e in exported] == ["stage work", "tool call"]
+    assert exported[0]['parent'] is None and exported[1]['parent'] == 0
+    assert [s.name for s in worker.spans] == ["outside"]
+
+    parent = Tracer()
+    stage = parent.record("stage", 'stage', parent.origin, 1.0, thread_id="worker 0")
+    parent.merge(exported, stage, parent.origin, "worker 0")
+    merged = {s.name: s for s in parent.spans}
+    assert merged["stage work"].parent is stage
+    assert merged["tool call"].parent is merged["stage work"]
+    assert merged["tool call"].thread_id == "worker 0"
@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+import pytest
+import shapely
+
+import finalproject
+
+from gis.DistanceField import DistanceFieldStore, DistanceGrid
+
+
+def exact_overlay(backend, buffer_distances, erase_distances):
+    result = shapely.intersection_all([shapely.union_all(shapely.buffer(backend.geometries(layer), d, quad_segs=32))
+                                       for layer, d in buffer_distances.items()])
+    for layer, d in erase_distances.items():
+        result = result.difference(shapely.union_all(shapely.buffer(backend.geometries(layer), d, quad_segs=32)))
+    return result
+
+
+def test_overlay_mask_is_within_error_bound(study_area, backend):
+    study_area.update(distance_field_cell_size='20 feet', distance_field_max_distance='1500 feet')
+    layers = ["Mosquito_Larval_Sites", "Wetlands", "avoid_points"]
+    store = DistanceFieldStore(study_area, backend, layers)
+    buffer_distances = {"Mosquito_Larval_Sites": 1000, "Wetlands": 500}
+    erase_distances = {"avoid_points": 150}
+    mask = store.overlay_mask(buffer_distances, erase_distances)
+
+    exact = exact_overlay(backend, buffer_distances, erase_distances)
+    xs, ys = store.grid.cell_centers(0, store.grid.rows)
+    inside = shapely.contains_xy(exact, xs, ys).reshape(mask.shape)
+    wrong = mask != inside
+    # Misclassified cells only occur where the exact boundary passes near the cell center
+    distances = shapely.distance(exact.boundary, shapely.points(xs[wrong.ravel()], ys[wrong.ravel()]))
+    assert np.all(distances <= store.error_bound + 1e-6)
+    assert abs(np.count_nonzero(mask) * store.cell_size ** 2 - exact.area) / exact.area < 0.02
+
+
+def test_fields_are_cached_until_the_layer_changes(study_area, backend):
+    study_area['distance_field_max_distance'] = '1500 feet'
+    computed = []
+    store = DistanceFieldStore(study_area, backend, ["Wetlands"])
+    compute = store.compute
+    store.compute = lambda layer: computed.append(layer) or compute(layer)
+    store.field("Wetlands")
+
+    again = DistanceFieldStore(study_area, backend, ["Wetlands"])
+    again.compute = store.compute
+    again.field("Wetlands")
+    assert computed == ["Wetlands"]
+
+    backend.write("Wetlands", [(shapely.box(-500, -500, 1400, 900), {})])
+    changed = DistanceFieldStore(study_area, backend, ["Wetlands"])
+    changed.compute = store.compute
+    changed.field("Wetlands")
+    assert computed == ["Wetlands", "Wetlands"]
+
+
+def test_polygonize_round_trips_mask():
+    grid = DistanceGrid(0.0, 100.0, 10.0, 10, 10)
+    mask = np.zeros((10, 10), dtype=bool)
+    mask[2:5, 3:8] = True
+    polygons = shapely.union_all(grid.polygonize(mask))
+    assert polygons.area == 15 * 100.0
+    xs, ys = grid.cell_centers(0, 10)
+    assert np.array_equal(grid.points_in_mask(mask, xs, ys), mask.ravel())
+
+
+def test_raster_sweep_is_close_to_vector_sweep(study_area):
+    grid = {'Mosquito_Larval_Sites': [800, 1000], 'Wetlands': 500, 'Lakes_and_Reservoirs': 800,
+            'OSMP_Properties': 100}
+    vector = finalproject.run_sweep(grid, study_area)
+    study_area.update(distance_field_cell_size='20 feet', distance_field_max_distance='1500 feet')
+    raster = finalproject.run_raster_sweep(grid, study_area)
+    for v, r in zip(vector, raster):
+        assert r['treatment_acres'] == pytest.approx(v['treatment_acres'], rel=0.02)
+        # The synthetic addresses sit on a grid, so a few lie exactly on buffer boundaries
+        assert r['address_count'] == pytest.approx(v['address_count'], rel=0.02)
+
+
+def test_distances_beyond_the_field_cap_are_rejected(study_area, backend):
+    study_area['distance_field_max_distance'] = '1500 feet'
+    store = DistanceFieldStore(study_area, backend, ["Wetlands"])
+    with pytest.raises(ValueError, match="Wetlands 2000"):
+        store.overlay_mask({"Wetlands": 2000})
+    with pytest.raises(ValueError, match="avoid_points"):
+        store.overlay_mask({"Wetlands": 500}, {"avoid_points": "1 mile"})
+    with pytest.raises(ValueError):
+        finalproject.run_raster_sweep({'Wetlands': [500, 2000]}, study_area)
+    assert not os.listdir(store.store_dir)
+
+
+def test_raster_sweep_builds_fields_for_grid_layers_only(study_area):
+    study_area['distance_field_max_distance'] = '1500 feet'
+    finalproject.run_raster_sweep({'Wetlands': [300, 500]}, study_area)
+    store_dir = os.path.join(study_area['output_folder'], 'distance_fields')
+    assert sorted(os.listdir(store_dir)) == ["Wetlands.json", "Wetlands.npy", "avoid_points.json",
+                                             "avoid_points.npy"]
@@ -0,0 +1,104 @@
+import sqlite3
+
+import pytest
+
+from etl import GeocodeCache as geocode_cache_module
+from etl.GeocodeCache import GeocodeCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(geocode_cache_module.time, 'time', fake)
+    return fake
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "cache" / "geocode.sqlite"), ttl_seconds=100, negative_ttl_seconds=10,
+                         max_entries=3)
+    yield cache
+    cache.close()
+
+
+def test_key_ignores_case_commas_and_spacing():
+    assert GeocodeCache.make_key("1  Main St,", "Boulder", "CO", "census") == \
+        GeocodeCache.make_key("1 main st", "boulder", "co", "census")
+    assert GeocodeCache.make_key("1 Main St", "Boulder", "CO", "census") != \
+        GeocodeCache.make_key("1 Main St", "Boulder", "CO", "nominatim")
+
+
+def test_matches_and_no_matches_expire_separately(cache, clock):
+    cache.put("1 Main St", "Boulder", "CO", "census", (-105.27, 40.01))
+    cache.put("9 Nowhere Rd", "Boulder", "CO", "census", None)
+    assert cache.get("1 Main St", "Boulder", "CO", "census") == (-105.27, 40.01)
+    assert cache.get("9 Nowhere Rd", "Boulder", "CO", "census") == GeocodeCache.NO_MATCH
+
+    clock.now += 50
+    assert cache.get("1 Main St", "Boulder", "CO", "census") == (-105.27, 40.01)
+    assert cache.get("9 Nowhere Rd", "Boulder", "CO", "census") is None
+
+    clock.now += 51
+    assert cache.get("1 Main St", "Boulder", "CO", "census") is None
+    assert cache.stats()['expired'] == 2
+    assert cache.stats()['size'] == 0
+
+
+def test_least_recently_used_rows_are_evicted(cache, clock):
+    for number in range(3):
+        cache.put(f"{number} Main St", "Boulder", "CO", "census", (float(number), 0.0))
+        clock.now += 1
+    # Reading the oldest row makes "1 Main St" the least recently used
+    assert cache.get("0 Main St", "Boulder", "CO", "census") == (0.0, 0.0)
+    clock.now += 1
+    cache.put("3 Main St", "Boulder", "CO", "census", (3.0, 0.0))
+    assert cache.get("1 Main St", "Boulder", "CO", "census") is None
+    assert cache.get("0 Main St", "Boulder", "CO", "census") == (0.0, 0.0)
+    stats = cache.stats()
+    assert stats['evicted'] == 1 and stats['size'] == 3
+
+
+def test_cache_persists_across_connections(tmp_path):
+    path = str(tmp_path / "geocode.sqlite")
+    cache = GeocodeCache(path)
+    cache.put("1 Main St", "Boulder", "CO", "census", (-105.27, 40.01))
+    cache.close()
+    reopened = GeocodeCache(path)
+    assert reopened.get("1 Main St", "Boulder", "CO", "census") == (-105.27, 40.01)
+    reopened.close()
+
+
+def test_access_times_are_committed_in_batches(tmp_path, clock):
+    path = str(tmp_path / "geocode.sqlite")
+    cache = GeocodeCache(path, access_flush_every=3)
+    for number in range(3):
+        cache.put(f"{number} Main St", "Boulder", "CO", "census", (float(number), 0.0))
+
+    def stored_access():
+        reader = sqlite3.connect(path)
+        try:
+            return dict(reader.execute("SELECT cache_key, last_access FROM geocode_cache"))
+        finally:
+            reader.close()
+
+    before = stored_access()
+    clock.now += 10
+    for number in range(2):
+        cache.get(f"{number} Main St", "Boulder", "CO", "census")
+    # Two hits are still pending, so nothing has been committed
+    assert stored_access() == before
+    cache.get("2 Main St", "Boulder", "CO", "census")
+    assert set(stored_access().values()) == {clock.now}
+
+    clock.now += 10
+    cache.get("0 Main St", "Boulder", "CO", "census")
+    cache.close()
+    assert max(stored_access().values()) == clock.now
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from etl.GSheetsEtl import GSheetsEtl
+
+
+def write_sheet(config_dict, count):
+    raw = os.path.join(config_dict['download_dir'], 'raw_addresses.csv')
+    with open(raw, 'w', encoding='utf-8') as f:
+        f.write("Timestamp,Street Address\n")
+        for number in range(1, count + 1):
+            f.write(f"1/1,{number} Main St\n")
+    return raw
+
+
+def test_interrupted_transform_resumes_from_checkpoint(etl_config, monkeypatch):
+    etl_config.update(incremental_extract=False, geocode_workers=1, geocode_checkpoint_every=2)
+    raw = write_sheet(etl_config, 6)
+    out = os.path.join(etl_config['download_dir'], 'new_addresses.csv')
+
+    calls = []
+    first_run = GSheetsEtl(etl_config)
+
+    def interrupted_geocode(address):
+        if len(calls) == 4:
+            raise KeyboardInterrupt
+        calls.append(address)
+        return -105.0, 40.0
+
+    monkeypatch.setattr(first_run, 'geocode', interrupted_geocode)
+    with pytest.raises(KeyboardInterrupt):
+        first_run.transform(raw, out)
+    assert os.path.exists(first_run.checkpoint_path())
+    assert not os.path.exists(out)
+    # Only the checkpoint may supply the finished addresses on the rerun
+    os.remove(os.path.join(etl_config['download_dir'], 'geocode_cache.sqlite'))
+
+    resumed = []
+    second_run = GSheetsEtl(etl_config)
+    monkeypatch.setattr(second_run, 'geocode', lambda address: resumed.append(address) or (-105.0, 40.0))
+    second_run.transform(raw, out)
+    assert resumed == ["5 MAIN ST Boulder CO", "6 MAIN ST Boulder CO"]
+    with open(out, encoding='utf-8') as f:
+        assert len(f.read().splitlines()) == 7
+    assert not os.path.exists(second_run.checkpoint_path())
+
+
+def test_checkpoint_ignored_when_input_changes(etl_config, monkeypatch):
+    etl_config.update(incremental_extract=False)
+    etl = GSheetsEtl(etl_config)
+    raw = write_sheet(etl_config, 3)
+    snapshot = etl.input_snapshot(raw, ["1 MAIN ST"])
+    etl.write_checkpoint(snapshot, {"1 MAIN ST": (-105.0, 40.0), "2 MAIN ST": ValueError()}, 2, 3)
+    assert etl.read_checkpoint(snapshot) == {"1 MAIN ST": (-105.0, 40.0)}
+
+    write_sheet(etl_config, 4)
+    assert etl.read_checkpoint(etl.input_snapshot(raw, ["1 MAIN ST"])) == {}
+    etl_config['geocode_resume'] = False
+    assert etl.read_checkpoint(snapshot) == {}
@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from Lab2.etl.SpatialEtl import SpatialEtl
+from etl.Geocoders import GeocoderBackend, GeocoderChain, GeocoderError
+from etl.RateLimiter import TokenBucket
+
+
+class StandInGeocoder(GeocoderBackend):
+    name = 'stand_in'
+
+    def __init__(self, config_dict, session, url, rate=1000):
+        super().__init__(config_dict, session)
+        self.url = url
+        self.limiter = TokenBucket(rate, capacity=1)
+        self.acquired = 0
+        acquire = self.limiter.acquire
+
+        def counting_acquire():
+            self.acquired += 1
+            return acquire()
+        self.limiter.acquire = counting_acquire
+
+    def request_args(self, address):
+        return self.url, {'q': address}
+
+    def parse(self, response_json):
+        return tuple(response_json) if response_json else None
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=20, capacity=1)
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    # The first token is already in the bucket, the other four take 1/20 s each
+    assert time.monotonic() - start >= 4 / 20 * 0.9
+
+
+def test_retries_go_through_rate_limiter_only(server):
+    etl = SpatialEtl({})
+    backend = StandInGeocoder({}, etl.geocoder_session, server.url)
+    server.responses = [(429, {'Retry-After': '0'}, {}), (503, {}, {}), (200, {}, [-105.27, 40.01])]
+    chain = GeocoderChain([backend], max_retries=2, backoff_seconds=0.01)
+    assert chain.geocode("1 Main St Boulder CO") == (-105.27, 40.01)
+    assert len(server.requests) == 3
+    assert backend.acquired == 3
+    etl.close()
+
+
+def test_retry_after_header_is_reported(server):
+    etl = SpatialEtl({})
+    backend = StandInGeocoder({}, etl.geocoder_session, server.url)
+    server.responses = [(429, {'Retry-After': '7'}, {})]
+    with pytest.raises(GeocoderError) as excinfo:
+        backend.geocode("1 Main St Boulder CO")
+    assert excinfo.value.retry_after == 7
+    assert len(server.requests) == 1
+    etl.close()
+
+
+def test_hedge_clock_starts_when_request_is_sent(server):
+    etl = SpatialEtl({})
+    # The first backend has to wait 0.5 s for a token but then answers at once
+    slow_start = StandInGeocoder({}, etl.geocoder_session, server.url, rate=2)
+    slow_start.limiter.acquire()
+    fallback = StandInGeocoder({}, etl.geocoder_session, server.url)
+    fallback.name = 'fallback'
+    server.responses = [(200, {}, [1.0, 2.0])]
+    chain = GeocoderChain([slow_start, fallback], hedge_after=0.2, breaker_failures=100)
+    assert chain.geocode("1 Main St Boulder CO") == (1.0, 2.0)
+    assert chain.hedged == 0
+    assert fallback.acquired == 0
+    etl.close()
@@ -0,0 +1,87 @@
+import json
+import os
+
+import pytest
+
+import finalproject
+from etl.GSheetsEtl import GSheetsEtl
+
+
+def read_state(config_dict):
+    path = os.path.join(config_dict['download_dir'], 'extract_state.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_extract_state_written_only_after_load(etl_config, backend, monkeypatch):
+    def failing_load(*args):
+        raise OSError("geodatabase locked")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(type(backend), 'xy_table_to_point', failing_load)
+        finalproject.process(etl_config)
+    assert read_state(etl_config) is None
+    assert not backend.exists('avoid_points')
+
+    # The retry downloads and geocodes the same rows again, then records them
+    finalproject.process(etl_config)
+    state = read_state(etl_config)
+    assert state['etag'] == '"v1"'
+    assert len(state['rows']) == 2
+    assert backend.exists('avoid_points')
+
+
+def test_load_failure_propagates(etl_config, backend, monkeypatch):
+    def failing_load(*args):
+        raise OSError("geodatabase locked")
+
+    etl_instance = GSheetsEtl(etl_config)
+    etl_instance.extract()
+    etl_instance.transform(os.path.join(etl_config['download_dir'], 'raw_addresses.csv'),
+                           os.path.join(etl_config['download_dir'], 'new_addresses.csv'))
+    assert etl_instance.pending_state is not None
+    monkeypatch.setattr(type(backend), 'xy_table_to_point', failing_load)
+    with pytest.raises(OSError):
+        finalproject.load(etl_config)
+    assert read_state(etl_config) is None
+
+
+def test_transform_failure_skips_append_load(etl_config, backend, server, monkeypatch):
+    finalproject.process(etl_config)
+    server.sheet += "1/3/2024,3 Main St\n"
+    server.routes['/sheet.csv'] = lambda request, body: (200, {'ETag': '"v2"'}, server.sheet)
+    replace = os.replace
+
+    def failing_replace(src, dst):
+        if dst.endswith('new_addresses.csv'):
+            raise OSError("disk full")
+        replace(src, dst)
+
+    # The second run only adds a row, but its output cannot be written
+    monkeypatch.setattr(os, 'replace', failing_replace)
+    etl_instance = GSheetsEtl(etl_config)
+    etl_instance.extract()
+    with pytest.raises(OSError):
+        etl_instance.transform(os.path.join(etl_config['download_dir'], 'raw_addresses.csv'),
+                               os.path.join(etl_config['download_dir'], 'new_addresses.csv'))
+    assert not etl_instance.append_only
+
+    # process() must not append the first run's changed_addresses.csv again
+    finalproject.process(etl_config)
+    monkeypatch.undo()
+    assert len(backend.geometries('avoid_points')) == 2
+    assert read_state(etl_config)['etag'] == '"v1"'
+
+
+def test_subcommands_keep_the_sheet_validators(etl_config, backend, server):
+    for _ in range(2):
+        finalproject.run_extract(None, etl_config)
+        finalproject.run_geocode(None, etl_config)
+    sheet_requests = [r for r in server.requests if r[1] == '/sheet.csv']
+    assert 'If-None-Match' not in sheet_requests[0][2]
+    # The second download is conditional on the ETag the first geocode recorded, and answered with 304
+    assert sheet_requests[1][2]['If-None-Match'] == '"v1"'
+    assert read_state(etl_config)['etag'] == '"v1"'
+    assert len(backend.geometries('avoid_points')) == 2
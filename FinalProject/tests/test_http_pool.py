@@ -0,0 +1,25 @@
+from urllib.parse import urlsplit
+
+from Lab2.etl.SpatialEtl import SpatialEtl
+
+
+def test_session_reuses_pooled_connections(server):
+    etl = SpatialEtl({})
+    assert etl.session is etl.session
+    for _ in range(5):
+        etl.session.get(server.url).raise_for_status()
+    etl.geocoder_session.get(server.url).raise_for_status()
+    host = f"http://{urlsplit(server.base_url).hostname}"
+    stats = etl.pool_stats()[host]
+    # One connection per session, every later request goes over a kept-alive connection
+    assert stats == {'requests': 6, 'new_connections': 2, 'reused_connections': 4}
+    etl.close()
+    assert etl.pool_stats() == {}
+
+
+def test_pool_size_follows_geocode_workers():
+    etl = SpatialEtl({'geocode_workers': 16})
+    adapter = etl.session.get_adapter("https://example.com")
+    assert adapter._pool_maxsize == 16 and adapter._pool_block
+    assert etl.session.headers['User-Agent'] == 'GIS305-FinalProject-Geocoder'
+    etl.close()
@@ -0,0 +1,95 @@
+import argparse
+import os
+
+import pytest
+import shapely
+
+import finalproject
+from gis.IncrementalErase import avoid_point_delta, patch_erase
+
+
+def analysis_args(**kwargs):
+    defaults = dict(sweep=False, batch=True, incremental=False, grid=None, raster=False, polygonize=False)
+    defaults.update(kwargs)
+    return argparse.Namespace(**defaults)
+
+
+def test_avoid_point_delta_rounds_coordinates():
+    added, removed = avoid_point_delta([(1.001, 2.0), (5.0, 5.0)], [(1.0, 2.0), (7.0, 7.0)], precision=2)
+    assert added == [(7.0, 7.0)]
+    assert removed == [(5.0, 5.0)]
+
+
+def test_patch_erase_matches_full_erase():
+    intersect = [shapely.box(0, 0, 1000, 1000)]
+    old_points = [(200.0, 200.0), (800.0, 800.0)]
+    new_points = [(200.0, 200.0), (500.0, 500.0)]
+
+    def full(points):
+        return shapely.difference(intersect[0], shapely.union_all(shapely.buffer(shapely.points(points), 100, quad_segs=16)))
+
+    added, removed = avoid_point_delta(old_points, new_points)
+    patched, affected = patch_erase([full(old_points)], intersect, new_points, added + removed, 100)
+    assert shapely.symmetric_difference(patched, full(new_points)).area < 1e-6
+    assert affected.contains(shapely.Point(800, 800))
+
+
+def test_incremental_run_matches_full_run(study_area, backend):
+    args = analysis_args(incremental=True)
+    finalproject.run_analysis(args, study_area)
+    assert os.path.exists(finalproject.analysis_state_path(study_area))
+
+    backend.write("avoid_points", [(shapely.Point(x, y), {}) for x, y in [(100, 100), (700, 300)]])
+    study_area.pop('run_id')
+    study_area['stage_cache_enabled'] = True
+    finalproject.run_analysis(args, study_area)
+    patched = shapely.union_all(backend.geometries("Final_Analysis"))
+    with open(os.path.join(study_area['output_folder'], "addresses_within_final_analysis.csv")) as f:
+        patched_rows = sorted(f.read().splitlines())
+
+    finalproject.run_analysis(analysis_args(), study_area)
+    full = shapely.union_all(backend.geometries("Final_Analysis"))
+    with open(os.path.join(study_area['output_folder'], "addresses_within_final_analysis.csv")) as f:
+        assert sorted(f.read().splitlines()) == patched_rows
+    assert shapely.symmetric_difference(patched, full).area / full.area < 1e-6
+
+
+def test_state_only_saved_in_incremental_mode(study_area):
+    finalproject.run_analysis(analysis_args(), study_area)
+    assert not os.path.exists(finalproject.analysis_state_path(study_area))
+
+
+def test_full_run_invalidates_saved_state(study_area, backend):
+    distances = dict(study_area['buffer_distances'])
+    finalproject.run_analysis(analysis_args(incremental=True), study_area)
+    expected = shapely.union_all(backend.geometries("Final_Analysis")).area
+
+    study_area['buffer_distances'] = dict(distances, Wetlands=50)
+    finalproject.run_analysis(analysis_args(), study_area)
+    assert not os.path.exists(finalproject.analysis_state_path(study_area))
+
+    # Back at the first distances the incremental run must not treat the Wetlands=50 outputs as current
+    study_area['buffer_distances'] = distances
+    finalproject.run_analysis(analysis_args(incremental=True), study_area)
+    assert shapely.union_all(backend.geometries("Final_Analysis")).area == pytest.approx(expected)
+
+
+def test_rewritten_outputs_are_not_patched(study_area, backend, capsys):
+    args = analysis_args(incremental=True)
+    finalproject.run_analysis(args, study_area)
+    expected = shapely.union_all(backend.geometries("Final_Analysis")).area
+    backend.write_geometry("Final_Analysis", shapely.box(0, 0, 10, 10))
+    assert not finalproject.incremental_reanalysis(
+        {layer: finalproject.buffer_distance(d) for layer, d in study_area['buffer_distances'].items()}, study_area)
+    assert "outputs changed" in capsys.readouterr().out
+    finalproject.run_analysis(args, study_area)
+    assert shapely.union_all(backend.geometries("Final_Analysis")).area == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('setting', [{'simplify_layers': ["Wetlands"]}, {'simplify_tolerance_ratio': 0.05},
+                                     {'buffer_ring_layers': ["Wetlands"]}, {'buffer_ring_step': 250}])
+def test_output_settings_are_part_of_the_base(study_area, setting):
+    distances = {'Wetlands': "500 feet"}
+    base = finalproject.analysis_base(distances, study_area)
+    study_area.update(setting)
+    assert finalproject.analysis_base(distances, study_area) != base
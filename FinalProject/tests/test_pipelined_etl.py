@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+
+import pytest
+
+import finalproject
+from etl.GSheetsEtl import GSheetsEtl
+
+
+@pytest.fixture
+def pipelined_config(etl_config, server):
+    server.sheet = "Timestamp,Street Address\n" + "".join(f"1/1,{n} Main St\n" for n in range(1, 21)) + \
+        "1/2,3 Main Street Apt 2\n"
+    etl_config.update(pipelined_etl=True, pipeline_batch_size=3, pipeline_queue_size=2, geocode_workers=3)
+    return etl_config
+
+
+def test_pipelined_etl_loads_every_row(pipelined_config, backend, server):
+    finalproject.process(pipelined_config)
+    assert len(backend.geometries('avoid_points')) == 21
+    assert len([r for r in server.requests if r[1].startswith('/search')]) == 20
+    with open(os.path.join(pipelined_config['download_dir'], 'new_addresses.csv'), encoding='utf-8') as f:
+        assert len(f.read().splitlines()) == 22
+
+    # The saved ETag makes the next run a no-op
+    finalproject.process(pipelined_config)
+    assert len([r for r in server.requests if r[1].startswith('/search')]) == 20
+
+
+def test_load_failure_stops_pipeline(pipelined_config):
+    def failing_batch(batch):
+        raise OSError("disk full")
+
+    etl = GSheetsEtl(pipelined_config)
+    with pytest.raises(OSError):
+        etl.stream_process(os.path.join(pipelined_config['download_dir'], 'new_addresses.csv'),
+                           lambda: None, failing_batch)
+    assert not os.path.exists(etl.extract_state_path())
+
+
+def test_malformed_sheet_does_not_hang(pipelined_config, server, backend):
+    server.sheet = "Timestamp,Address\n" + "".join(f"1/1,{n} Main St\n" for n in range(1, 41))
+    worker = threading.Thread(target=finalproject.process, args=(pipelined_config,), daemon=True)
+    worker.start()
+    worker.join(timeout=20)
+    assert not worker.is_alive()
+    assert not [r for r in server.requests if r[1].startswith('/search')]
+
+
+def test_short_rows_are_skipped(pipelined_config, server, backend):
+    server.sheet = "Timestamp,Street Address\n1/1,1 Main St\n1/1\n1/1,2 Main St,extra\n1/1,3 Main St\n"
+    finalproject.process(pipelined_config)
+    assert len(backend.geometries('avoid_points')) == 2
+
+
+def test_failed_geocode_releases_waiting_rows(pipelined_config):
+    etl = GSheetsEtl(pipelined_config)
+    started = threading.Event()
+
+    def failing_cached(address, cache):
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("cache unavailable")
+
+    etl.geocode_cached = failing_cached
+    etl.geocoded_rows = etl.unique_addresses = 0
+    in_flight, lock, errors = {}, threading.Lock(), []
+
+    def geocode():
+        try:
+            etl.geocode_once("1 Main St", None, in_flight, lock)
+        except RuntimeError as e:
+            errors.append(e)
+
+    first = threading.Thread(target=geocode)
+    first.start()
+    started.wait()
+    second = threading.Thread(target=geocode, daemon=True)
+    second.start()
+    first.join()
+    second.join(timeout=5)
+    assert not second.is_alive()
+    assert len(errors) == 2
@@ -0,0 +1,35 @@
+import numpy as np
+import shapely
+
+from gis.RasterOverlay import RasterOverlay, overlay_disagreement
+
+
+def test_overlay_matches_vector_overlay_within_a_cell(config_dict, backend):
+    backend.write("a", [(shapely.Point(0, 0).buffer(500, quad_segs=32), {})])
+    backend.write("b", [(shapely.box(-200, -600, 700, 300), {})])
+    backend.write("c", [(shapely.box(-100, -100, 100, 100), {})])
+    config_dict['raster_overlay_cell_size'] = '10 feet'
+    overlay = RasterOverlay(config_dict, backend)
+    mask, grid = overlay.overlay(["a", "b"], ["c"])
+
+    exact = shapely.Point(0, 0).buffer(500, quad_segs=32).intersection(shapely.box(-200, -600, 700, 300)) \
+        .difference(shapely.box(-100, -100, 100, 100))
+    xs, ys = grid.cell_centers(0, grid.rows)
+    wrong = mask.ravel() != shapely.contains_xy(exact, xs, ys)
+    assert not np.any(shapely.distance(exact.boundary, shapely.points(xs[wrong], ys[wrong])) > 10 * np.sqrt(2) / 2)
+    assert abs(np.count_nonzero(mask) * 100.0 - exact.area) / exact.area < 0.02
+
+
+def test_disjoint_layers_give_an_empty_mask(config_dict, backend):
+    backend.write("a", [(shapely.box(0, 0, 100, 100), {})])
+    backend.write("b", [(shapely.box(500, 500, 600, 600), {})])
+    mask, _ = RasterOverlay(config_dict, backend).overlay(["a", "b"])
+    assert not mask.any()
+
+
+def test_overlay_disagreement_counts_addresses():
+    exact = [shapely.box(0, 0, 10, 10)]
+    approx = [shapely.box(1, 0, 11, 10)]
+    stats = overlay_disagreement(exact, approx, np.array([0.5, 5.0, 10.5, 20.0]), np.array([5.0, 5.0, 5.0, 5.0]))
+    assert stats == {'area_disagreement_pct': 20.0, 'exact_addresses': 2, 'approx_addresses': 2,
+                     'missed_addresses': 1, 'extra_addresses': 1}
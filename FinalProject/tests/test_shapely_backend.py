@@ -0,0 +1,70 @@
+import argparse
+
+import pytest
+import shapely
+
+import finalproject
+from gis.GeometryBackend import parse_distance
+
+
+def test_parse_distance_converts_units():
+    assert parse_distance("1500 feet") == 1500.0
+    assert parse_distance(" 100 ", 'meters') == pytest.approx(30.48)
+    assert parse_distance("1 mile", 'feet') == 5280.0
+    assert parse_distance(250, 'meters') == 250.0
+    with pytest.raises(ValueError):
+        parse_distance("far away")
+    with pytest.raises(ValueError):
+        parse_distance("3 furlongs")
+
+
+def test_overlay_operations(backend):
+    backend.write("a", [(shapely.box(0, 0, 10, 10), {'name': 'a1'}), (shapely.box(20, 0, 30, 10), {'name': 'a2'})])
+    backend.write("b", [(shapely.box(5, 5, 25, 15), {'kind': 'b1'})])
+    intersected = backend.intersect(["a", "b"], "ab")
+    assert sorted(g.area for g in backend.geometries(intersected)) == [25.0, 25.0]
+    assert {p['name'] for _, p in backend.read(intersected)} == {'a1', 'a2'}
+    assert all(p['kind'] == 'b1' for _, p in backend.read(intersected))
+
+    dissolved = backend.dissolve("a", "a_dissolved")
+    assert backend.count(dissolved) == 1
+    erased = backend.erase("a", "b", "a_erased")
+    assert sum(g.area for g in backend.geometries(erased)) == 150.0
+
+    backend.write("points", [(shapely.Point(x, 5), {'id': x}) for x in (1, 7, 15, 22, 40)])
+    joined = backend.spatial_join("points", "a", "joined")
+    assert sorted(p['id'] for _, p in backend.read(joined)) == [1, 7, 22]
+    assert {p['id']: p['name'] for _, p in backend.read(joined)}[22] == 'a2'
+
+
+def test_exact_workflow_matches_direct_overlay(study_area, backend):
+    args = argparse.Namespace(sweep=False, batch=True, incremental=False, grid=None, raster=False, polygonize=False)
+    finalproject.run_analysis(args, study_area)
+
+    def buffered(layer, distance):
+        return shapely.union_all(shapely.buffer(backend.geometries(layer), distance, quad_segs=16))
+
+    intersect = shapely.intersection_all([buffered(layer, distance)
+                                          for layer, distance in study_area['buffer_distances'].items()])
+    expected = intersect.difference(buffered("avoid_points", 150))
+    final = shapely.union_all(backend.geometries("Final_Analysis"))
+    assert shapely.symmetric_difference(final, expected).area / expected.area < 1e-6
+
+    addresses = backend.geometries("Building_Addresses")
+    assert backend.count("Target_Addresses") == int(shapely.intersects(intersect, addresses).sum())
+
+
+def test_window_read_does_not_cache_the_layer(config_dict):
+    from gis import GeometryBackend
+    from gis.GeometryBackend import get_backend
+    boxes = [shapely.box(x, 0, x + 10, 10) for x in range(0, 1000, 20)]
+    get_backend(config_dict).write("Parcels", [(b, {}) for b in boxes])
+
+    # A fresh backend, as in a tile worker process
+    GeometryBackend._backends.clear()
+    backend = get_backend(config_dict)
+    window = backend.geometries("Parcels", bbox=(95, -5, 205, 5))
+    assert "Parcels" not in backend._layers
+    assert [g.bounds[0] for g in window] == [100, 120, 140, 160, 180, 200]
+    assert [g.bounds[0] for g in backend.geometries("Parcels")] == [b.bounds[0] for b in boxes]
+    assert backend.geometries("Parcels", bbox=(95, -5, 205, 5)) == window
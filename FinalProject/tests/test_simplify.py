@@ -0,0 +1,47 @@
+import json
+import math
+import os
+
+import pytest
+import shapely
+
+import finalproject
+
+
+@pytest.fixture
+def wavy_layer(config_dict, backend):
+    # A circle with a 1 ft wobble on every vertex, which simplification should flatten
+    ring = [(1000 * math.cos(a) + (i % 2), 1000 * math.sin(a))
+            for i, a in enumerate(i * 2 * math.pi / 720 for i in range(720))]
+    backend.write("Wetlands", [(shapely.Polygon(ring), {})])
+    return "Wetlands"
+
+
+def test_simplify_layer_reduces_vertices_within_tolerance(config_dict, backend, wavy_layer):
+    config_dict.update(simplify_tolerance_ratio=0.01, simplify_compare_buffers=True)
+    simplified = finalproject.simplify_layer(wavy_layer, "500 feet", config_dict)
+    with open(os.path.join(config_dict['output_folder'], "simplify_Wetlands_500_feet.json")) as f:
+        report = json.load(f)
+    assert report['tolerance_feet'] == pytest.approx(5.0)
+    assert report['vertices_after'] == backend.vertex_count(simplified) < report['vertices_before']
+    assert abs(report['area_change_pct']) < 1.0
+    assert abs(report['buffered_area_change_pct']) < 1.0
+    # The buffers built only for the comparison are removed again
+    assert not backend.exists("simp_check_original_Wetlands")
+    assert not backend.exists("simp_check_simplified_Wetlands")
+
+
+def test_simplify_report_collects_listed_layers(config_dict, wavy_layer, capsys):
+    config_dict.update(simplify_layers=[wavy_layer], simplify_report_file="simplify_report.json")
+    finalproject.simplify_layer(wavy_layer, "500 feet", config_dict)
+    finalproject.simplify_layer(wavy_layer, "800 feet", config_dict, out_name="simp_Wetlands_800")
+    reports = finalproject.simplify_report(config_dict)
+    assert sorted(r['buffer_distance'] for r in reports) == ["500 feet", "800 feet"]
+    assert "Wetlands @ 500 feet" in capsys.readouterr().out
+    with open(os.path.join(config_dict['output_folder'], "simplify_report.json")) as f:
+        assert json.load(f) == reports
+
+
+def test_simplify_layer_requires_input(config_dict):
+    with pytest.raises(FileNotFoundError):
+        finalproject.simplify_layer("Missing", "500 feet", config_dict)
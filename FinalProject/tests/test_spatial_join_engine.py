@@ -0,0 +1,26 @@
+import numpy as np
+import shapely
+
+from gis.SpatialJoinEngine import PointInPolygonJoin
+
+
+def test_join_matches_brute_force():
+    rng = np.random.default_rng(7)
+    polygons = [shapely.box(0, 0, 10, 10), shapely.Point(15, 15).buffer(6), shapely.box(8, 8, 20, 12),
+                shapely.Polygon([(30, 0), (40, 0), (35, 8)])]
+    xs = np.concatenate([rng.uniform(-5, 45, 2000), [10.0, 0.0, 50.0]])
+    ys = np.concatenate([rng.uniform(-5, 25, 2000), [9.0, 0.0, 50.0]])
+    join_count, first_match = PointInPolygonJoin(polygons, batch_size=128).join(xs, ys)
+
+    hits = np.array([[p.intersects(shapely.Point(x, y)) for p in polygons] for x, y in zip(xs, ys)])
+    assert np.array_equal(join_count, hits.sum(axis=1))
+    assert np.array_equal(first_match, np.where(hits.any(axis=1), hits.argmax(axis=1), -1))
+    # Points on a boundary or corner count as inside (INTERSECT semantics)
+    assert join_count[-3] == 2 and join_count[-2] == 1 and join_count[-1] == 0
+
+
+def test_join_without_polygons_or_points():
+    count, first = PointInPolygonJoin([]).join(np.array([1.0]), np.array([1.0]))
+    assert count.tolist() == [0] and first.tolist() == [-1]
+    count, first = PointInPolygonJoin([shapely.box(0, 0, 1, 1)]).join(np.array([]), np.array([]))
+    assert len(count) == 0 and len(first) == 0
@@ -0,0 +1,50 @@
+import shapely
+
+from gis.GeometryBackend import get_backend
+from pipeline.StageCache import StageCache, run_cached
+
+
+def write_square(config_dict, name, size):
+    get_backend(config_dict).write(name, [(shapely.box(0, 0, size, size), {})])
+    return name
+
+
+def counting_stage(calls):
+    def stage(layer, distance, config_dict):
+        calls.append((layer, distance))
+        backend = get_backend(config_dict)
+        return backend.buffer(layer, "buffered", f"{distance} feet")
+    return stage
+
+
+def test_make_key_depends_on_params_and_input(config_dict, backend):
+    write_square(config_dict, "squares", 100)
+    cache = StageCache(config_dict['stage_cache_dir'], backend)
+    key = cache.make_key("buffer", {'args': ["squares", 10]}, ["squares"])
+    assert key == cache.make_key("buffer", {'args': ["squares", 10]}, ["squares"])
+    assert key != cache.make_key("buffer", {'args': ["squares", 20]}, ["squares"])
+    write_square(config_dict, "squares", 200)
+    assert key != cache.make_key("buffer", {'args': ["squares", 10]}, ["squares"])
+    cache.close()
+
+
+def test_run_cached_reuses_output_until_settings_change(config_dict, backend):
+    config_dict.update(stage_cache_enabled=True, run_id="test")
+    write_square(config_dict, "squares", 100)
+    calls = []
+    stage = counting_stage(calls)
+    first = run_cached("buffer", stage, ["squares", 10], ["squares"], config_dict, backend)
+    area = backend.area(first)
+    assert run_cached("buffer", stage, ["squares", 10], ["squares"], config_dict, backend) == first
+    assert len(calls) == 1
+
+    config_dict['buffer_quad_segments'] = 4
+    run_cached("buffer", stage, ["squares", 10], ["squares"], config_dict, backend)
+    assert len(calls) == 2
+
+    # Overwriting the output restores the cached snapshot instead of rerunning the stage
+    config_dict.pop('buffer_quad_segments')
+    write_square(config_dict, "buffered", 5)
+    run_cached("buffer", stage, ["squares", 10], ["squares"], config_dict, backend)
+    assert len(calls) == 2
+    assert abs(backend.area(first) - area) < 1e-6 * area
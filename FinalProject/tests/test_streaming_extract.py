@@ -0,0 +1,43 @@
+import gzip
+import os
+
+from etl.GSheetsEtl import GSheetsEtl
+
+SHEET = ('Timestamp,Street Address,Notes\n'
+         '1/1/2024,1 Main St,"first line\nsecond line"\n'
+         '1/2/2024,2 Main St,\n')
+
+
+def raw_path(config_dict):
+    return os.path.join(config_dict['download_dir'], 'raw_addresses.csv')
+
+
+def test_gzip_download_is_streamed_to_disk(etl_config, server):
+    server.routes['/sheet.csv'] = lambda request, body: (
+        200, {'Content-Encoding': 'gzip', 'ETag': '"v1"'}, gzip.compress(SHEET.encode()))
+    etl_config.update(download_chunk_size=7)
+    etl = GSheetsEtl(etl_config)
+    # Small chunks split the quoted multi-line field, which the row parser has to rejoin
+    rows = list(etl.stream_rows())
+    etl.close()
+    assert [row['Street Address'] for row in rows] == ["1 Main St", "2 Main St"]
+    assert rows[0]['Notes'] == "first line\nsecond line"
+    with open(raw_path(etl_config), encoding='utf-8', newline='') as f:
+        assert f.read() == SHEET
+    assert server.requests[0][2]['Accept-Encoding'] == 'gzip'
+    assert not os.path.exists(raw_path(etl_config) + ".part")
+
+
+def test_unchanged_sheet_is_not_downloaded_again(etl_config, server):
+    etl = GSheetsEtl(etl_config)
+    etl.extract()
+    etl.write_extract_state(dict(etl.pending_validators, rows={}))
+    with open(raw_path(etl_config), encoding='utf-8') as f:
+        first = f.read()
+
+    etl.extract()
+    etl.close()
+    assert etl.sheet_unchanged
+    assert server.requests[-1][2]['If-None-Match'] == '"v1"'
+    with open(raw_path(etl_config), encoding='utf-8') as f:
+        assert f.read() == first
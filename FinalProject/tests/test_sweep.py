@@ -0,0 +1,36 @@
+import csv
+import os
+
+import pytest
+
+import finalproject
+
+
+def test_parse_and_expand_grid():
+    grid = finalproject.parse_grid(["Wetlands=500,1000", "OSMP_Properties=100"])
+    assert grid == {'Wetlands': ['500', '1000'], 'OSMP_Properties': ['100']}
+    assert finalproject.expand_grid(grid) == [
+        {'Wetlands': '500 feet', 'OSMP_Properties': '100 feet'},
+        {'Wetlands': '1000 feet', 'OSMP_Properties': '100 feet'},
+    ]
+    with pytest.raises(ValueError):
+        finalproject.parse_grid(["Wetlands"])
+
+
+def test_sweep_shares_buffers_and_matches_single_runs(study_area, backend):
+    grid = {'Mosquito_Larval_Sites': [800, 1000], 'Wetlands': [300, 500], 'Lakes_and_Reservoirs': 800,
+            'OSMP_Properties': 100}
+    dag, scenario_ids = finalproject.build_sweep(finalproject.expand_grid(grid), study_area)
+    assert len(scenario_ids) == 4
+    assert len([name for name in dag.stages if name.startswith("buffer_")]) == 2 + 2 + 1 + 1 + 1
+
+    rows = finalproject.run_sweep(grid, study_area)
+    with open(os.path.join(study_area['output_folder'], 'scenario_results.csv'), newline='') as f:
+        assert len(list(csv.DictReader(f))) == 4
+
+    # The last scenario uses the distances of the study area's single run
+    study_area.pop('run_id')
+    finalproject.build_workflow(study_area['buffer_distances'], study_area).run()
+    assert rows[-1]['treatment_acres'] == pytest.approx(backend.area("Final_Analysis") / 4046.8564224)
+    assert rows[-1]['address_count'] == len(backend.geometries(
+        finalproject.spatial_join("Building_Addresses", "Final_Analysis", study_area)))
@@ -0,0 +1,38 @@
+import argparse
+import os
+
+import shapely
+
+import finalproject
+from gis.TiledOverlay import plan_tiles
+
+
+def analysis_args():
+    return argparse.Namespace(sweep=False, batch=True, incremental=False, grid=None, raster=False, polygonize=False)
+
+
+def read_report(config_dict):
+    with open(os.path.join(config_dict['output_folder'], "addresses_within_final_analysis.csv")) as f:
+        return sorted(f.read().splitlines())
+
+
+def test_plan_tiles_covers_extent_with_halo():
+    tiles = plan_tiles((0, 0, 250, 100), 100, 10)
+    assert len(tiles) == 3 * 1
+    assert [core for core, _ in tiles] == [(0, 0, 100, 100), (100, 0, 200, 100), (200, 0, 250, 100)]
+    assert tiles[0][1] == (-10, -10, 110, 110)
+    assert plan_tiles((0, 0, 0, 100), 100, 10) == []
+
+
+def test_tiled_mode_matches_exact_mode(study_area, backend):
+    finalproject.run_analysis(analysis_args(), study_area)
+    exact = shapely.union_all(backend.geometries("Final_Analysis"))
+    exact_report = read_report(study_area)
+    assert len(exact_report) > 10
+
+    study_area.pop('run_id')
+    study_area.update(analysis_mode='tiled', tile_size='700 feet')
+    finalproject.run_analysis(analysis_args(), study_area)
+    tiled = shapely.union_all(backend.geometries("Final_Analysis"))
+    assert shapely.symmetric_difference(exact, tiled).area / exact.area < 1e-6
+    assert read_report(study_area) == exact_report
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from pipeline.Tracer import Tracer
+
+
+def test_spans_nest_and_record_errors():
+    tracer = Tracer()
+    with tracer.span("buffer", features=3) as stage:
+        with tracer.span("Buffer_analysis", 'tool'):
+            pass
+    with pytest.raises(ValueError):
+        with tracer.span("erase"):
+            raise ValueError("empty layer")
+    spans = {s.name: s for s in tracer.spans}
+    assert spans["Buffer_analysis"].parent is stage and spans["Buffer_analysis"].depth == 1
+    assert stage.args == {'features': 3}
+    assert spans["erase"].error == "empty layer"
+    assert stage.duration >= spans["Buffer_analysis"].duration
+
+
+def test_traced_decorator_names_span_after_function():
+    tracer = Tracer()
+
+    @tracer.traced()
+    def intersect(value):
+        return value * 2
+
+    assert intersect(4) == 8
+    assert [s.name for s in tracer.spans] == ["intersect"]
+
+
+def test_chrome_trace_and_summary(tmp_path):
+    tracer = Tracer()
+    for _ in range(2):
+        with tracer.span("buffer"):
+            with tracer.span("Buffer_analysis", 'tool'):
+                pass
+    tracer.record("rings", 'stage', tracer.origin, 0.5, thread_id="worker 1", layer="Wetlands")
+
+    events = tracer.chrome_trace()['traceEvents']
+    assert all(e['ph'] == 'X' and e['ts'] >= 0 for e in events)
+    assert [e['ts'] for e in events] == sorted(e['ts'] for e in events)
+    rings = next(e for e in events if e['name'] == "rings")
+    assert rings['dur'] == pytest.approx(0.5e6) and rings['tid'] == "worker 1"
+    assert rings['args'] == {'layer': "Wetlands"}
+
+    summary = tracer.summary()
+    assert summary['by_name']['buffer']['calls'] == 2
+    assert summary['by_name']['Buffer_analysis']['category'] == 'tool'
+    assert summary['total_seconds'] >= 0.5
+    assert {s['parent'] for s in summary['spans'] if s['name'] == "Buffer_analysis"} == {"buffer"}
+
+    trace_path, summary_path = tmp_path / "trace.json", tmp_path / "summary.json"
+    tracer.write(str(trace_path), str(summary_path))
+    assert json.loads(trace_path.read_text())['traceEvents'] == events
+    assert json.loads(summary_path.read_text())['by_name'].keys() == summary['by_name'].keys()
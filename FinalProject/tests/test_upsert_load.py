@@ -0,0 +1,44 @@
+import csv
+import os
+
+import shapely
+
+import finalproject
+
+
+def write_addresses(config_dict, rows):
+    path = os.path.join(config_dict['download_dir'], 'new_addresses.csv')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("X,Y,Type,AddrKey\n")
+        for lon, lat, key in rows:
+            f.write(f"{lon},{lat},Residential,{key}\n")
+
+
+def test_upsert_load_applies_only_the_changes(config_dict, backend):
+    config_dict['upsert_load'] = True
+    write_addresses(config_dict, [(-105.27, 40.01, 'a'), (-105.28, 40.02, 'b'), (-105.29, 40.03, 'c')])
+    finalproject.load(config_dict)
+    assert backend.point_keys('avoid_points') == {'a': (-105.27, 40.01), 'b': (-105.28, 40.02),
+                                                  'c': (-105.29, 40.03)}
+    untouched = backend.geometries('avoid_points')[0]
+
+    # 'b' moved, 'c' was removed, 'd' is new and 'a' differs only by geocoder noise
+    write_addresses(config_dict, [(-105.27000001, 40.01, 'a'), (-105.3, 40.02, 'b'), (-105.31, 40.04, 'd')])
+    finalproject.load(config_dict)
+    assert backend.point_keys('avoid_points') == {'a': (-105.27, 40.01), 'b': (-105.3, 40.02),
+                                                  'd': (-105.31, 40.04)}
+    assert backend.geometries('avoid_points')[0].equals(untouched)
+
+    with open(os.path.join(config_dict['download_dir'], 'avoid_point_changes.csv'), encoding='utf-8') as f:
+        changes = {row['AddrKey']: row['Change'] for row in csv.DictReader(f)}
+    assert changes == {'b': 'update', 'c': 'delete', 'd': 'insert'}
+
+
+def test_layer_without_keys_is_rebuilt(config_dict, backend):
+    config_dict['upsert_load'] = True
+    write_addresses(config_dict, [(-105.27, 40.01, 'a')])
+    backend.write('avoid_points', [(shapely.Point(0, 0), {'X': 0, 'Y': 0})])
+    assert finalproject.upsert_avoid_points(os.path.join(config_dict['download_dir'], 'new_addresses.csv'),
+                                            'avoid_points', config_dict) is None
+    finalproject.load(config_dict)
+    assert backend.point_keys('avoid_points') == {'a': (-105.27, 40.01)}
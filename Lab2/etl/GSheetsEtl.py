@@ -1,6 +1,4 @@
 import csv
-import arcpy
-import requests
 from Lab2.etl.SpatialEtl import SpatialEtl
 
 class GSheetsEtl(SpatialEtl):
@@ -12,7 +10,7 @@ class GSheetsEtl(SpatialEtl):
 
     def extract(self):
         print("Extracting addresses from Google Forms spreadsheet")
-        r = requests.get(self.config_dict.get('remote_url'))
+        r = self.session.get(self.config_dict.get('remote_url'))
         r.encoding = "utf-8"
         data = r.text
 
@@ -35,7 +33,7 @@ class GSheetsEtl(SpatialEtl):
                         f"{self.config_dict.get('geocode_base_url', 'https://geocoding.geo.census.gov/geocoder/locations/onelineaddress')}"
                         f"?address={address}&benchmark={self.config_dict.get('geocode_benchmark', '2020')}&format=json"
                     )
-                    r = requests.get(geocode_url)
+                    r = self.session.get(geocode_url)
                     resp_dict = r.json()
 
                     if resp_dict['result']['addressMatches']:
@@ -49,6 +47,8 @@ class GSheetsEtl(SpatialEtl):
 
     def load(self, input_table):
         print("Loading transformed data into geospatial feature class")
+        # Only load() needs ArcGIS, so the rest of the ETL runs without it
+        import arcpy
         arcpy.env.workspace = self.config_dict.get('gdb_path', r"C:\default\path\to\geodatabase.gdb")
         arcpy.env.overwriteOutput = True
 
@@ -66,3 +66,4 @@ class GSheetsEtl(SpatialEtl):
         self.extract()
         self.transform(raw_csv, transformed_csv)
         self.load(transformed_csv)
+        self.report_pool_stats()
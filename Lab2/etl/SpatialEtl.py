@@ -1,8 +1,82 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
 class SpatialEtl:
 
     def __init__(self, config_dict):
         self.config_dict = config_dict
+        self._session = None
+        self._geocoder_session = None
+
+    @property
+    def session(self):
+        # One pooled keep-alive session per ETL instance, shared by extract and every geocode call
+        if self._session is None:
+            self._session = self.create_session()
+        return self._session
+
+    @property
+    def geocoder_session(self):
+        # Geocoder chains retry through their own rate limiter and circuit breaker, so urllib3 must not retry too
+        if self._geocoder_session is None:
+            self._geocoder_session = self.create_session(retry=False)
+        return self._geocoder_session
+
+    def create_session(self, retry=True):
+        pool_size = self.config_dict.get('http_pool_size', max(10, self.config_dict.get('geocode_workers', 4)))
+        if retry:
+            retries = Retry(
+                total=self.config_dict.get('http_retries', 3),
+                backoff_factor=self.config_dict.get('http_backoff_factor', 0.5),
+                status_forcelist=[429, 500, 502, 503, 504],
+                respect_retry_after_header=True
+            )
+        else:
+            retries = Retry(total=0, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=retries, pool_block=True)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        # Nominatim's usage policy requires an identifying User-Agent
+        session.headers.update({
+            'User-Agent': self.config_dict.get('http_user_agent', 'GIS305-FinalProject-Geocoder')
+        })
+        return session
+
+    def pool_stats(self):
+        # urllib3 counts every connection it opens and every request it sends per host pool
+        stats = {}
+        for session in (self._session, self._geocoder_session):
+            if session is None:
+                continue
+            # The same adapter is mounted for http:// and https://, so count each one once
+            for adapter in {id(a): a for a in session.adapters.values()}.values():
+                for key in adapter.poolmanager.pools.keys():
+                    pool = adapter.poolmanager.pools[key]
+                    host = f"{key.key_scheme}://{key.key_host}"
+                    s = stats.setdefault(host, {'requests': 0, 'new_connections': 0})
+                    s['requests'] += pool.num_requests
+                    s['new_connections'] += pool.num_connections
+        for s in stats.values():
+            s['reused_connections'] = max(0, s['requests'] - s['new_connections'])
+        return stats
+
+    def report_pool_stats(self):
+        for host, s in self.pool_stats().items():
+            print(f"HTTP pool {host}: {s['requests']} requests, {s['new_connections']} new connections, "
+                  f"{s['reused_connections']} reused")
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+        if self._geocoder_session is not None:
+            self._geocoder_session.close()
+            self._geocoder_session = None
 
     def extract(self):
         print(f"Extracting data from {self.config_dict['remote_url']}"
-              f"to {self.config_dict['proj_dir']}")
\ No newline at end of file
+              f"to {self.config_dict['proj_dir']}")
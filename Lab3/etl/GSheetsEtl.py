@@ -1,6 +1,6 @@
 import csv
-import arcpy
-import requests
+import io
+from concurrent.futures import ThreadPoolExecutor
 from Lab2.etl.SpatialEtl import SpatialEtl
 
 class GSheetsEtl(SpatialEtl):
@@ -12,7 +12,7 @@ class GSheetsEtl(SpatialEtl):
 
     def extract(self):
         print("Extracting addresses from Google Forms spreadsheet")
-        r = requests.get(self.config_dict.get('remote_url'))
+        r = self.session.get(self.config_dict.get('remote_url'))
         r.encoding = "utf-8"
         data = r.text
 
@@ -35,7 +35,7 @@ class GSheetsEtl(SpatialEtl):
                         f"{self.config_dict.get('geocode_base_url', 'https://geocoding.geo.census.gov/geocoder/locations/onelineaddress')}"
                         f"?address={address}&benchmark={self.config_dict.get('geocode_benchmark', '2020')}&format=json"
                     )
-                    r = requests.get(geocode_url)
+                    r = self.session.get(geocode_url)
                     resp_dict = r.json()
 
                     if resp_dict['result']['addressMatches']:
@@ -47,8 +47,70 @@ class GSheetsEtl(SpatialEtl):
 
         print(f"Transformation complete. Data written to {output_file}")
 
+    def batch_transform(self, input_file, output_file):
+        print("Transforming data with the Census batch geocoder")
+        with open(input_file, "r", encoding='utf-8') as partial_file:
+            rows = [row["Street Address"] for row in csv.DictReader(partial_file, delimiter=',')]
+
+        # The Census batch endpoint accepts at most 10,000 addresses per upload
+        batch_size = min(int(self.config_dict.get('geocode_batch_size', 10000)), 10000)
+        chunks = [(start, rows[start:start + batch_size]) for start in range(0, len(rows), batch_size)]
+        print(f"Submitting {len(rows)} addresses in {len(chunks)} batch(es)")
+
+        matches = {}
+        workers = self.config_dict.get('geocode_batch_workers', 4)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for chunk_matches in executor.map(lambda chunk: self.geocode_batch(*chunk), chunks):
+                matches.update(chunk_matches)
+
+        with open(output_file, "w", encoding='utf-8') as transformed_file:
+            transformed_file.write("X,Y,Type\n")
+            for row_id, street_address in enumerate(rows):
+                if row_id in matches:
+                    x, y = matches[row_id]
+                    transformed_file.write(f"{x},{y},Residential\n")
+                else:
+                    print(f"No matches found for address: {street_address}")
+
+        print(f"Transformation complete. Data written to {output_file}")
+
+    def geocode_batch(self, start, street_addresses):
+        # Build the batch upload: Unique ID, Street address, City, State, ZIP
+        city = self.config_dict.get('city', 'Boulder')
+        state = self.config_dict.get('state', 'CO')
+        upload = io.StringIO()
+        writer = csv.writer(upload)
+        for offset, street_address in enumerate(street_addresses):
+            writer.writerow([start + offset, street_address, city, state, ""])
+
+        batch_url = self.config_dict.get('geocode_batch_url',
+                                         'https://geocoding.geo.census.gov/geocoder/locations/addressbatch')
+        r = self.session.post(
+            batch_url,
+            files={'addressFile': ('addresses.csv', upload.getvalue(), 'text/csv')},
+            data={'benchmark': self.config_dict.get('geocode_benchmark', '2020')},
+            timeout=self.config_dict.get('geocode_batch_timeout', 600)
+        )
+        r.raise_for_status()
+        r.encoding = "utf-8"
+        return self.parse_batch_response(r.text)
+
+    @staticmethod
+    def parse_batch_response(text):
+        # Response rows: ID, input address, Match/No_Match/Tie, match type, matched address, "lon,lat", ...
+        # Rows come back in no particular order, so results are keyed by the ID we sent
+        matches = {}
+        for record in csv.reader(io.StringIO(text)):
+            if len(record) < 6 or record[2] != "Match" or not record[5]:
+                continue
+            x, y = record[5].split(",")
+            matches[int(record[0])] = (float(x), float(y))
+        return matches
+
     def load(self, input_table):
         print("Loading transformed data into geospatial feature class")
+        # Only load() needs ArcGIS, so the rest of the ETL runs without it
+        import arcpy
         arcpy.env.workspace = self.config_dict.get('gdb_path', r"C:\default\path\to\geodatabase.gdb")
         arcpy.env.overwriteOutput = True
 
@@ -64,5 +126,9 @@ class GSheetsEtl(SpatialEtl):
         transformed_csv = f"{self.config_dict.get('download_dir')}new_addresses.csv"
 
         self.extract()
-        self.transform(raw_csv, transformed_csv)
+        if self.config_dict.get('geocode_mode') == 'batch':
+            self.batch_transform(raw_csv, transformed_csv)
+        else:
+            self.transform(raw_csv, transformed_csv)
         self.load(transformed_csv)
+        self.report_pool_stats()
@@ -1,5 +1,4 @@
 import yaml
-import arcpy
 import os
 import logging
 import sys
@@ -25,6 +24,7 @@ def load(config_dict):
     x_coords = "X"
     y_coords = "Y"
 
+    arcpy = setup_workspace(config_dict)
     arcpy.management.XYTableToPoint(in_table, out_feature_class, x_coords, y_coords)
     logging.info("Available feature classes in the workspace: %s", arcpy.ListFeatureClasses())
 
@@ -44,7 +44,10 @@ def process(config_dict):
     input_file = os.path.join(config_dict.get('download_dir', ''), 'raw_addresses.csv')
     output_file = os.path.join(config_dict.get('download_dir', ''), 'new_addresses.csv')
 
-    etl_instance.transform(input_file, output_file)
+    if config_dict.get('geocode_mode') == 'batch':
+        etl_instance.batch_transform(input_file, output_file)
+    else:
+        etl_instance.transform(input_file, output_file)
     load(config_dict)
     logging.debug("Exiting process method")
 
@@ -60,11 +63,6 @@ def setup():
     with open('config/wnvoutbreak.yaml') as f:
         config_dict = yaml.load(f, Loader=yaml.FullLoader)
 
-    arcpy.env.workspace = os.path.join(config_dict.get('proj_dir'), 'WestNileOutbreak.gdb')
-    arcpy.env.overwriteOutput = True
-    logging.info(f"Workspace set to: {arcpy.env.workspace}")
-    logging.info("Feature classes available in workspace: %s", arcpy.ListFeatureClasses())
-
     output_folder = config_dict.get('output_folder', r"C:\Users\Owner\Documents\GIS Programming\westnileoutbreak\Output")
     os.makedirs(output_folder, exist_ok=True)
     config_dict['output_folder'] = output_folder
@@ -72,7 +70,19 @@ def setup():
     logging.debug("Exiting setup method")
     return config_dict
 
+def setup_workspace(config_dict):
+    # arcpy takes seconds to import, so it is only loaded once a step needs the geodatabase
+    import arcpy
+    workspace = os.path.join(config_dict.get('proj_dir'), 'WestNileOutbreak.gdb')
+    if arcpy.env.workspace != workspace:
+        arcpy.env.workspace = workspace
+        arcpy.env.overwriteOutput = True
+        logging.info(f"Workspace set to: {arcpy.env.workspace}")
+        logging.info("Feature classes available in workspace: %s", arcpy.ListFeatureClasses())
+    return arcpy
+
 def buffer(layer_name, buf_dist, config_dict):
+    import arcpy
     output_buffer_layer_path = os.path.join(config_dict.get('output_folder'), f"buf_{layer_name}.shp")
     if arcpy.Exists(layer_name):
         print(f"Buffering {layer_name} at {buf_dist} to generate {output_buffer_layer_path}")
@@ -83,6 +93,7 @@ def buffer(layer_name, buf_dist, config_dict):
 
 
 def intersect(buffer_layer_list, config_dict):
+    import arcpy
     lyr_intersect = input("Enter the name for the intersect output layer name: ")
     lyr_intersect_path = os.path.join(config_dict.get('gdb_path'), lyr_intersect)
 
@@ -98,6 +109,7 @@ def intersect(buffer_layer_list, config_dict):
 
 
 def erase(intersect_layer, avoid_points_buffer_layer, config_dict):
+    import arcpy
     try:
         for layer in [intersect_layer, avoid_points_buffer_layer]:
             arcpy.management.RepairGeometry(layer, "DELETE_NULL")
@@ -134,6 +146,7 @@ def erase(intersect_layer, avoid_points_buffer_layer, config_dict):
 
 
 def spatial_join(Building_Addresses, lyr_intersect, config_dict):
+    import arcpy
     join_layer_path = os.path.join(config_dict.get('gdb_path'), "Address_Join_Intersect")
     print(f"Performing spatial join with {Building_Addresses} as target and {lyr_intersect} as join feature.")
     arcpy.analysis.SpatialJoin(
@@ -147,6 +160,7 @@ def spatial_join(Building_Addresses, lyr_intersect, config_dict):
 
 
 def count_addresses(join_layer_path):
+    import arcpy
     count_result = arcpy.management.GetCount(join_layer_path)
     count = int(count_result.getOutput(0))
     print(f"The number of addresses that fall within the intersect layer is: {count}")
@@ -154,6 +168,7 @@ def count_addresses(join_layer_path):
 
 
 def add_to_project(new_layer_path):
+    import arcpy
     proj_path = config_dict.get('proj_path')
     aprx = arcpy.mp.ArcGISProject(proj_path)
     map_doc = aprx.listMaps()[0]
@@ -168,6 +183,7 @@ def exportMap(config_dict):
     Exports the 'Lab3Layout' layout as a PDF, with fixed center on Boulder, fixed scale,
     dynamic title/subtitle, dynamic model run date, and cleaned legend.
     """
+    import arcpy
     try:
         # Load project and layout
         aprx = arcpy.mp.ArcGISProject(f"{config_dict.get('proj_dir')}WestNileOutbreak.aprx")
@@ -226,10 +242,13 @@ def exportMap(config_dict):
 
 if __name__ == '__main__':
     config_dict = setup()
-    arcpy.env.parallelProcessingFactor = "100%"  # Utilize all available cores
     logging.info("Configuration loaded: %s", config_dict)
     etl()
 
+    # Extract and geocode run without arcpy; only the load and the geoprocessing below need it
+    arcpy = setup_workspace(config_dict)
+    arcpy.env.parallelProcessingFactor = "100%"  # Utilize all available cores
+
     buffer_layer_list = ["Mosquito_Larval_Sites", "Wetlands", "Lakes_and_Reservoirs", "OSMP_Properties"]
 
     for layer in buffer_layer_list:
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# lab3.py imports its etl package relative to Lab3, and the ETL base class from Lab2
+LAB_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, LAB_DIR)
+sys.path.insert(0, os.path.dirname(LAB_DIR))
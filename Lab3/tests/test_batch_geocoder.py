@@ -0,0 +1,95 @@
+import csv
+import io
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from etl.GSheetsEtl import GSheetsEtl
+
+
+class CensusBatchStandIn:
+    """
+    Local stand-in for the Census addressbatch endpoint. Addresses on Main St
+    match at a longitude derived from their house number; anything else gets
+    No_Match. Rows are answered in reverse order, like the real service which
+    does not keep the upload order.
+    """
+
+    def __init__(self):
+        self.uploads = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                message = BytesParser(policy=HTTP).parsebytes(
+                    f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body)
+                parts = {part.get_param('name', header='content-disposition'): part.get_content()
+                         for part in message.iter_parts()}
+                upload = parts['addressFile']
+                if isinstance(upload, bytes):
+                    upload = upload.decode()
+                rows = list(csv.reader(io.StringIO(upload)))
+                server.uploads.append((parts['benchmark'], rows))
+                out = io.StringIO()
+                writer = csv.writer(out)
+                for row_id, street, city, state, _ in reversed(rows):
+                    address = f"{street}, {city}, {state}"
+                    if "Main" in street:
+                        number = int(street.split()[0])
+                        writer.writerow([row_id, address, "Match", "Exact", address.upper(),
+                                         f"-105.{number:02d},40.01", "1234", "L"])
+                    else:
+                        writer.writerow([row_id, address, "No_Match"])
+                data = out.getvalue().encode()
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/addressbatch"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def census():
+    stand_in = CensusBatchStandIn()
+    yield stand_in
+    stand_in.httpd.shutdown()
+
+
+def test_parse_batch_response_keys_matches_by_id():
+    text = ('2,"9 Elm St, Boulder, CO",No_Match\n'
+            '1,"1 Main St, Boulder, CO",Match,Exact,"1 MAIN ST, BOULDER, CO","-105.27,40.01",1234,L\n'
+            '0,"2 Oak St, Boulder, CO",Tie\n'
+            '3,"3 Main St, Boulder, CO",Match,Exact,"3 MAIN ST, BOULDER, CO","",1234,L\n')
+    assert GSheetsEtl.parse_batch_response(text) == {1: (-105.27, 40.01)}
+
+
+def test_batch_transform_keeps_input_order(census, tmp_path):
+    input_file = tmp_path / "raw_addresses.csv"
+    output_file = tmp_path / "new_addresses.csv"
+    input_file.write_text("Timestamp,Street Address\n" + "".join(
+        f"1/1/2024,{street}\n" for street in ["1 Main St", "2 Elm St", "3 Main St", "4 Main St", "5 Main St"]))
+    etl = GSheetsEtl({'geocode_batch_url': census.url, 'geocode_batch_size': 2, 'geocode_benchmark': '2020'})
+    etl.batch_transform(str(input_file), str(output_file))
+    etl.close()
+
+    assert output_file.read_text().splitlines() == [
+        "X,Y,Type",
+        "-105.01,40.01,Residential",
+        "-105.03,40.01,Residential",
+        "-105.04,40.01,Residential",
+        "-105.05,40.01,Residential",
+    ]
+    # Five addresses in batches of two, each row tagged with its position in the sheet
+    assert sorted(len(rows) for _, rows in census.uploads) == [1, 2, 2]
+    assert sorted(int(row[0]) for _, rows in census.uploads for row in rows) == [0, 1, 2, 3, 4]
+    assert all(benchmark == '2020' and rows[0][2:4] == ['Boulder', 'CO'] for benchmark, rows in census.uploads)